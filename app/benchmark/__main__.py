@@ -0,0 +1,281 @@
+# app/benchmark/__main__.py
+"""
+Offline yük / gecikme benchmark'ı.
+
+Servis, sahte Qdrant ve stub encoder ile ayrı bir süreçte açılır (yük üreteci
+aynı event loop'u paylaşıp ölçümü bozmasın diye), HTTP ve gRPC üzerinden sabit
+eşzamanlılık ve sabit hız senaryoları koşulur, sonuç JSON rapora yazılır.
+
+    python -m app.benchmark --concurrency 1,8,32 --rates 200 --output bench.json
+    python -m app.benchmark --baseline bench.json   # önceki raporla kıyasla
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import structlog
+
+from app.benchmark.loadgen import (
+    GrpcTarget,
+    HttpTarget,
+    ScenarioResult,
+    Workload,
+    run_scenario,
+)
+from app.core.config import settings
+from app.core.logging import setup_logging
+
+logger = structlog.get_logger()
+
+REPORT_SCHEMA_VERSION = 1
+# Karşılaştırmada raporlanan metrikler
+COMPARED_FIELDS = ("qps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Knowledge query service benchmark")
+    parser.add_argument("--transports", default="http,grpc")
+    parser.add_argument("--concurrency", type=_float_list, default=[1, 8, 32])
+    parser.add_argument("--rates", type=_float_list, default=[])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--tenants", type=int, default=8)
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=4096,
+        help="Distinct query texts; lower values raise cache hit rates",
+    )
+    parser.add_argument(
+        "--top-k", type=int, default=settings.KNOWLEDGE_QUERY_DEFAULT_TOP_K
+    )
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument(
+        "--baseline", default=None, help="Previous report to compare against"
+    )
+    parser.add_argument(
+        "--label", default="", help="Free-form label stored in the report"
+    )
+    parser.add_argument(
+        "--server-log",
+        default=None,
+        help="File for the target's logs (default: discarded)",
+    )
+    # Stand-in ayarları (server sürecine aynen geçer)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--qdrant-latency-ms", type=float, default=2.0)
+    parser.add_argument("--qdrant-jitter-ms", type=float, default=1.0)
+    parser.add_argument("--encode-base-ms", type=float, default=2.0)
+    parser.add_argument("--encode-per-item-ms", type=float, default=0.5)
+    return parser
+
+
+class TargetProcess:
+    """Benchmark hedefini (app.benchmark.server) alt süreç olarak yönetir."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.http_port = _free_port()
+        self.grpc_port = _free_port()
+        self._log = (
+            open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+        )
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "app.benchmark.server",
+                "--http-port",
+                str(self.http_port),
+                "--grpc-port",
+                str(self.grpc_port),
+                "--dimension",
+                str(args.dimension),
+                "--tenants",
+                str(args.tenants),
+                "--qdrant-latency-ms",
+                str(args.qdrant_latency_ms),
+                "--qdrant-jitter-ms",
+                str(args.qdrant_jitter_ms),
+                "--encode-base-ms",
+                str(args.encode_base_ms),
+                "--encode-per-item-ms",
+                str(args.encode_per_item_ms),
+            ],
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+            env=os.environ.copy(),
+        )
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.http_port}"
+
+    @property
+    def grpc_address(self) -> str:
+        return f"127.0.0.1:{self.grpc_port}"
+
+    async def wait_ready(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(base_url=self.http_url, timeout=1.0) as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(
+                        f"Benchmark target exited with code {self.process.returncode}"
+                    )
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise TimeoutError("Benchmark target did not become healthy in time")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self._log is not subprocess.DEVNULL:
+            self._log.close()  # type: ignore[union-attr]
+
+
+def _peak_child_rss_mb() -> Optional[float]:
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if not peak:
+        return None
+    # Linux KB, macOS byte döner
+    return round(
+        peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0, 1
+    )
+
+
+def compare(report: Dict, baseline: Dict) -> List[Dict]:
+    """Aynı anahtarlı senaryolar için yüzde farkları döner (pozitif = arttı)."""
+    previous = {s["key"]: s for s in baseline.get("scenarios", [])}
+    deltas = []
+    for scenario in report["scenarios"]:
+        before = previous.get(scenario["key"])
+        if before is None:
+            continue
+        delta = {"key": scenario["key"]}
+        for field in COMPARED_FIELDS:
+            old, new = before.get(field) or 0.0, scenario.get(field) or 0.0
+            delta[f"{field}_change_pct"] = (
+                round((new - old) / old * 100, 1) if old else None
+            )
+        deltas.append(delta)
+    return deltas
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    transports = [t.strip() for t in args.transports.split(",") if t.strip()]
+    scenarios = [("concurrency", level) for level in args.concurrency] + [
+        ("rate", level) for level in args.rates
+    ]
+    max_connections = int(max(args.concurrency or [1]))
+
+    target = TargetProcess(args)
+    results: List[ScenarioResult] = []
+    try:
+        await target.wait_ready()
+        for transport in transports:
+            client = (
+                HttpTarget(
+                    target.http_url, settings.API_V1_STR, max(64, max_connections)
+                )
+                if transport == "http"
+                else GrpcTarget(target.grpc_address)
+            )
+            try:
+                for mode, level in scenarios:
+                    workload = Workload(args.tenants, args.queries, args.top_k)
+                    result = await run_scenario(
+                        client,
+                        transport,
+                        mode,
+                        level,
+                        workload,
+                        duration=args.duration,
+                        warmup=args.warmup,
+                        server_pid=target.process.pid,
+                    )
+                    results.append(result)
+                    logger.info(
+                        "Benchmark scenario finished",
+                        event_name="BENCHMARK_RESULT",
+                        **result.to_dict(),
+                    )
+            finally:
+                await client.close()
+    finally:
+        target.stop()
+
+    return {
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "label": args.label,
+        "service_version": settings.SERVICE_VERSION,
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline", "server_log")
+        },
+        "server_peak_rss_mb": _peak_child_rss_mb(),
+        "scenarios": [r.to_dict() for r in results],
+    }
+
+
+def main():
+    setup_logging()
+    args = build_parser().parse_args()
+    report = asyncio.run(run(args))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f))
+        for delta in report["comparison"]:
+            logger.info(
+                "Benchmark comparison", event_name="BENCHMARK_COMPARISON", **delta
+            )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(
+        "Benchmark report written",
+        event_name="BENCHMARK_REPORT_WRITTEN",
+        path=args.output,
+        scenarios=len(report["scenarios"]),
+        server_peak_rss_mb=report["server_peak_rss_mb"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# app/benchmark/fakes.py
+import asyncio
+import hashlib
+import itertools
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient, models
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import QueryResponse
+
+from app.core.config import settings
+from app.core.embedding import EmbeddingBackend
+from app.core.engine import MEMORY_COLLECTION
+from app.core.qdrant import QdrantPool
+
+# [ARCH-COMPLIANCE] Benchmark stand-in'leri SADECE OKUMA API'sini taklit eder.
+
+
+def _seed(*parts: Any) -> int:
+    digest = hashlib.blake2b(
+        "|".join(str(p) for p in parts).encode("utf-8"), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "little")
+
+
+class StubBackend(EmbeddingBackend):
+    """
+    Model indirmeden çalışan deterministik encoder. Maliyet, CPU'yu (ve GIL'i)
+    gerçekten meşgul eden bir döngüyle taklit edilir: base_ms + per_item_ms * n.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self, dimension: int = 768, base_ms: float = 2.0, per_item_ms: float = 0.5
+    ):
+        self._dimension = dimension
+        self._base = base_ms / 1000.0
+        self._per_item = per_item_ms / 1000.0
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        deadline = time.perf_counter() + self._base + self._per_item * len(texts)
+        vectors = np.stack(
+            [
+                np.random.default_rng(_seed(text)).standard_normal(self._dimension)
+                for text in texts
+            ]
+        ).astype(np.float32)
+        while time.perf_counter() < deadline:
+            pass
+        return vectors
+
+
+class FakeQdrantClient:
+    """
+    Süreç içi Qdrant taklidi. Aynı (koleksiyon, vektör) için hep aynı hit'leri
+    ve payload'ları döner; her çağrıya sabit + rastgele (seed'li) gecikme ekler.
+    tenants verilirse sadece onların KB koleksiyonları ve hafızaları vardır.
+    AsyncQdrantClient'tan türemez (ağ istemcisi kurulmaz); engine'in kullandığı
+    okuma metotlarını aynı isimlerle sunar, havuza cast edilerek verilir.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 768,
+        latency_ms: float = 2.0,
+        jitter_ms: float = 1.0,
+        points_per_collection: int = 1000,
+        seed: int = 0,
+        tenants: Optional[List[str]] = None,
+        memory_collection: str = MEMORY_COLLECTION,
+    ):
+        self._tenants = tenants
+        self._memory_collection = memory_collection
+        self._dimension = dimension
+        self._latency = latency_ms / 1000.0
+        self._jitter = jitter_ms / 1000.0
+        self._points = points_per_collection
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    async def _delay(self):
+        self.calls += 1
+        delay = self._latency + self._rng.random() * self._jitter
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _hits(
+        self, collection_name: str, request: models.QueryRequest
+    ) -> List[models.ScoredPoint]:
+        vector = np.asarray(request.query, dtype=np.float32)
+        rng = np.random.default_rng(_seed(collection_name, vector.tobytes()))
+        limit = request.limit or 10
+        scores = np.sort(rng.uniform(0.3, 0.95, size=limit))[::-1]
+        point_ids = rng.choice(self._points, size=limit, replace=False)
+
+        hits = []
+        for point_id, score in zip(point_ids.tolist(), scores.tolist()):
+            if request.score_threshold is not None and score < request.score_threshold:
+                break
+            hits.append(
+                models.ScoredPoint(
+                    id=point_id,
+                    version=0,
+                    score=score,
+                    payload=self._payload(
+                        collection_name, point_id, request.with_payload
+                    ),
+                    vector=(
+                        self._vector(collection_name, point_id, vector.shape[0])
+                        if request.with_vector
+                        else None
+                    ),
+                )
+            )
+        return hits
+
+    @staticmethod
+    def _vector(collection_name: str, point_id: int, dimension: int) -> List[float]:
+        # Cosine koleksiyonlarda Qdrant vektörleri normalize saklar
+        rng = np.random.default_rng(_seed(collection_name, point_id))
+        vector = rng.standard_normal(dimension, dtype=np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    @staticmethod
+    def _payload(
+        collection_name: str, point_id: int, with_payload: object
+    ) -> Optional[Dict[str, Any]]:
+        """with_payload alan listesiyse Qdrant gibi sadece o alanlar döner."""
+        if not with_payload:
+            return None
+        fields = with_payload if isinstance(with_payload, list) else None
+        payload: Dict[str, Any]
+        if collection_name.startswith(settings.QDRANT_DB_COLLECTION_PREFIX):
+            payload = {
+                "content": f"{collection_name} belge #{point_id}: "
+                + "lorem ipsum " * 40,
+                "source_uri": f"https://docs.example.com/{collection_name}/{point_id}",
+            }
+            # Engine'in okumadığı büyük metadata (ingestion'dan kalan ham içerik);
+            # sahte istemcinin maliyeti ölçümü bozmasın diye sadece istenirse kurulur
+            if fields is None or "metadata" in fields:
+                payload["metadata"] = {
+                    "chunk_index": point_id,
+                    "raw_html": "<p>lorem ipsum dolor sit amet</p>" * 100,
+                }
+        else:
+            payload = {
+                "fact": {
+                    "summary": f"kullanıcı tercihi #{point_id}",
+                    "importance": point_id % 5 + 1,
+                    "category": "tercih",
+                },
+            }
+        if fields is not None:
+            return {key: payload[key] for key in fields if key in payload}
+        return payload
+
+    async def query_batch_points(
+        self, collection_name: str, requests: List[models.QueryRequest], **kwargs: Any
+    ) -> List[QueryResponse]:
+        await self._delay()
+        return [
+            QueryResponse(points=self._hits(collection_name, request))
+            for request in requests
+        ]
+
+    def _collection_names(self) -> List[str]:
+        return [
+            f"{settings.QDRANT_DB_COLLECTION_PREFIX}{tenant}"
+            for tenant in self._tenants or []
+        ] + [self._memory_collection]
+
+    async def get_collections(self, **kwargs: Any) -> models.CollectionsResponse:
+        await self._delay()
+        if self._tenants is None:
+            return models.CollectionsResponse(collections=[])
+        return models.CollectionsResponse(
+            collections=[
+                models.CollectionDescription(name=name)
+                for name in self._collection_names()
+            ]
+        )
+
+    def _check_exists(self, collection_name: str):
+        if (
+            self._tenants is not None
+            and collection_name not in self._collection_names()
+        ):
+            raise UnexpectedResponse(
+                404, "Not Found", b'{"status":{"error":"Not found"}}', httpx.Headers()
+            )
+
+    def _record(
+        self,
+        collection_name: str,
+        point_id: int,
+        with_payload: object,
+        with_vectors: bool,
+    ) -> models.Record:
+        return models.Record(
+            id=point_id,
+            payload=self._payload(collection_name, point_id, with_payload),
+            vector=(
+                self._vector(collection_name, point_id, self._dimension)
+                if with_vectors
+                else None
+            ),
+        )
+
+    async def scroll(
+        self,
+        collection_name: str,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload: object = True,
+        with_vectors: bool = False,
+        **kwargs: Any,
+    ) -> Tuple[List[models.Record], Optional[int]]:
+        await self._delay()
+        self._check_exists(collection_name)
+        start = offset or 0
+        end = min(start + limit, self._points)
+        records = [
+            self._record(collection_name, point_id, with_payload, with_vectors)
+            for point_id in range(start, end)
+        ]
+        return records, end if end < self._points else None
+
+    async def retrieve(
+        self,
+        collection_name: str,
+        ids: List[int],
+        with_payload: object = True,
+        with_vectors: bool = False,
+        **kwargs: Any,
+    ) -> List[models.Record]:
+        await self._delay()
+        self._check_exists(collection_name)
+        return [
+            self._record(collection_name, point_id, with_payload, with_vectors)
+            for point_id in ids
+            if 0 <= point_id < self._points
+        ]
+
+    async def get_collection(
+        self, collection_name: str, **kwargs: Any
+    ) -> models.CollectionInfo:
+        await self._delay()
+        self._check_exists(collection_name)
+        return models.CollectionInfo.model_construct(
+            status=models.CollectionStatus.GREEN,
+            optimizer_status=models.OptimizersStatusOneOf.OK,
+            points_count=self._points,
+            segments_count=1,
+            config=models.CollectionConfig.model_construct(
+                params=models.CollectionParams(
+                    vectors=models.VectorParams(
+                        size=self._dimension, distance=models.Distance.COSINE
+                    )
+                )
+            ),
+            payload_schema={},
+        )
+
+    async def count(
+        self,
+        collection_name: str,
+        count_filter: Optional[models.Filter] = None,
+        **kwargs: Any,
+    ) -> models.CountResult:
+        await self._delay()
+        if self._tenants is not None and count_filter is not None:
+            # Engine'in filtresi: must=[FieldCondition(tenant_id, MatchValue)]
+            condition = cast(List[models.FieldCondition], count_filter.must)[0]
+            tenant = cast(models.MatchValue, condition.match).value
+            return models.CountResult(
+                count=self._points if tenant in self._tenants else 0
+            )
+        return models.CountResult(count=self._points)
+
+    async def facet(
+        self, collection_name: str, key: str, **kwargs: Any
+    ) -> models.FacetResponse:
+        await self._delay()
+        return models.FacetResponse(
+            hits=[
+                models.FacetValueHit(value=tenant, count=self._points)
+                for tenant in self._tenants or []
+            ]
+        )
+
+    async def close(self, grpc_grace: Optional[float] = None, **kwargs: Any) -> None:
+        return None
+
+
+class FakeQdrantPool(QdrantPool):
+    """QdrantPool arayüzünde tek bir FakeQdrantClient."""
+
+    def __init__(self, client: FakeQdrantClient):
+        self.http_url = "http://fake-qdrant:6333"
+        self._clients = [cast(AsyncQdrantClient, client)]
+        self._cycle = itertools.cycle(self._clients)
@@ -0,0 +1,215 @@
+# app/benchmark/loadgen.py
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import grpc
+import httpx
+
+from sentiric.knowledge.v1 import query_pb2, query_pb2_grpc
+
+# Bir sorgu yapan, hata durumunda exception fırlatan çağrı
+QueryFn = Callable[[str, str, int], Awaitable[None]]
+
+
+@dataclass(slots=True)
+class ScenarioResult:
+    transport: str
+    mode: str  # "concurrency" | "rate"
+    level: float
+    duration_seconds: float
+    requests: int
+    errors: int
+    qps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    server_rss_mb: Optional[float]
+
+    @property
+    def key(self) -> str:
+        return f"{self.transport}/{self.mode}={self.level:g}"
+
+    def to_dict(self) -> Dict:
+        return {"key": self.key, **asdict(self)}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank yüzdelik (sorted_values sıralı olmalı)."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def process_rss_mb(pid: int) -> Optional[float]:
+    """Linux'ta /proc üzerinden anlık RSS; başka platformlarda None."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+def tenant_ids(count: int) -> List[str]:
+    """Yük üretecinin ve sahte Qdrant'ın paylaştığı tenant adları."""
+    return [f"bench_tenant_{i}" for i in range(max(1, count))]
+
+
+class Workload:
+    """Tenant ve sorgu havuzundan deterministik sırayla istek üretir."""
+
+    def __init__(self, tenants: int, queries: int, top_k: int):
+        self._tenants = tenant_ids(tenants)
+        self._queries = [
+            f"benchmark sorgusu numara {i}" for i in range(max(1, queries))
+        ]
+        self.top_k = top_k
+        self._counter = 0
+
+    def next(self):
+        i = self._counter
+        self._counter += 1
+        return (
+            self._tenants[i % len(self._tenants)],
+            self._queries[i % len(self._queries)],
+            self.top_k,
+        )
+
+
+class HttpTarget:
+    def __init__(self, base_url: str, api_prefix: str, max_connections: int):
+        self._url = f"{api_prefix}/query"
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def query(self, tenant_id: str, query: str, top_k: int):
+        response = await self._client.post(
+            self._url, json={"tenant_id": tenant_id, "query": query, "top_k": top_k}
+        )
+        response.raise_for_status()
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class GrpcTarget:
+    def __init__(self, address: str):
+        self._channel = grpc.aio.insecure_channel(address)
+        self._stub = query_pb2_grpc.KnowledgeQueryServiceStub(self._channel)
+
+    async def query(self, tenant_id: str, query: str, top_k: int):
+        await self._stub.Query(
+            query_pb2.QueryRequest(tenant_id=tenant_id, query=query, top_k=top_k),
+            timeout=30.0,
+        )
+
+    async def close(self):
+        await self._channel.close()
+
+
+async def run_closed_loop(
+    fn: QueryFn, workload: Workload, concurrency: int, duration: float
+):
+    """Sabit eşzamanlılık: her worker cevap gelir gelmez bir sonraki isteği atar."""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                await fn(*workload.next())
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_open_loop(fn: QueryFn, workload: Workload, rate: float, duration: float):
+    """
+    Sabit hız: istekler cevapları beklemeden planlanan anlarda atılır. Gecikme
+    planlanan andan ölçülür, böylece servis yavaşladığında kuyruk süresi de
+    sonuca yansır (coordinated omission yok).
+    """
+    latencies: List[float] = []
+    errors = 0
+    interval = 1.0 / rate
+    tasks = set()
+
+    async def one(scheduled: float):
+        nonlocal errors
+        try:
+            await fn(*workload.next())
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - scheduled)
+
+    started = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        scheduled = started + i * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(one(scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_scenario(
+    target,
+    transport: str,
+    mode: str,
+    level: float,
+    workload: Workload,
+    duration: float,
+    warmup: float,
+    server_pid: Optional[int] = None,
+) -> ScenarioResult:
+    def run(seconds: float):
+        if mode == "concurrency":
+            return run_closed_loop(target.query, workload, int(level), seconds)
+        return run_open_loop(target.query, workload, level, seconds)
+
+    if warmup > 0:
+        await run(warmup)
+    latencies, errors, elapsed = await run(duration)
+
+    ordered = sorted(latencies)
+    return ScenarioResult(
+        transport=transport,
+        mode=mode,
+        level=level,
+        duration_seconds=round(elapsed, 3),
+        requests=len(ordered),
+        errors=errors,
+        qps=round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+        p50_ms=round(percentile(ordered, 0.50) * 1000, 3),
+        p95_ms=round(percentile(ordered, 0.95) * 1000, 3),
+        p99_ms=round(percentile(ordered, 0.99) * 1000, 3),
+        max_ms=round((ordered[-1] if ordered else 0.0) * 1000, 3),
+        server_rss_mb=process_rss_mb(server_pid or os.getpid()),
+    )
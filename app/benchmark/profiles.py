@@ -0,0 +1,203 @@
+# app/benchmark/profiles.py
+"""
+Arama profillerinin recall@k / gecikme karşılaştırması (servis açılmaz).
+
+Her sorgu için önce tam (exact) arama ile doğru top-k id'leri bulunur, sonra
+her profil aynı sorguyla koşulur: profilin döndürdüğü ilk k id'nin doğru
+kümeyle kesişimi recall@k, Qdrant çağrı süresi gecikme olarak raporlanır.
+Doğru küme eşiksizdir; profilin skor eşiğinin elediği hit'ler de recall'u
+düşürür. Sadece okuma yapılır. --fake ile sahte Qdrant + stub encoder
+kullanılır (sahte Qdrant search_params'ı yok sayar; duman testi içindir).
+
+    python -m app.benchmark.profiles --tenant acme --queries hot_queries.txt \\
+        --profiles default,fast,accurate --top-k 10 --output profiles.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import structlog
+
+from app.benchmark.loadgen import percentile
+from app.core.config import settings
+from app.core.embedding import (
+    PARITY_SENTENCES,
+    EmbeddingBackend,
+    build_backend,
+    import_runtime,
+)
+from app.core.engine import MEMORY_COLLECTION
+from app.core.logging import setup_logging
+from app.core.profiles import SearchProfile, SearchProfiles
+from app.core.qdrant import query_request, tenant_filter
+from app.core.routing import ReplicaRouter
+from app.seed_embeddings import read_queries
+
+logger = structlog.get_logger()
+
+SOURCE_KB = "knowledge_base"
+SOURCE_MEMORY = "cognitive_memory"
+
+
+def _str_list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Search profile recall/latency harness"
+    )
+    parser.add_argument("--tenant", required=True)
+    parser.add_argument(
+        "--queries", nargs="*", default=[], help="Query files, one query per line"
+    )
+    parser.add_argument("--profiles", type=_str_list, default=None)
+    parser.add_argument("--sources", type=_str_list, default=[SOURCE_KB, SOURCE_MEMORY])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument(
+        "--fake", action="store_true", help="Fake Qdrant + stub encoder"
+    )
+    parser.add_argument("--dimension", type=int, default=768, help="Only with --fake")
+    parser.add_argument("--output", default=None, help="Optional JSON report path")
+    return parser
+
+
+def _request(
+    source: str,
+    tenant_id: str,
+    vector: List[float],
+    top_k: int,
+    profile: Optional[SearchProfile],
+):
+    """profile None ise doğru küme için eşiksiz tam arama isteği kurulur."""
+    from qdrant_client import models
+
+    threshold: Optional[float]
+    params: Optional[models.SearchParams]
+    if profile is None:
+        threshold, params = None, models.SearchParams(exact=True)
+    else:
+        threshold = (
+            profile.score_threshold
+            if source == SOURCE_KB
+            else profile.memory_score_threshold
+        )
+        params = profile.search_params()
+    return models.SearchRequest(
+        vector=vector,
+        limit=top_k,
+        score_threshold=threshold,
+        with_payload=False,
+        filter=tenant_filter(tenant_id) if source == SOURCE_MEMORY else None,
+        params=params,
+    )
+
+
+async def _search(router: ReplicaRouter, collection_name: str, request) -> List:
+    results = await router.call(
+        lambda client: client.query_batch_points(
+            collection_name=collection_name, requests=[query_request(request)]
+        )
+    )
+    return results[0].points
+
+
+async def run(args: argparse.Namespace, router: ReplicaRouter, vectors: np.ndarray):
+    profiles = SearchProfiles.from_settings()
+    names = args.profiles or profiles.names()
+    rows = []
+    for source in args.sources:
+        collection_name = (
+            f"{settings.QDRANT_DB_COLLECTION_PREFIX}{args.tenant}"
+            if source == SOURCE_KB
+            else MEMORY_COLLECTION
+        )
+        truths = []
+        for vector in vectors.tolist():
+            hits = await _search(
+                router,
+                collection_name,
+                _request(source, args.tenant, vector, args.top_k, None),
+            )
+            truths.append({hit.id for hit in hits})
+
+        for name in names:
+            profile = profiles.get(name)
+            recalls: List[float] = []
+            latencies: List[float] = []
+            for vector, truth in zip(vectors.tolist(), truths):
+                request = _request(source, args.tenant, vector, args.top_k, profile)
+                for _ in range(max(1, args.repeat)):
+                    started = time.perf_counter()
+                    hits = await _search(router, collection_name, request)
+                    latencies.append(time.perf_counter() - started)
+                if truth:
+                    found = {hit.id for hit in hits[: args.top_k]}
+                    recalls.append(len(found & truth) / len(truth))
+            latencies.sort()
+            row = {
+                "profile": name,
+                "source": source,
+                "top_k": args.top_k,
+                "queries": len(truths),
+                "recall_at_k": round(float(np.mean(recalls)), 4) if recalls else None,
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            }
+            rows.append(row)
+            logger.info(
+                "Search profile case finished",
+                event_name="BENCHMARK_PROFILE_RESULT",
+                **row,
+            )
+    return rows
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, object]]:
+    queries = list(read_queries(args.queries)) if args.queries else PARITY_SENTENCES
+    if args.fake:
+        from app.benchmark.fakes import FakeQdrantClient, FakeQdrantPool, StubBackend
+        from app.core.routing import Replica
+
+        backend: EmbeddingBackend = StubBackend(
+            dimension=args.dimension, base_ms=0.0, per_item_ms=0.0
+        )
+        pool = FakeQdrantPool(
+            FakeQdrantClient(dimension=args.dimension, tenants=[args.tenant])
+        )
+        router = ReplicaRouter([Replica(pool.http_url, pool)])
+    else:
+        await asyncio.to_thread(import_runtime)
+        backend = await asyncio.to_thread(build_backend)
+        router = ReplicaRouter()
+    try:
+        vectors = await asyncio.to_thread(backend.encode, queries)
+        await router.warm_up()
+        return await run(args, router, vectors)
+    finally:
+        await router.close()
+        backend.close()
+
+
+def main():
+    setup_logging()
+    args = build_parser().parse_args()
+    rows = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "cases": rows}, f, indent=2)
+        logger.info(
+            "Search profile report written",
+            event_name="BENCHMARK_REPORT_WRITTEN",
+            path=args.output,
+            cases=len(rows),
+        )
+
+
+if __name__ == "__main__":
+    main()
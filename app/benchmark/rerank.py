@@ -0,0 +1,136 @@
+# app/benchmark/rerank.py
+"""
+Hibrit sıralama aşamasının mikro benchmark'ı (servis açılmaz).
+
+Aynı aday kümesi üzerinde eski saf Python yolu (hit başına skor + tam sıralama),
+NumPy skor + argpartition top-k ve MMR ölçülür; çağrı başına süre raporlanır.
+
+    python -m app.benchmark.rerank --candidates 10,100,1000 --top-k 5,20
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import structlog
+
+from app.core.logging import setup_logging
+from app.core.rerank import HybridReranker
+
+logger = structlog.get_logger()
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Hybrid rerank micro-benchmark")
+    parser.add_argument("--candidates", type=_int_list, default=[10, 100, 1000, 10000])
+    parser.add_argument("--top-k", type=_int_list, default=[5, 20])
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument(
+        "--mmr-max-candidates",
+        type=int,
+        default=1000,
+        help="MMR is skipped above this many candidates (vectors are fetched per hit)",
+    )
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    parser.add_argument("--output", default=None, help="Optional JSON report path")
+    return parser
+
+
+def _time_per_call(fn: Callable[[], object], min_seconds: float) -> float:
+    """min_seconds dolana kadar tekrarlar, çağrı başına mikro saniye döner."""
+    fn()
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+    return elapsed / calls * 1e6
+
+
+def _legacy_rank(kb: List[float], memory: List[float], importance: List[float], k: int):
+    """Önceki merge adımı: hit başına Python'da skor ve tüm listenin sıralanması."""
+    results = [(score, "kb") for score in kb]
+    for score, weight in zip(memory, importance):
+        results.append((score * 0.6 + (weight / 5.0) * 0.4, "memory"))
+    return sorted(results, key=lambda r: r[0], reverse=True)[:k]
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, object]]:
+    rng = np.random.default_rng(0)
+    reranker = HybridReranker(1.0, 0.6, 0.4, mmr_enabled=True)
+    rows = []
+    for candidates in args.candidates:
+        kb_count = candidates // 2
+        kb = rng.uniform(0.4, 0.95, kb_count)
+        memory = rng.uniform(0.5, 0.95, candidates - kb_count)
+        importance = rng.integers(1, 6, candidates - kb_count).astype(np.float64)
+        kb_list, memory_list, importance_list = (
+            kb.tolist(),
+            memory.tolist(),
+            importance.tolist(),
+        )
+        vectors = (
+            rng.standard_normal((candidates, args.dimension), dtype=np.float32)
+            if candidates <= args.mmr_max_candidates
+            else None
+        )
+
+        for k in args.top_k:
+            cases = {
+                "python_sort": lambda: _legacy_rank(
+                    kb_list, memory_list, importance_list, k
+                ),
+                "reranker_topk": lambda: reranker.select(
+                    reranker.scores(
+                        np.asarray(kb_list),
+                        np.asarray(memory_list),
+                        np.asarray(importance_list),
+                    ),
+                    k,
+                ),
+            }
+            if vectors is not None:
+                cases["mmr"] = lambda: reranker.select(
+                    reranker.scores(kb, memory, importance), k, vectors
+                )
+            for method, fn in cases.items():
+                row = {
+                    "candidates": candidates,
+                    "top_k": k,
+                    "method": method,
+                    "us_per_call": round(_time_per_call(fn, args.min_seconds), 2),
+                }
+                rows.append(row)
+                logger.info(
+                    "Rerank benchmark case finished",
+                    event_name="BENCHMARK_RERANK_RESULT",
+                    **row,
+                )
+    return rows
+
+
+def main():
+    setup_logging()
+    args = build_parser().parse_args()
+    rows = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "cases": rows}, f, indent=2)
+        logger.info(
+            "Rerank benchmark report written",
+            event_name="BENCHMARK_REPORT_WRITTEN",
+            path=args.output,
+            cases=len(rows),
+        )
+
+
+if __name__ == "__main__":
+    main()
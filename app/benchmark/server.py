@@ -0,0 +1,94 @@
+# app/benchmark/server.py
+import argparse
+import asyncio
+
+import grpc
+import structlog
+import uvicorn
+
+from app.benchmark.fakes import FakeQdrantClient, FakeQdrantPool, StubBackend
+from app.benchmark.loadgen import tenant_ids
+from app.core.engine import engine
+from app.core.logging import setup_logging
+from app.core.routing import Replica, ReplicaRouter
+from app.grpc.interceptors import MetricsInterceptor
+from app.grpc.service import KnowledgeQueryServicer, add_extended_rpc_handlers
+from app.main import app
+from sentiric.knowledge.v1 import query_pb2_grpc
+
+logger = structlog.get_logger()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Knowledge query service with in-process Qdrant and encoder stand-ins"
+        )
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, required=True)
+    parser.add_argument("--grpc-port", type=int, required=True)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--tenants", type=int, default=8)
+    parser.add_argument("--qdrant-latency-ms", type=float, default=2.0)
+    parser.add_argument("--qdrant-jitter-ms", type=float, default=1.0)
+    parser.add_argument("--encode-base-ms", type=float, default=2.0)
+    parser.add_argument("--encode-per-item-ms", type=float, default=0.5)
+    return parser
+
+
+async def serve(args: argparse.Namespace):
+    """
+    Gerçek FastAPI uygulamasını ve gRPC servicer'ını sahte bağımlılıklarla açar.
+    Lifespan kapalıdır; engine burada stand-in'lerle başlatılır.
+    """
+    pool = FakeQdrantPool(
+        FakeQdrantClient(
+            dimension=args.dimension,
+            latency_ms=args.qdrant_latency_ms,
+            jitter_ms=args.qdrant_jitter_ms,
+            tenants=tenant_ids(args.tenants),
+        )
+    )
+    await engine.initialize(
+        backend=StubBackend(
+            dimension=args.dimension,
+            base_ms=args.encode_base_ms,
+            per_item_ms=args.encode_per_item_ms,
+        ),
+        router=ReplicaRouter([Replica(pool.http_url, pool)]),
+    )
+
+    grpc_server = grpc.aio.server(interceptors=[MetricsInterceptor()])
+    servicer = KnowledgeQueryServicer()
+    query_pb2_grpc.add_KnowledgeQueryServiceServicer_to_server(servicer, grpc_server)
+    add_extended_rpc_handlers(servicer, grpc_server)
+    grpc_server.add_insecure_port(f"{args.host}:{args.grpc_port}")
+    await grpc_server.start()
+
+    http_server = uvicorn.Server(
+        uvicorn.Config(
+            app,
+            host=args.host,
+            port=args.http_port,
+            lifespan="off",
+            log_config=None,
+            access_log=False,
+        )
+    )
+    logger.info(
+        "Benchmark target ready",
+        event_name="BENCHMARK_SERVER_READY",
+        http_port=args.http_port,
+        grpc_port=args.grpc_port,
+    )
+    try:
+        await http_server.serve()
+    finally:
+        await grpc_server.stop(grace=1)
+        await engine.shutdown()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(serve(build_parser().parse_args()))
@@ -0,0 +1,191 @@
+# app/core/admission.py
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Optional, Tuple
+
+import structlog
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# HTTP'de gRPC deadline'ının karşılığı (milisaniye)
+REQUEST_TIMEOUT_HEADER = "x-request-timeout-ms"
+
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_QUEUE_TIMEOUT = "queue_timeout"
+REJECT_DEADLINE = "deadline_expired"
+
+# İsteğin mutlak son anı (time.monotonic); None = deadline yok
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class OverloadedError(RuntimeError):
+    """
+    Kuyruk dolu veya sırada beklerken slot açılmadı (HTTP 429 /
+    RESOURCE_EXHAUSTED).
+    """
+
+
+class DeadlineExceededError(TimeoutError):
+    """Çağıranın deadline'ı iş başlamadan doldu; iş hiç yapılmaz."""
+
+
+def bind_deadline(timeout_seconds: Optional[float]):
+    """
+    Transport katmanı çağırır: gRPC'de context.time_remaining(), HTTP'de
+    x-request-timeout-ms. Yoksa REQUEST_DEFAULT_DEADLINE_SECONDS (0 = yok) kullanılır.
+    """
+    if timeout_seconds is None and settings.REQUEST_DEFAULT_DEADLINE_SECONDS > 0:
+        timeout_seconds = settings.REQUEST_DEFAULT_DEADLINE_SECONDS
+    _deadline.set(
+        time.monotonic() + max(0.0, timeout_seconds)
+        if timeout_seconds is not None
+        else None
+    )
+
+
+def current_deadline() -> Optional[float]:
+    """Bağlı mutlak deadline (time.monotonic); yoksa None."""
+    return _deadline.get()
+
+
+def set_deadline(deadline: Optional[float]):
+    """
+    Mutlak deadline'ı olduğu gibi bağlar; birden fazla çağıranın paylaştığı
+    task'ta bekleyenlerin en geç deadline'ı böyle taşınır.
+    """
+    _deadline.set(deadline)
+
+
+def remaining(default: float) -> float:
+    """Aşama timeout'u: sabit varsayılan ile kalan deadline'ın küçüğü."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return max(0.0, min(default, deadline - time.monotonic()))
+
+
+def time_left() -> Optional[float]:
+    """Kalan deadline (saniye); deadline yoksa None."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def deadline_expired() -> bool:
+    deadline = _deadline.get()
+    return deadline is not None and deadline <= time.monotonic()
+
+
+class AdmissionController:
+    """
+    Eşzamanlı arama sayısını sınırlar. Slot yoksa istek sınırlı bir FIFO
+    kuyruğunda bekler; kuyruk doluysa hemen reddedilir. Sırası gelen ama
+    deadline'ı dolmuş istekler slot harcamadan atılır.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self._max_in_flight = max_in_flight
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque[Tuple[asyncio.Future, Optional[float]]] = deque()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_in_flight > 0
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _reject(self, reason: str, error: Exception) -> Exception:
+        metrics.ADMISSION_REJECTED_TOTAL.labels(reason=reason).inc()
+        logger.warning(
+            "Request shed by admission control",
+            event_name="ADMISSION_REJECTED",
+            reason=reason,
+            in_flight=self._in_flight,
+            queued=len(self._waiters),
+        )
+        return error
+
+    async def _acquire(self):
+        if deadline_expired():
+            raise self._reject(
+                REJECT_DEADLINE,
+                DeadlineExceededError("Request deadline already expired"),
+            )
+        if self._in_flight < self._max_in_flight and not self._waiters:
+            self._take()
+            return
+        if len(self._waiters) >= self._max_queue:
+            raise self._reject(REJECT_QUEUE_FULL, OverloadedError("Server overloaded"))
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, _deadline.get())
+        self._waiters.append(entry)
+        metrics.ADMISSION_QUEUE_DEPTH.inc()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, timeout=remaining(self._queue_timeout))
+        except DeadlineExceededError:
+            # _release sırası gelen ama deadline'ı dolmuş bekleyeni böyle uyandırır
+            raise self._reject(
+                REJECT_DEADLINE,
+                DeadlineExceededError("Request deadline expired while queued"),
+            ) from None
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # Slot tam iptal anında devredildiyse sıradakine geri ver
+                self._release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            if deadline_expired():
+                raise self._reject(
+                    REJECT_DEADLINE,
+                    DeadlineExceededError("Request deadline expired while queued"),
+                ) from None
+            raise self._reject(
+                REJECT_QUEUE_TIMEOUT, OverloadedError("Server overloaded")
+            ) from None
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                metrics.ADMISSION_QUEUE_DEPTH.dec()
+            metrics.ADMISSION_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+    def _take(self):
+        self._in_flight += 1
+        metrics.ADMISSION_IN_FLIGHT.inc()
+
+    def _release(self):
+        self._in_flight -= 1
+        metrics.ADMISSION_IN_FLIGHT.dec()
+        # Slotu deadline'ı hâlâ geçerli ilk bekleyene devret
+        now = time.monotonic()
+        while self._waiters and self._in_flight < self._max_in_flight:
+            waiter, deadline = self._waiters.popleft()
+            metrics.ADMISSION_QUEUE_DEPTH.dec()
+            if waiter.done():
+                continue
+            if deadline is not None and deadline <= now:
+                waiter.set_exception(
+                    DeadlineExceededError("Request deadline expired while queued")
+                )
+                continue
+            self._take()
+            waiter.set_result(None)
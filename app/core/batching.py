@@ -0,0 +1,149 @@
+# app/core/batching.py
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set
+
+import numpy as np
+import structlog
+
+from app.core import metrics
+
+logger = structlog.get_logger()
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+
+@dataclass(slots=True)
+class _PendingEncode:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class EmbeddingBatcher:
+    """
+    Eşzamanlı encode isteklerini toplayıp tek bir forward pass ile işler.
+    Batch; max_batch_size dolunca veya ilk isteğin max_wait süresi bitince kapanır.
+    """
+
+    def __init__(
+        self,
+        encode_fn: EncodeFn,
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_concurrent_batches: int = 1,
+    ):
+        self._encode_fn = encode_fn
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: asyncio.Queue[_PendingEncode] = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        # Process pool modunda her worker süreci ayrı bir batch işleyebilir
+        self._slots = asyncio.Semaphore(max(1, max_concurrent_batches))
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        for task in list(self._inflight):
+            task.cancel()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        # Kuyrukta kalan çağıranları asılı bırakma
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Embedding batcher stopped"))
+
+    async def encode(self, text: str) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingEncode(text=text, future=future))
+        return await future
+
+    async def _collect(self) -> List[_PendingEncode]:
+        first = await self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self._max_wait
+
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Süre dolduysa bile hazır bekleyenleri al
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            # İptal edilmiş (client kopmuş) istekler için forward pass harcama
+            batch = [p for p in batch if not p.future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._process(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, batch: List[_PendingEncode]):
+        try:
+            started = time.perf_counter()
+            for pending in batch:
+                metrics.EMBEDDING_QUEUE_WAIT_SECONDS.observe(
+                    started - pending.enqueued_at
+                )
+            metrics.EMBEDDING_BATCH_SIZE.observe(len(batch))
+
+            try:
+                vectors = await asyncio.to_thread(
+                    self._encode_fn, [p.text for p in batch]
+                )
+            except asyncio.CancelledError:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(
+                            RuntimeError("Embedding batcher stopped")
+                        )
+                raise
+            except Exception as e:
+                logger.error(
+                    "Embedding batch failed",
+                    event_name="EMBEDDING_BATCH_ERROR",
+                    batch_size=len(batch),
+                    error=str(e),
+                )
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                return
+
+            for pending, vector in zip(batch, vectors):
+                if not pending.future.done():
+                    pending.future.set_result(vector)
+        finally:
+            self._slots.release()
@@ -0,0 +1,387 @@
+# app/core/cache.py
+import itertools
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core import metrics
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Anahtar + OrderedDict düğümü için yaklaşık sabit maliyet (byte)
+_ENTRY_OVERHEAD_BYTES = 128
+
+
+def normalize_query(text: str) -> str:
+    """Cache anahtarı için sorguyu normalize eder (NFKC, casefold, tek boşluk)."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class EmbeddingCache:
+    """
+    Sorgu vektörleri için byte sınırlı LRU cache (opsiyonel TTL).
+    Anahtar: (model adı, normalize edilmiş sorgu).
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float = 0.0):
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float, int]]" = (
+            OrderedDict()
+        )
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = (model_name, normalize_query(text))
+        entry = self._entries.get(key)
+        if entry is None:
+            metrics.EMBEDDING_CACHE_MISSES_TOTAL.inc()
+            return None
+
+        vector, expires_at, _ = entry
+        if expires_at and expires_at < time.monotonic():
+            self._remove(key)
+            metrics.EMBEDDING_CACHE_EVICTIONS_TOTAL.labels(reason="ttl").inc()
+            metrics.EMBEDDING_CACHE_MISSES_TOTAL.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        metrics.EMBEDDING_CACHE_HITS_TOTAL.inc()
+        return vector
+
+    def put(self, model_name: str, text: str, vector: np.ndarray):
+        key = (model_name, normalize_query(text))
+        # Cache'ten dönen vektör paylaşımlıdır; çağıranlar yerinde değiştiremesin
+        vector = np.array(vector, dtype=np.float32, copy=True)
+        vector.setflags(write=False)
+
+        cost = vector.nbytes + len(key[1].encode("utf-8")) + _ENTRY_OVERHEAD_BYTES
+        if cost > self._max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + self._ttl if self._ttl > 0 else 0.0
+        self._entries[key] = (vector, expires_at, cost)
+        self._bytes += cost
+
+        while self._bytes > self._max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            metrics.EMBEDDING_CACHE_EVICTIONS_TOTAL.labels(reason="size").inc()
+
+        metrics.EMBEDDING_CACHE_BYTES.set(self._bytes)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        metrics.EMBEDDING_CACHE_BYTES.set(0)
+
+    def _remove(self, key: Tuple[str, str]):
+        _, _, cost = self._entries.pop(key)
+        self._bytes -= cost
+        metrics.EMBEDDING_CACHE_BYTES.set(self._bytes)
+
+
+class _TenantVersions:
+    """
+    Tenant başına koleksiyon sürümü ve invalidation nesli (en fazla max_tenants,
+    LRU). Nesiller tüm tenant'lar için tek sayaçtan gelir; LRU'dan düşen
+    tenant'ın nesli taban (floor) değere katılır, böylece o tenant için
+    düşmeden önce başlamış aramaların put()'u yine reddedilir.
+    """
+
+    def __init__(self, max_tenants: int):
+        self._max_tenants = max(1, max_tenants)
+        self._versions: "OrderedDict[str, Hashable]" = OrderedDict()
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._clock = itertools.count(1)
+        self._floor = 0
+
+    def generation(self, tenant_id: str) -> int:
+        return self._generations.get(tenant_id, self._floor)
+
+    def bump(self, tenant_id: str):
+        self._generations[tenant_id] = next(self._clock)
+        self._generations.move_to_end(tenant_id)
+        while len(self._generations) > self._max_tenants:
+            _, generation = self._generations.popitem(last=False)
+            self._floor = max(self._floor, generation)
+
+    def observe(self, tenant_id: str, version: Hashable) -> Optional[str]:
+        """Sürüm değiştiyse invalidation sebebini, değişmediyse None döner."""
+        previous = self._versions.get(tenant_id)
+        self._versions[tenant_id] = version
+        self._versions.move_to_end(tenant_id)
+        while len(self._versions) > self._max_tenants:
+            self._versions.popitem(last=False)
+        if previous == version:
+            return None
+        # İlk gözlemde (veya LRU'dan düştükten sonra) taban sürüm yoktur; put()
+        # ile ilk poll arasındaki bir yazma kaçmasın diye tenant yine temizlenir
+        return "collection_changed" if previous is not None else "first_poll"
+
+
+# (tenant_id, normalize sorgu, top_k, arama profili)
+ResultKey = Tuple[str, str, int, str]
+
+
+class SearchResultCache:
+    """
+    (tenant_id, sorgu, top_k, profil) için hibrit arama sonucu cache'i.
+    Tenant koleksiyonunun sürümü (points_count, status...) değişince o tenant'ın
+    tüm kayıtları düşürülür; sürüm takibi kaçırırsa TTL devreye girer.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[ResultKey, Tuple[list, float]]" = OrderedDict()
+        self._tenant_keys: Dict[str, Set[ResultKey]] = {}
+        # Kaydı olan tenant sayısı kayıt sayısını aşamaz
+        self._tracking = _TenantVersions(self._max_entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def tenants(self) -> List[str]:
+        """Cache'te kaydı olan (sürümü izlenmesi gereken) tenant'lar."""
+        return list(self._tenant_keys)
+
+    def generation(self, tenant_id: str) -> int:
+        """Arama başlamadan alınır; arada invalidation olduysa put() yok sayılır."""
+        return self._tracking.generation(tenant_id)
+
+    def get(
+        self, tenant_id: str, query: str, top_k: int, profile: str = ""
+    ) -> Optional[list]:
+        key = (tenant_id, normalize_query(query), top_k, profile)
+        entry = self._entries.get(key)
+        if entry is None:
+            metrics.SEARCH_RESULT_CACHE_MISSES_TOTAL.inc()
+            return None
+
+        results, expires_at = entry
+        if expires_at and expires_at < time.monotonic():
+            self._remove(key)
+            metrics.SEARCH_RESULT_CACHE_INVALIDATIONS_TOTAL.labels(reason="ttl").inc()
+            metrics.SEARCH_RESULT_CACHE_MISSES_TOTAL.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        metrics.SEARCH_RESULT_CACHE_HITS_TOTAL.inc()
+        return list(results)
+
+    def put(
+        self,
+        tenant_id: str,
+        query: str,
+        top_k: int,
+        results: list,
+        generation: int,
+        profile: str = "",
+    ):
+        if generation != self.generation(tenant_id):
+            return
+
+        key = (tenant_id, normalize_query(query), top_k, profile)
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + self._ttl if self._ttl > 0 else 0.0
+        self._entries[key] = (list(results), expires_at)
+        self._tenant_keys.setdefault(tenant_id, set()).add(key)
+
+        while len(self._entries) > self._max_entries:
+            self._remove(next(iter(self._entries)))
+            metrics.SEARCH_RESULT_CACHE_INVALIDATIONS_TOTAL.labels(reason="size").inc()
+
+    def observe_version(self, tenant_id: str, version: Hashable):
+        """
+        Poller'ın okuduğu koleksiyon sürümünü kaydeder; ilk gözlemde veya
+        sürüm değiştiyse tenant'ı temizler.
+        """
+        reason = self._tracking.observe(tenant_id, version)
+        if reason is None:
+            return
+        self.invalidate_tenant(tenant_id)
+        metrics.SEARCH_RESULT_CACHE_INVALIDATIONS_TOTAL.labels(reason=reason).inc()
+
+    def invalidate_tenant(self, tenant_id: str):
+        self._tracking.bump(tenant_id)
+        for key in list(self._tenant_keys.get(tenant_id, ())):
+            self._remove(key)
+
+    def _remove(self, key: ResultKey):
+        self._entries.pop(key, None)
+        tenant_keys = self._tenant_keys.get(key[0])
+        if tenant_keys is not None:
+            tenant_keys.discard(key)
+            if not tenant_keys:
+                del self._tenant_keys[key[0]]
+
+
+class _TenantQueries:
+    """Bir tenant'ın son sorgularının birim vektörleri ve sonuçları (halka tampon)."""
+
+    __slots__ = ("matrix", "variants", "expires", "results", "count", "cursor")
+
+    def __init__(self, dimension: int, capacity: int):
+        self.matrix = np.empty((capacity, dimension), dtype=np.float32)
+        # (top_k, profil) çiftinin cache içi numarası; sadece aynı varyant eşleşir
+        self.variants = np.empty(capacity, dtype=np.int64)
+        self.expires = np.empty(capacity, dtype=np.float64)
+        self.results: List[list] = []
+        self.count = 0
+        # Tampon dolduktan sonra üzerine yazılacak en eski kayıt
+        self.cursor = 0
+
+    def grow(self, capacity: int):
+        for name in ("matrix", "variants", "expires"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self.count] = old[: self.count]
+            setattr(self, name, new)
+
+
+class SemanticResultCache:
+    """
+    Yakın-kopya sorgular için hibrit arama sonucu cache'i. Tenant başına son
+    max_entries sorgunun birim vektörü bir matriste tutulur; yeni sorgu vektörü
+    tek bir matris-vektör çarpımıyla karşılaştırılır ve kosinüs benzerliği
+    threshold'u geçen en yakın kaydın (aynı top_k ve profil) sonuçları döner.
+    Invalidation SearchResultCache ile aynıdır (koleksiyon sürümü + TTL).
+    """
+
+    _INITIAL_CAPACITY = 16
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries: int,
+        max_tenants: int,
+        ttl_seconds: float,
+    ):
+        self._threshold = threshold
+        self._max_entries = max(1, max_entries)
+        self._max_tenants = max(1, max_tenants)
+        self._ttl = ttl_seconds
+        self._tenants: "OrderedDict[str, _TenantQueries]" = OrderedDict()
+        self._tracking = _TenantVersions(self._max_tenants)
+        self._variants: Dict[Tuple[int, str], int] = {}
+        self._entries = 0
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def tenants(self) -> List[str]:
+        return list(self._tenants)
+
+    def generation(self, tenant_id: str) -> int:
+        return self._tracking.generation(tenant_id)
+
+    def _variant(self, top_k: int, profile: str) -> int:
+        return self._variants.setdefault((top_k, profile), len(self._variants))
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(
+        self, tenant_id: str, vector: np.ndarray, top_k: int, profile: str = ""
+    ) -> Optional[Tuple[list, float]]:
+        """(sonuçlar, benzerlik) döner; eşiği geçen kayıt yoksa None."""
+        queries = self._tenants.get(tenant_id)
+        if queries is None or queries.count == 0:
+            metrics.SEMANTIC_CACHE_MISSES_TOTAL.inc()
+            return None
+
+        n = queries.count
+        similarity = queries.matrix[:n] @ self._unit(vector)
+        similarity[queries.variants[:n] != self._variant(top_k, profile)] = -np.inf
+        if self._ttl > 0:
+            similarity[queries.expires[:n] < time.monotonic()] = -np.inf
+        best = int(np.argmax(similarity))
+        score = float(similarity[best])
+        if score < self._threshold:
+            metrics.SEMANTIC_CACHE_MISSES_TOTAL.inc()
+            return None
+
+        self._tenants.move_to_end(tenant_id)
+        metrics.SEMANTIC_CACHE_HITS_TOTAL.inc()
+        metrics.SEMANTIC_CACHE_HIT_SIMILARITY.observe(score)
+        return queries.results[best], score
+
+    def put(
+        self,
+        tenant_id: str,
+        vector: np.ndarray,
+        top_k: int,
+        results: list,
+        generation: int,
+        profile: str = "",
+    ):
+        if generation != self.generation(tenant_id):
+            return
+
+        unit = self._unit(vector)
+        queries = self._tenants.get(tenant_id)
+        if queries is None or queries.matrix.shape[1] != unit.shape[0]:
+            if queries is not None:
+                self._drop(tenant_id)
+            queries = _TenantQueries(
+                unit.shape[0], min(self._INITIAL_CAPACITY, self._max_entries)
+            )
+            self._tenants[tenant_id] = queries
+            while len(self._tenants) > self._max_tenants:
+                self._drop(next(iter(self._tenants)))
+                metrics.SEMANTIC_CACHE_INVALIDATIONS_TOTAL.labels(reason="size").inc()
+        self._tenants.move_to_end(tenant_id)
+
+        if queries.count < self._max_entries:
+            if queries.count == queries.matrix.shape[0]:
+                queries.grow(min(queries.count * 2, self._max_entries))
+            slot = queries.count
+            queries.count += 1
+            queries.results.append(list(results))
+            self._entries += 1
+        else:
+            slot = queries.cursor
+            queries.cursor = (slot + 1) % self._max_entries
+            queries.results[slot] = list(results)
+
+        queries.matrix[slot] = unit
+        queries.variants[slot] = self._variant(top_k, profile)
+        queries.expires[slot] = time.monotonic() + self._ttl if self._ttl > 0 else 0.0
+        metrics.SEMANTIC_CACHE_ENTRIES.set(self._entries)
+
+    def observe_version(self, tenant_id: str, version: Hashable):
+        reason = self._tracking.observe(tenant_id, version)
+        if reason is None:
+            return
+        self.invalidate_tenant(tenant_id)
+        metrics.SEMANTIC_CACHE_INVALIDATIONS_TOTAL.labels(reason=reason).inc()
+
+    def invalidate_tenant(self, tenant_id: str):
+        self._tracking.bump(tenant_id)
+        self._drop(tenant_id)
+
+    def _drop(self, tenant_id: str):
+        queries = self._tenants.pop(tenant_id, None)
+        if queries is not None:
+            self._entries -= queries.count
+            metrics.SEMANTIC_CACHE_ENTRIES.set(self._entries)
@@ -0,0 +1,384 @@
+# app/core/catalog.py
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, TypeVar, Union
+
+import structlog
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.qdrant import tenant_filter
+from app.core.routing import ReplicaRouter, is_not_found
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+LOOKUP_LISTED = "listed"
+LOOKUP_PROBED = "probed"
+LOOKUP_NEGATIVE = "negative_cached"
+LOOKUP_UNKNOWN = "unknown"
+
+
+class TenantNotFoundError(LookupError):
+    """Tenant'ın ne KB koleksiyonu ne de hafıza kaydı var."""
+
+
+class VectorDimensionError(RuntimeError):
+    """Sorgu vektörünün boyutu koleksiyonun vektör boyutuyla uyuşmuyor."""
+
+
+@dataclass(slots=True)
+class TenantInfo:
+    """None alanlar 'bilinmiyor' demektir; o kaynak her zamanki gibi aranır."""
+
+    kb_exists: Optional[bool] = None
+    kb_vector_size: Optional[int] = None
+    memory_count: Optional[int] = None
+
+    @property
+    def search_kb(self) -> bool:
+        return self.kb_exists is not False
+
+    @property
+    def search_memory(self) -> bool:
+        return self.memory_count != 0
+
+
+def _vector_size(collection_info) -> Optional[int]:
+    # İsimli (çoklu) vektörlü koleksiyonlarda tek bir boyut yoktur
+    vectors = collection_info.config.params.vectors
+    return getattr(vectors, "size", None)
+
+
+async def _gather_limited(
+    call: Callable[[str], Awaitable[T]], keys: List[str], limit: int
+) -> List[Union[T, BaseException]]:
+    """call(key)'leri en fazla limit tanesi aynı anda çalışacak şekilde toplar."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def bounded(key: str) -> T:
+        async with semaphore:
+            return await call(key)
+
+    return await asyncio.gather(*(bounded(key) for key in keys), return_exceptions=True)
+
+
+class TenantCatalog:
+    """
+    Hangi tenant KB koleksiyonlarının var olduğunu, vektör boyutlarını ve
+    tenant başına hafıza sayılarını arka planda tazeler. Liste taze değilse
+    bilinmeyen tenant tek seferlik sorgulanır, yokluk kısa süre (negatif)
+    cache'lenir. Yeni açılan bir tenant en geç bir yenileme aralığı sonra görünür.
+    Varlık listesi sınırsızdır; TENANT_CATALOG_MAX_TENANTS sadece boyut ve
+    hafıza sayısı gibi ek bilgileri sınırlar.
+    """
+
+    def __init__(self, router: ReplicaRouter, memory_collection: str):
+        self._router = router
+        self._memory_collection = memory_collection
+        self._prefix = settings.QDRANT_DB_COLLECTION_PREFIX
+        self._refresh_interval = settings.TENANT_CATALOG_REFRESH_SECONDS
+        self._negative_ttl = settings.TENANT_CATALOG_NEGATIVE_TTL_SECONDS
+        self._max_tenants = settings.TENANT_CATALOG_MAX_TENANTS
+        self._concurrency = settings.TENANT_CATALOG_CONCURRENCY
+        self._max_count_backoff = settings.TENANT_CATALOG_COUNT_MAX_BACKOFF_SECONDS
+
+        # Listelenen tüm koleksiyon adları (memory koleksiyonu dahil)
+        self._collections: Set[str] = set()
+        # koleksiyon adı -> vektör boyutu; listede olup burada olmayanın boyutu
+        # bilinmiyor
+        self._vector_sizes: Dict[str, Optional[int]] = {}
+        self._listed_at = 0.0
+        self._memory_counts: Dict[str, int] = {}
+        # Facet limitin altında döndüyse listede olmayan tenant'ın hafızası yoktur
+        self._memory_counts_complete = False
+        self._facet_supported = True
+        # Facet yokken: tenant -> (sonraki sayım zamanı, bekleme aralığı)
+        self._count_schedule: Dict[str, Tuple[float, float]] = {}
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        self._probes: Dict[str, asyncio.Task] = {}
+
+    def _listing_fresh(self) -> bool:
+        # Bir yenileme kaçırılsa bile liste güvenilir sayılır
+        return time.monotonic() - self._listed_at < self._refresh_interval * 2
+
+    async def lookup(self, tenant_id: str) -> TenantInfo:
+        collection_name = f"{self._prefix}{tenant_id}"
+        if collection_name in self._collections:
+            metrics.TENANT_CATALOG_LOOKUPS_TOTAL.labels(result=LOOKUP_LISTED).inc()
+            return TenantInfo(
+                kb_exists=True,
+                kb_vector_size=self._vector_sizes.get(collection_name),
+                memory_count=self._memory_count(tenant_id),
+            )
+        if self._listing_fresh():
+            metrics.TENANT_CATALOG_LOOKUPS_TOTAL.labels(result=LOOKUP_LISTED).inc()
+            return TenantInfo(
+                kb_exists=False, memory_count=self._memory_count(tenant_id)
+            )
+
+        checked_at = self._negative.get(tenant_id)
+        if (
+            checked_at is not None
+            and time.monotonic() - checked_at < self._negative_ttl
+        ):
+            metrics.TENANT_CATALOG_LOOKUPS_TOTAL.labels(result=LOOKUP_NEGATIVE).inc()
+            return TenantInfo(kb_exists=False, memory_count=0)
+
+        # Aynı tenant için eşzamanlı istekler tek bir sorguyu bekler
+        probe = self._probes.get(tenant_id)
+        if probe is None:
+            probe = asyncio.ensure_future(self._probe(tenant_id))
+            self._probes[tenant_id] = probe
+            probe.add_done_callback(lambda _: self._probes.pop(tenant_id, None))
+        return await asyncio.shield(probe)
+
+    def memory_vector_size(self) -> Optional[int]:
+        return self._vector_sizes.get(self._memory_collection)
+
+    def check_dimension(self, info: TenantInfo, dimension: int):
+        """Boyut uyuşmazlığını Qdrant'a gitmeden yakalar."""
+        expected = {
+            "knowledge_base": info.kb_vector_size if info.search_kb else None,
+            "memory": self.memory_vector_size() if info.search_memory else None,
+        }
+        for source, size in expected.items():
+            if size is not None and size != dimension:
+                logger.error(
+                    "Query vector dimension does not match the collection",
+                    event_name="VECTOR_DIMENSION_MISMATCH",
+                    source=source,
+                    expected=size,
+                    actual=dimension,
+                )
+                raise VectorDimensionError(
+                    f"{source} collection expects {size}-d vectors, got {dimension}"
+                )
+
+    def _memory_count(self, tenant_id: str) -> Optional[int]:
+        count = self._memory_counts.get(tenant_id)
+        if count is None and self._memory_counts_complete and self._listing_fresh():
+            return 0
+        return count
+
+    async def _probe(self, tenant_id: str) -> TenantInfo:
+        """
+        Liste bayatken bilinmeyen tenant'ı doğrudan sorar; hata olursa
+        'bilinmiyor'.
+        """
+        collection_name = f"{self._prefix}{tenant_id}"
+        info_result, count_result = await asyncio.gather(
+            self._router.call(lambda client: client.get_collection(collection_name)),
+            self._router.call(
+                lambda client: client.count(
+                    collection_name=self._memory_collection,
+                    count_filter=tenant_filter(tenant_id),
+                    exact=True,
+                )
+            ),
+            return_exceptions=True,
+        )
+
+        info = TenantInfo()
+        if isinstance(info_result, BaseException):
+            if is_not_found(info_result):
+                info.kb_exists = False
+        else:
+            info.kb_exists = True
+            info.kb_vector_size = _vector_size(info_result)
+            self._remember_collection(collection_name, info.kb_vector_size)
+        if isinstance(count_result, BaseException):
+            if is_not_found(count_result):
+                info.memory_count = 0
+        else:
+            info.memory_count = count_result.count
+            if len(self._memory_counts) < self._max_tenants:
+                self._memory_counts[tenant_id] = count_result.count
+
+        if info.kb_exists is False and info.memory_count == 0:
+            self._negative[tenant_id] = time.monotonic()
+            self._negative.move_to_end(tenant_id)
+            while len(self._negative) > self._max_tenants:
+                self._negative.popitem(last=False)
+        unknown = info.kb_exists is None or info.memory_count is None
+        metrics.TENANT_CATALOG_LOOKUPS_TOTAL.labels(
+            result=LOOKUP_UNKNOWN if unknown else LOOKUP_PROBED
+        ).inc()
+        return info
+
+    def _remember_collection(self, collection_name: str, vector_size: Optional[int]):
+        self._collections.add(collection_name)
+        if len(self._vector_sizes) < self._max_tenants:
+            self._vector_sizes[collection_name] = vector_size
+        metrics.TENANT_CATALOG_COLLECTIONS.set(len(self._collections))
+
+    async def _get_vector_size(self, name: str) -> Optional[int]:
+        info = await self._router.call(lambda client: client.get_collection(name))
+        return _vector_size(info)
+
+    async def refresh(self):
+        """
+        Koleksiyon listesini, yeni koleksiyonların boyutlarını ve hafıza
+        sayılarını tazeler.
+        """
+        response = await self._router.call(lambda client: client.get_collections())
+        names = {c.name for c in response.collections}
+        collections = {
+            name
+            for name in names
+            if name.startswith(self._prefix) or name == self._memory_collection
+        }
+
+        vector_sizes = {
+            name: size
+            for name, size in self._vector_sizes.items()
+            if name in collections
+        }
+        # Vektör boyutu koleksiyon ömrü boyunca değişmez; sadece yenileri sorulur.
+        # Memory koleksiyonu sınırdan etkilenmesin diye önce gelir.
+        missing = sorted(
+            collections - vector_sizes.keys(),
+            key=lambda name: (name != self._memory_collection, name),
+        )[: max(0, self._max_tenants - len(vector_sizes))]
+        results = await _gather_limited(
+            self._get_vector_size, missing, self._concurrency
+        )
+        for name, result in zip(missing, results):
+            if not isinstance(result, BaseException):
+                vector_sizes[name] = result
+            elif is_not_found(result):
+                # Listelemeden sonra silinmiş
+                collections.discard(name)
+            else:
+                raise result
+
+        if self._memory_collection in names:
+            await self._refresh_memory_counts(
+                [name for name in collections if name.startswith(self._prefix)]
+            )
+        else:
+            self._memory_counts = {}
+            self._memory_counts_complete = True
+
+        self._collections = collections
+        self._vector_sizes = vector_sizes
+        self._listed_at = time.monotonic()
+        self._negative.clear()
+        metrics.TENANT_CATALOG_COLLECTIONS.set(len(collections))
+
+    async def _refresh_memory_counts(self, kb_names: List[str]):
+        if self._facet_supported:
+            try:
+                response = await self._router.call(
+                    lambda client: client.facet(
+                        collection_name=self._memory_collection,
+                        key="tenant_id",
+                        limit=self._max_tenants,
+                        exact=True,
+                    )
+                )
+            except Exception as e:
+                # Eski Qdrant sürümü veya tenant_id üzerinde keyword index yok
+                self._facet_supported = False
+                logger.warning(
+                    "Memory facet counts unavailable, "
+                    "falling back to per-tenant counts",
+                    event_name="TENANT_CATALOG_FACET_UNSUPPORTED",
+                    error=str(e),
+                )
+            else:
+                self._memory_counts = {
+                    str(hit.value): hit.count for hit in response.hits
+                }
+                self._memory_counts_complete = len(response.hits) < self._max_tenants
+                return
+
+        # KB'si olan ve daha önce sorulmuş tenant'lar tek tek sayılır. Sayısı
+        # değişmeyen tenant'ın bekleme aralığı ikiye katlanır, değişince sıfırlanır.
+        tenants = sorted(
+            set(self._memory_counts) | {name[len(self._prefix) :] for name in kb_names}
+        )[: self._max_tenants]
+        now = time.monotonic()
+        due = [
+            tenant_id
+            for tenant_id in tenants
+            if tenant_id not in self._memory_counts
+            or self._count_schedule.get(tenant_id, (0.0, 0.0))[0] <= now
+        ]
+        results = await _gather_limited(self._count_memory, due, self._concurrency)
+
+        counts = {
+            tenant_id: self._memory_counts[tenant_id]
+            for tenant_id in tenants
+            if tenant_id in self._memory_counts
+        }
+        schedule = {
+            tenant_id: self._count_schedule[tenant_id]
+            for tenant_id in tenants
+            if tenant_id in self._count_schedule
+        }
+        failed = 0
+        for tenant_id, result in zip(due, results):
+            if isinstance(result, BaseException):
+                # Sayı bilinmiyor: tenant'ın hafızası aranmaya devam eder
+                counts.pop(tenant_id, None)
+                schedule.pop(tenant_id, None)
+                failed += 1
+                continue
+            _, interval = schedule.get(tenant_id, (0.0, 0.0))
+            if counts.get(tenant_id) == result:
+                interval = min(
+                    max(interval, self._refresh_interval) * 2, self._max_count_backoff
+                )
+            else:
+                interval = self._refresh_interval
+            counts[tenant_id] = result
+            schedule[tenant_id] = (now + interval, interval)
+        if failed:
+            logger.warning(
+                "Some memory counts could not be refreshed",
+                event_name="TENANT_CATALOG_COUNT_FAIL",
+                failed=failed,
+            )
+        self._memory_counts = counts
+        self._count_schedule = schedule
+        self._memory_counts_complete = False
+
+    async def _count_memory(self, tenant_id: str) -> int:
+        result = await self._router.call(
+            lambda client: client.count(
+                collection_name=self._memory_collection,
+                count_filter=tenant_filter(tenant_id),
+                exact=True,
+            )
+        )
+        return result.count
+
+    async def run(self):
+        """
+        Arka plan yenileme döngüsü; hata olursa liste bayatlar ve tekil sorguya
+        düşülür.
+        """
+        while True:
+            if self._router.available():
+                started = time.perf_counter()
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.warning(
+                        "Tenant catalog refresh failed",
+                        event_name="TENANT_CATALOG_REFRESH_FAIL",
+                        error=str(e),
+                    )
+                else:
+                    logger.debug(
+                        "Tenant catalog refreshed",
+                        event_name="TENANT_CATALOG_REFRESHED",
+                        collections=len(self._collections),
+                        memory_tenants=len(self._memory_counts),
+                        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                    )
+            await asyncio.sleep(self._refresh_interval)
@@ -0,0 +1,123 @@
+# app/core/coalescing.py
+import asyncio
+import contextvars
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    TypeVar,
+)
+
+import structlog
+
+from app.core import metrics
+from app.core.admission import (
+    DeadlineExceededError,
+    current_deadline,
+    set_deadline,
+    time_left,
+)
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+ROLE_LEADER = "leader"
+ROLE_FOLLOWER = "follower"
+
+
+class _Flight(Generic[T]):
+    __slots__ = ("task", "context", "deadlines", "callers")
+
+    def __init__(self, task: "asyncio.Task[T]", context: contextvars.Context):
+        self.task = task
+        # Task'ın çalıştığı context; deadline buradan güncellenir
+        self.context = context
+        # Şu an bekleyen çağıranların deadline'ları; boşalırsa iş iptal edilir
+        self.deadlines: List[Optional[float]] = []
+        # Bu işi paylaşan toplam çağıran sayısı (metrik için)
+        self.callers = 0
+
+    def rebind_deadline(self):
+        """
+        Task'a bekleyenlerin en geç deadline'ını bağlar (biri deadline'sızsa
+        None). Aşama timeout'ları her aşama başında buna göre hesaplanır.
+        """
+        if not self.deadlines or None in self.deadlines:
+            latest = None
+        else:
+            latest = max(d for d in self.deadlines if d is not None)
+        self.context.run(set_deadline, latest)
+
+
+class SingleFlight(Generic[T]):
+    """
+    Aynı anahtarla eşzamanlı gelen çağrılar tek bir task'ı paylaşır. Task
+    shield ile beklenir: bir çağıranın iptali (istemci bağlantıyı kapattı)
+    işi diğerleri için iptal etmez; sadece son bekleyen de ayrılırsa task
+    iptal edilir. Paylaşılan task'a bekleyenlerin en geç deadline'ı
+    bağlanır; her çağıran yine kendi deadline'ı kadar bekler.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(
+        self, key: Hashable, factory: Callable[[], Coroutine[Any, Any, T]]
+    ) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            context = contextvars.copy_context()
+            task = asyncio.get_running_loop().create_task(factory(), context=context)
+            flight = _Flight(task, context)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+            metrics.SEARCH_COALESCING_TOTAL.labels(role=ROLE_LEADER).inc()
+        else:
+            metrics.SEARCH_COALESCING_TOTAL.labels(role=ROLE_FOLLOWER).inc()
+
+        deadline = current_deadline()
+        flight.deadlines.append(deadline)
+        flight.callers += 1
+        flight.rebind_deadline()
+        try:
+            timeout = time_left()
+            if timeout is None:
+                return await asyncio.shield(flight.task)
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError(
+                    "Request deadline exceeded while waiting for a shared search"
+                ) from None
+        finally:
+            flight.deadlines.remove(deadline)
+            if not flight.task.done():
+                if flight.deadlines:
+                    flight.rebind_deadline()
+                else:
+                    # Kimse beklemiyor; yeni gelenler iptal edilen task'a bağlanmasın
+                    self._forget(key, flight)
+                    flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight[T]):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _finish(self, key: Hashable, flight: _Flight[T]):
+        self._forget(key, flight)
+        metrics.SEARCH_COALESCING_CALLERS.observe(flight.callers)
+        if flight.task.cancelled():
+            logger.debug(
+                "Shared search abandoned by all callers",
+                event_name="SEARCH_COALESCING_ABANDONED",
+                callers=flight.callers,
+            )
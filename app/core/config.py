@@ -1,7 +1,7 @@
 # app/core/config.py
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -17,6 +17,18 @@ class Settings(BaseSettings):
 
     ENV: str = "production"
     LOG_LEVEL: str = "INFO"
+    # Loglar ayrı bir thread'de toplu yazılır; kuyruk dolarsa kayıt atılır
+    LOG_ASYNC_ENABLED: bool = True
+    LOG_QUEUE_MAX_RECORDS: int = 10000
+    LOG_FLUSH_INTERVAL_MS: float = 50.0
+    # İstek başına başarı loglarının tutulma oranı (hatalar her zaman yazılır)
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    LOG_SAMPLED_EVENTS: str = (
+        "HTTP_QUERY_RECEIVED,HTTP_QUERY_SUCCESS,HTTP_BATCH_QUERY_RECEIVED,"
+        "HTTP_BATCH_QUERY_SUCCESS,RPC_QUERY_RECEIVED,RAG_SEARCH_START,"
+        "RPC_QUERY_SUCCESS,RPC_QUERY_STREAM_RECEIVED,RPC_QUERY_STREAM_SUCCESS,"
+        "RPC_BATCH_QUERY_RECEIVED,RPC_BATCH_QUERY_SUCCESS,HYBRID_RAG_SUCCESS"
+    )
 
     # [ARCH-COMPLIANCE] Resource node identity ve Tenant Isolation
     NODE_NAME: str = os.getenv("NODE_HOSTNAME", "unknown-node")
@@ -27,6 +39,14 @@ class Settings(BaseSettings):
     KNOWLEDGE_QUERY_SERVICE_GRPC_PORT: int = 17021
     KNOWLEDGE_QUERY_SERVICE_METRICS_PORT: int = 17022
 
+    # Çok worker'lı mod: model fork'tan önce bir kez yüklenir, her worker HTTP ve
+    # gRPC'yi SO_REUSEPORT soketlerinde dinler, /metrics supervisor'da toplanır.
+    SERVICE_WORKERS: int = 1
+    # Worker başına torch thread sayısı (0 = çekirdek sayısı / worker sayısı)
+    SERVICE_WORKER_TORCH_THREADS: int = 0
+    # Boşsa geçici bir dizin oluşturulur
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None
+
     # Security (mTLS) - Standalone mod için hepsi Optional
     GRPC_TLS_CA_PATH: Optional[str] = None
     KNOWLEDGE_QUERY_SERVICE_CERT_PATH: Optional[str] = None
@@ -37,16 +57,150 @@ class Settings(BaseSettings):
     QDRANT_GRPC_URL: Optional[str] = None
     QDRANT_API_KEY: Optional[str] = None
     QDRANT_DB_COLLECTION_PREFIX: str = "sentiric_kb_"
+    # QDRANT_GRPC_URL tanımlıysa protobuf taşıyıcısı kullanılır
+    QDRANT_PREFER_GRPC: bool = True
+    QDRANT_POOL_SIZE: int = 4
+    QDRANT_GRPC_KEEPALIVE_TIME_MS: int = 30000
+    QDRANT_GRPC_KEEPALIVE_TIMEOUT_MS: int = 10000
+    QDRANT_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    QDRANT_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    QDRANT_SEARCH_TIMEOUT_SECONDS: float = 5.0
+    # Eşzamanlı aramalar koleksiyon başına tek query_batch_points isteğinde birleşir
+    QDRANT_SEARCH_BATCH_MAX_SIZE: int = 64
+    QDRANT_SEARCH_BATCH_MAX_WAIT_MS: float = 0.0
+    # Okuma replica'ları (virgülle ayrılmış HTTP URL'leri). Boşsa QDRANT_HTTP_URL.
+    # gRPC modunda host replica URL'sinden, port QDRANT_GRPC_URL'den alınır.
+    QDRANT_READ_REPLICAS: str = ""
+    QDRANT_EWMA_ALPHA: float = 0.2
+    QDRANT_LATENCY_WINDOW: int = 200
+    # Birincil replica p95 gecikmesini aşarsa ikinci replica'ya hedged istek
+    QDRANT_HEDGING_ENABLED: bool = False
+    QDRANT_HEDGE_PERCENTILE: float = 0.95
+    QDRANT_HEDGE_MIN_DELAY_MS: float = 20.0
+    # Replica başına circuit breaker
+    QDRANT_BREAKER_FAILURE_THRESHOLD: int = 5
+    QDRANT_BREAKER_RESET_SECONDS: float = 10.0
 
     # AI Models
     QDRANT_DB_EMBEDDING_MODEL_NAME: str = (
         "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
     )
     HF_HOME: str = "/app/model-cache"
+    # torch | torch-int8 (CPU dinamik quantization) | onnx (onnxruntime gerekir)
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_ONNX_PATH: Optional[str] = None
+    # Açılışta seçili backend'i torch referansıyla kıyasla (ek model yüklemesi yapar)
+    EMBEDDING_PARITY_CHECK: bool = False
+    EMBEDDING_PARITY_MIN_COSINE: float = 0.99
+    # >0 ise embedding bu kadar ayrı süreçte çalışır (vektörler shared memory ile döner)
+    EMBEDDING_PROCESS_WORKERS: int = 0
+    EMBEDDING_PROCESS_THREADS: int = 1
+    # Hazır (SERVING) demeden önce kaç tur ısınma encode'u yapılır (0 = kapalı)
+    EMBEDDING_WARMUP_ROUNDS: int = 2
 
     # Tuning
     KNOWLEDGE_QUERY_DEFAULT_TOP_K: int = 5
     SCORE_THRESHOLD: float = 0.40
+    MEMORY_SCORE_THRESHOLD: float = 0.50
+    BATCH_QUERY_MAX_ITEMS: int = 32
+
+    # Hibrit sıralama: KB = benzerlik * KB_WEIGHT, hafıza = benzerlik *
+    # MEMORY_SIMILARITY_WEIGHT + (önem / 5) * MEMORY_IMPORTANCE_WEIGHT
+    RERANK_KB_WEIGHT: float = 1.0
+    RERANK_MEMORY_SIMILARITY_WEIGHT: float = 0.6
+    RERANK_MEMORY_IMPORTANCE_WEIGHT: float = 0.4
+    # Kaynak başına Qdrant'tan top_k * çarpan aday istenir (MMR için >1 önerilir)
+    RERANK_CANDIDATE_MULTIPLIER: float = 1.0
+    # MMR: adaylar vektörleriyle birlikte çekilir, yakın kopyalar elenir
+    RERANK_MMR_ENABLED: bool = False
+    RERANK_MMR_LAMBDA: float = 0.7
+    RERANK_MMR_DUPLICATE_THRESHOLD: float = 0.95
+
+    # Arama profilleri (JSON): {"ad": {"hnsw_ef": 64, "exact": false,
+    # "quantization_rescore": true, "quantization_oversampling": 2.0,
+    # "score_threshold": 0.4, "memory_score_threshold": 0.5,
+    # "memory_similarity_weight": 0.6, "memory_importance_weight": 0.4,
+    # "max_content_chars": 0, "snippet": false}}.
+    # Yerleşik profiller: default, fast, accurate, exact (aynı adla ezilebilir).
+    SEARCH_PROFILES: Dict[str, Dict[str, Any]] = {}
+    SEARCH_PROFILE_DEFAULT: str = "default"
+    # Tenant -> profil adı (JSON); istekte profil verilmezse kullanılır
+    SEARCH_PROFILE_TENANTS: Dict[str, str] = {}
+
+    # Sonuç içeriği uzunluk sınırı (karakter, 0 = sınırsız). SNIPPET açıkken
+    # kısaltılan içerik sorgu terimlerinin yoğun geçtiği pencereden alınır;
+    # sınır verilmemişse SNIPPET_CHARS kullanılır. Profil ve istek bazında ezilebilir.
+    CONTENT_MAX_CHARS: int = 0
+    CONTENT_SNIPPET_ENABLED: bool = False
+    CONTENT_SNIPPET_CHARS: int = 320
+
+    # Embedding micro-batching (eşzamanlı encode istekleri tek forward pass'te)
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Embedding cache (0 TTL = süresiz, sadece LRU)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_TTL_SECONDS: float = 0.0
+
+    # Diskte kalıcı, memory-mapped embedding deposu (boşsa kapalı). Canlı trafikle
+    # dolar; yoksa ve TEMPLATE_PATH verilmişse build'de tohumlanmış dosya kopyalanır.
+    EMBEDDING_STORE_PATH: Optional[str] = None
+    EMBEDDING_STORE_TEMPLATE_PATH: Optional[str] = None
+    # Satır sayısı; dosya oluşturulurken sabitlenir (mevcut dosyanın kapasitesi
+    # geçerlidir)
+    EMBEDDING_STORE_CAPACITY: int = 100000
+    EMBEDDING_STORE_READ_ONLY: bool = False
+
+    # Hibrit arama sonuç cache'i (koleksiyon sürümü değişince invalidate edilir)
+    SEARCH_RESULT_CACHE_ENABLED: bool = False
+    SEARCH_RESULT_CACHE_MAX_ENTRIES: int = 10000
+    SEARCH_RESULT_CACHE_TTL_SECONDS: float = 60.0
+    SEARCH_RESULT_CACHE_POLL_INTERVAL_SECONDS: float = 5.0
+
+    # Aynı (tenant, normalize sorgu, top_k) için eşzamanlı aramalar tek aramayı paylaşır
+    SEARCH_COALESCING_ENABLED: bool = True
+
+    # Yakın-kopya sorgu cache'i: kosinüs benzerliği eşiği geçen son sorgunun sonuçları
+    # döner. Sürüm takibi SEARCH_RESULT_CACHE_POLL_INTERVAL_SECONDS ile yapılır.
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_TENANT: int = 256
+    SEMANTIC_CACHE_MAX_TENANTS: int = 200
+    SEMANTIC_CACHE_TTL_SECONDS: float = 60.0
+
+    # Admission control: eşzamanlı arama ve bekleme kuyruğu sınırı (0 = kapalı)
+    ADMISSION_MAX_IN_FLIGHT: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    # İstemci deadline göndermezse uygulanacak süre (0 = yok, aşama
+    # timeout'ları geçerli)
+    REQUEST_DEFAULT_DEADLINE_SECONDS: float = 0.0
+
+    # Tenant koleksiyon kataloğu (var olmayan koleksiyon / boş hafıza aramaları atlanır)
+    TENANT_CATALOG_ENABLED: bool = True
+    TENANT_CATALOG_REFRESH_SECONDS: float = 15.0
+    TENANT_CATALOG_NEGATIVE_TTL_SECONDS: float = 10.0
+    TENANT_CATALOG_MAX_TENANTS: int = 10000
+    # Yenilemede paralel get_collection / count çağrısı sınırı
+    TENANT_CATALOG_CONCURRENCY: int = 16
+    # Facet yoksa tenant başına count; değişmeyen sayılar seyrekleşerek (en fazla
+    # bu süreye kadar) yeniden sayılır
+    TENANT_CATALOG_COUNT_MAX_BACKOFF_SECONDS: float = 300.0
+
+    # Küçük ve sık sorgulanan KB koleksiyonlarının süreç içi salt-okunur kopyası
+    LOCAL_INDEX_ENABLED: bool = False
+    LOCAL_INDEX_MAX_POINTS: int = 5000
+    LOCAL_INDEX_MAX_BYTES: int = 256 * 1024 * 1024
+    # Bir yenileme aralığında en az bu kadar sorgu alan koleksiyon yüklenir
+    LOCAL_INDEX_MIN_QUERIES: int = 5
+    LOCAL_INDEX_REFRESH_SECONDS: float = 30.0
+    # Yerinde güncellenen noktalar id taramasında görünmez; tam yeniden yükleme aralığı
+    LOCAL_INDEX_FULL_REFRESH_SECONDS: float = 600.0
+    LOCAL_INDEX_IDLE_SECONDS: float = 600.0
+    LOCAL_INDEX_SCROLL_BATCH_SIZE: int = 512
+    # memmap dosyalarının dizini (boşsa sistem geçici dizini); dosyalar hemen silinir
+    LOCAL_INDEX_DIR: Optional[str] = None
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
@@ -0,0 +1,360 @@
+# app/core/embedding.py
+import fcntl
+import importlib
+import inspect
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+import numpy as np
+import structlog
+
+from app.core.config import settings
+
+# [ARCH-COMPLIANCE] torch / sentence_transformers import'u saniyeler sürer;
+# servis açılışında model yükleme thread'inde (import_runtime) yapılır.
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = structlog.get_logger()
+
+BACKEND_TORCH = "torch"
+BACKEND_TORCH_INT8 = "torch-int8"
+BACKEND_ONNX = "onnx"
+
+ONNX_CONFIG_FILE = "embedding_config.json"
+
+# Parity kontrolünde kullanılan sabit cümleler (gerçek trafiğe benzer kısa sorgular)
+PARITY_SENTENCES = [
+    "fiyat nedir",
+    "çalışma saatleri nelerdir",
+    "Siparişimi nasıl iptal edebilirim?",
+    "Kargo ücreti ne kadar, ücretsiz kargo var mı?",
+    "What are your opening hours on weekends?",
+    "İade süreci kaç gün sürüyor ve param ne zaman hesabıma geçer?",
+    "Şifremi unuttum, hesabıma nasıl giriş yapabilirim?",
+    "Do you offer enterprise pricing for more than 100 seats?",
+]
+
+
+def import_runtime(name: Optional[str] = None):
+    """
+    Arka ucun ağır modüllerini önceden import eder (açılış süresi ölçümü için
+    ayrı).
+    """
+    name = name or settings.EMBEDDING_BACKEND
+    modules = ["torch", "sentence_transformers"]
+    if name == BACKEND_ONNX:
+        modules = ["onnxruntime", "transformers"]
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            # Eksik opsiyonel bağımlılık hatasını backend kendi mesajıyla verir
+            pass
+
+
+class EmbeddingBackend(ABC):
+    """Sorgu metinlerini float32 vektörlere çeviren çıkarım arka ucu."""
+
+    name: str = ""
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int: ...
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dimension) boyutunda float32 matris döner. Bloklayıcıdır."""
+
+    def close(self):
+        """Arka ucun tuttuğu süreç / bellek kaynaklarını bırakır."""
+
+
+class TorchBackend(EmbeddingBackend):
+    """Referans yol: PyTorch SentenceTransformer (CUDA varsa GPU)."""
+
+    name = BACKEND_TORCH
+
+    def __init__(self, device: Optional[str] = None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = SentenceTransformer(
+            settings.QDRANT_DB_EMBEDDING_MODEL_NAME,
+            cache_folder=settings.HF_HOME,
+            device=self.device,
+        )
+
+    @property
+    def dimension(self) -> int:
+        return int(self.model.get_sentence_embedding_dimension())
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        ).astype(np.float32, copy=False)
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """Linear katmanları dinamik int8'e çevrilmiş CPU PyTorch yolu."""
+
+    name = BACKEND_TORCH_INT8
+
+    def __init__(self):
+        import torch
+
+        # Dinamik quantization sadece CPU kernel'larında var
+        super().__init__(device="cpu")
+        self.model = torch.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    ONNX Runtime (CPU) yolu. Transformer gövdesi ONNX'e export edilir, mean
+    pooling numpy'da yapılır. Export dosyası yoksa ilk açılışta üretilir.
+    """
+
+    name = BACKEND_ONNX
+
+    def __init__(self, onnx_path: Optional[str] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=onnx requires the optional 'onnxruntime' package"
+            ) from e
+        from transformers import AutoTokenizer
+
+        self.onnx_path = onnx_path or onnx_model_path()
+        ensure_onnx_model(self.onnx_path)
+
+        model_dir = os.path.dirname(self.onnx_path)
+        if os.path.exists(os.path.join(model_dir, "tokenizer_config.json")):
+            self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        else:
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                settings.QDRANT_DB_EMBEDDING_MODEL_NAME, cache_dir=settings.HF_HOME
+            )
+
+        # SentenceTransformer'ın max_seq_length'i tokenizer'ınkinden kısadır
+        # (128 vs 512)
+        config_path = os.path.join(model_dir, ONNX_CONFIG_FILE)
+        if os.path.exists(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                self.max_seq_length = int(json.load(f)["max_seq_length"])
+        else:
+            self.max_seq_length = min(int(self.tokenizer.model_max_length), 512)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = _cpu_threads()
+        self.session = ort.InferenceSession(
+            self.onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._dimension = int(self.session.get_outputs()[0].shape[-1])
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feeds = {
+            k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names
+        }
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling (paraphrase-multilingual-mpnet-base-v2 pooling modu)
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32, copy=False)
+
+
+def _cpu_threads() -> int:
+    """torch import etmeden torch.get_num_threads() ile aynı varsayılan."""
+    configured = os.environ.get("OMP_NUM_THREADS", "")
+    if configured.isdigit() and int(configured) > 0:
+        return int(configured)
+    return (
+        len(os.sched_getaffinity(0))
+        if hasattr(os, "sched_getaffinity")
+        else (os.cpu_count() or 1)
+    )
+
+
+def _default_onnx_path() -> str:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "__", settings.QDRANT_DB_EMBEDDING_MODEL_NAME)
+    return os.path.join(settings.HF_HOME, "onnx", slug, "model.onnx")
+
+
+def onnx_model_path() -> str:
+    return settings.EMBEDDING_ONNX_PATH or _default_onnx_path()
+
+
+def ensure_onnx_model(onnx_path: str):
+    """
+    Export yoksa üretir (bloklayıcı). Aynı dizini paylaşan süreçler (worker'lar,
+    process pool) lock dosyası üzerinden flock ile sıralanır; kilidi bekleyen
+    süreç öncekinin bitirdiği export'u kullanır.
+    """
+    if os.path.exists(onnx_path):
+        return
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    lock_fd = os.open(f"{onnx_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        if os.path.exists(onnx_path):
+            return
+        from sentence_transformers import SentenceTransformer
+
+        reference = SentenceTransformer(
+            settings.QDRANT_DB_EMBEDDING_MODEL_NAME,
+            cache_folder=settings.HF_HOME,
+            device="cpu",
+        )
+        _export_onnx(reference, onnx_path)
+    finally:
+        # Kapatmak flock'u da bırakır
+        os.close(lock_fd)
+
+
+def _write_atomic(path: str, write: Callable[[str], None]) -> None:
+    """write(tmp_path) ile yazar ve rename eder; yarım dosya hiç görünmez."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _export_onnx(model: "SentenceTransformer", onnx_path: str):
+    """
+    SentenceTransformer'ın transformer gövdesini ONNX'e export eder. Model
+    dosyası en son ve rename ile yerine konur; varlığı export'un tamamlandığını
+    gösterir.
+    """
+    import torch
+
+    pooling = model[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False) or len(model) > 2:
+        raise RuntimeError(
+            "ONNX backend only supports mean-pooled models without extra modules"
+        )
+
+    logger.info(
+        "Exporting embedding model to ONNX...",
+        event_name="EMBEDDING_ONNX_EXPORT",
+        path=onnx_path,
+    )
+    model_dir = os.path.dirname(onnx_path)
+    os.makedirs(model_dir, exist_ok=True)
+    transformer = model[0]
+    transformer.auto_model.eval()
+    transformer.tokenizer.save_pretrained(model_dir)
+
+    def write_config(path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"max_seq_length": model.max_seq_length}, f)
+
+    _write_atomic(os.path.join(model_dir, ONNX_CONFIG_FILE), write_config)
+
+    sample = transformer.tokenizer(
+        ["warm up"], return_tensors="pt", padding=True, truncation=True
+    )
+    input_names = [k for k in ("input_ids", "attention_mask") if k in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    # Yeni torch sürümlerinde varsayılan dynamo exporter'ı onnxscript ister
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs["dynamo"] = False
+
+    def write_model(path: str):
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer.auto_model,
+                tuple(sample[name] for name in input_names),
+                path,
+                input_names=input_names,
+                output_names=["token_embeddings"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                do_constant_folding=True,
+                **export_kwargs,
+            )
+
+    _write_atomic(onnx_path, write_model)
+
+
+def build_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """Yapılandırmadaki EMBEDDING_BACKEND'e göre arka ucu yükler (bloklayıcı)."""
+    name = name or settings.EMBEDDING_BACKEND
+    if name == BACKEND_TORCH:
+        return TorchBackend()
+    if name == BACKEND_TORCH_INT8:
+        return QuantizedTorchBackend()
+    if name == BACKEND_ONNX:
+        return OnnxBackend()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {name}")
+
+
+def parity_check(
+    backend: EmbeddingBackend,
+    reference: EmbeddingBackend,
+    sentences: Optional[List[str]] = None,
+) -> Dict[str, float]:
+    """Arka ucun çıktısını referans vektörlerle kosinüs benzerliğiyle kıyaslar."""
+    sentences = sentences or PARITY_SENTENCES
+    candidate = backend.encode(sentences)
+    expected = reference.encode(sentences)
+
+    norms = np.linalg.norm(candidate, axis=1) * np.linalg.norm(expected, axis=1)
+    cosine = (candidate * expected).sum(axis=1) / np.clip(norms, 1e-12, None)
+    return {
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "sentences": float(len(sentences)),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Embedding backend parity check")
+    parser.add_argument(
+        "--backend",
+        default=settings.EMBEDDING_BACKEND,
+        choices=[BACKEND_TORCH, BACKEND_TORCH_INT8, BACKEND_ONNX],
+    )
+    args = parser.parse_args()
+
+    report = parity_check(build_backend(args.backend), TorchBackend(device="cpu"))
+    logger.info(
+        "Embedding parity report",
+        event_name="EMBEDDING_PARITY_REPORT",
+        backend=args.backend,
+        **report,
+    )
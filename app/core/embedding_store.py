@@ -0,0 +1,256 @@
+# app/core/embedding_store.py
+import fcntl
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from app.core import metrics
+from app.core.cache import normalize_query
+
+logger = structlog.get_logger()
+
+_MAGIC = b"KQSEMB01"
+_HEADER_BYTES = 64
+# Başlıktaki uint32 alanlarının indeksleri (ilk 8 byte magic)
+_H_DIMENSION = 2
+_H_CAPACITY = 3
+_H_SLOTS = 4
+_H_COUNT = 5
+
+
+def key_hash(model_name: str, text: str) -> int:
+    """
+    (model, normalize edilmiş sorgu) için süreçler arası sabit 64 bit anahtar;
+    0 = boş slot.
+    """
+    digest = hashlib.blake2b(
+        f"{model_name}\x00{normalize_query(text)}".encode("utf-8"), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "little") | 1
+
+
+def _layout(capacity: int) -> Tuple[int, int, int, int]:
+    """(slot sayısı, hash tablosu ofseti, satır tablosu ofseti, matris ofseti)."""
+    # Doluluk en fazla %50 kalsın diye slot sayısı kapasitenin iki katından büyük
+    # 2'nin kuvveti
+    slots = 1 << max(4, (2 * capacity - 1).bit_length())
+    hashes_at = _HEADER_BYTES
+    rows_at = hashes_at + slots * 8
+    matrix_at = rows_at + slots * 4
+    return slots, hashes_at, rows_at, matrix_at
+
+
+def _create(path: str, dimension: int, capacity: int):
+    """
+    Boş depo dosyasını yazar; diğer süreçlerin eski eşlemesi bozulmasın diye
+    rename ile değiştirir.
+    """
+    slots, _, _, matrix_at = _layout(capacity)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    header = np.zeros(_HEADER_BYTES // 4, dtype=np.uint32)
+    header[_H_DIMENSION] = dimension
+    header[_H_CAPACITY] = capacity
+    header[_H_SLOTS] = slots
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(header.tobytes()[len(_MAGIC) :])
+        # Geri kalanı seyrek (sparse) dosya; yazılmayan satırlar diskte yer tutmaz
+        f.truncate(matrix_at + capacity * dimension * 4)
+    os.replace(tmp_path, path)
+
+
+def _copy_template(template_path: str, path: str):
+    """İmaj build'inde tohumlanmış depoyu yazılabilir konuma kopyalar."""
+    if not os.path.exists(template_path):
+        return
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    shutil.copyfile(template_path, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(
+        "Embedding store copied from template",
+        event_name="EMBEDDING_STORE_TEMPLATE_COPIED",
+        path=path,
+        template_path=template_path,
+    )
+
+
+class EmbeddingStore:
+    """
+    Diskte kalıcı, memory-mapped sorgu vektörü deposu. Dosya: başlık, açık
+    adreslemeli hash tablosu (64 bit anahtar -> satır) ve sabit genişlikli
+    float32 matris. get() kopya yapmadan matris satırının salt-okunur
+    görünümünü döner. Çok worker'lı modda tüm süreçler aynı dosyayı paylaşır;
+    yazmalar ayrı bir lock dosyası üzerinden flock ile sıralanır, okumalar
+    kilitsizdir (satır, anahtardan önce yazılır). Kapasite dolunca yeni
+    kayıt eklenmez; mevcutlar silinmez.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int,
+        capacity: int,
+        read_only: bool = False,
+        template_path: Optional[str] = None,
+    ):
+        self.path = path
+        self.read_only = read_only
+        self._lock_fd: Optional[int] = None
+        if not read_only:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            with self._locked():
+                if template_path and not os.path.exists(path):
+                    _copy_template(template_path, path)
+                if not self._compatible(dimension):
+                    _create(path, dimension, capacity)
+        elif not self._compatible(dimension):
+            raise ValueError(
+                f"Embedding store {path} is missing or has another dimension"
+            )
+
+        self._buffer = buffer = np.memmap(
+            path, dtype=np.uint8, mode="r" if read_only else "r+"
+        )
+        self._header = buffer[:_HEADER_BYTES].view(np.uint32)
+        self.dimension = int(self._header[_H_DIMENSION])
+        self.capacity = int(self._header[_H_CAPACITY])
+        slots, hashes_at, rows_at, matrix_at = _layout(self.capacity)
+        self._mask = slots - 1
+        self._hashes = buffer[hashes_at:rows_at].view(np.uint64)
+        self._rows = buffer[rows_at:matrix_at].view(np.uint32)
+        self._matrix = (
+            buffer[matrix_at : matrix_at + self.capacity * self.dimension * 4]
+            .view(np.float32)
+            .reshape(self.capacity, self.dimension)
+        )
+        # get() bu görünümün satırlarını döner; çağıranlar depoyu değiştiremez
+        self._readable = self._matrix.view()
+        self._readable.setflags(write=False)
+        metrics.EMBEDDING_STORE_ENTRIES.set(len(self))
+
+    def _compatible(self, dimension: int) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read(_HEADER_BYTES)
+        except FileNotFoundError:
+            return False
+        if len(raw) < _HEADER_BYTES or raw[: len(_MAGIC)] != _MAGIC:
+            return False
+        return int(np.frombuffer(raw, dtype=np.uint32)[_H_DIMENSION]) == dimension
+
+    @contextmanager
+    def _locked(self, wait: bool = True) -> Iterator[bool]:
+        """Yazma kilidini alır; wait=False iken kilit meşgulse False verir."""
+        assert self._lock_fd is not None
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        return int(self._header[_H_COUNT])
+
+    def _probe(self, key: int) -> Tuple[int, int]:
+        """(slot, satır + 1) döner; anahtar yoksa ilk boş slot ve 0."""
+        slot = key & self._mask
+        while True:
+            stored = int(self._hashes[slot])
+            if stored == key:
+                return slot, int(self._rows[slot])
+            if stored == 0:
+                return slot, 0
+            slot = (slot + 1) & self._mask
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        _, row = self._probe(key_hash(model_name, text))
+        if row == 0:
+            metrics.EMBEDDING_STORE_MISSES_TOTAL.inc()
+            return None
+        metrics.EMBEDDING_STORE_HITS_TOTAL.inc()
+        return self._readable[row - 1]
+
+    def put(
+        self, model_name: str, text: str, vector: np.ndarray, wait: bool = True
+    ) -> bool:
+        """
+        Vektörü kalıcı olarak ekler; salt-okunur, dolu veya boyut uyumsuzsa
+        False. wait=False iken (event loop) kilit başka süreçteyse beklenmez,
+        yazma atlanır ve False döner.
+        """
+        if self.read_only or vector.shape != (self.dimension,):
+            return False
+        key = key_hash(model_name, text)
+        with self._locked(wait) as acquired:
+            if not acquired:
+                metrics.EMBEDDING_STORE_WRITES_TOTAL.labels(result="busy").inc()
+                return False
+            slot, row = self._probe(key)
+            if row:
+                return True
+            count = len(self)
+            if count >= self.capacity:
+                metrics.EMBEDDING_STORE_WRITES_TOTAL.labels(result="full").inc()
+                return False
+            # Kilitsiz okuyucular anahtarı ancak satır ve satır indeksi yazıldıktan
+            # sonra görür
+            self._matrix[count] = vector
+            self._rows[slot] = count + 1
+            self._hashes[slot] = key
+            self._header[_H_COUNT] = count + 1
+        metrics.EMBEDDING_STORE_WRITES_TOTAL.labels(result="stored").inc()
+        metrics.EMBEDDING_STORE_ENTRIES.set(count + 1)
+        return True
+
+    def contains(self, model_name: str, text: str) -> bool:
+        return self._probe(key_hash(model_name, text))[1] != 0
+
+    def flush(self):
+        """
+        Kirli sayfaları diske yazar (kapanışta; süreç çökmesinde de sayfa cache'i
+        korunur).
+        """
+        if not self.read_only:
+            self._buffer.flush()
+
+    def close(self):
+        self.flush()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+def open_store(
+    path: str,
+    dimension: int,
+    capacity: int,
+    read_only: bool = False,
+    template_path: Optional[str] = None,
+) -> EmbeddingStore:
+    """
+    Depoyu açar (yoksa template'ten kopyalar veya boş oluşturur) ve durumunu
+    loglar.
+    """
+    store = EmbeddingStore(
+        path, dimension, capacity, read_only=read_only, template_path=template_path
+    )
+    logger.info(
+        "Embedding store opened",
+        event_name="EMBEDDING_STORE_OPENED",
+        path=path,
+        entries=len(store),
+        capacity=store.capacity,
+        dimension=store.dimension,
+        read_only=read_only,
+    )
+    return store
@@ -1,139 +1,829 @@
 # app/core/engine.py
 import asyncio
-import json
+import importlib
+import time
+import numpy as np
+import orjson
 import structlog
-import torch
-from typing import List, Optional
-from sentence_transformers import SentenceTransformer
-from qdrant_client import AsyncQdrantClient
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from app.core import metrics
+from app.core.admission import (
+    AdmissionController,
+    DeadlineExceededError,
+    remaining,
+    time_left,
+)
+from app.core.batching import EmbeddingBatcher
+from app.core.cache import (
+    EmbeddingCache,
+    SearchResultCache,
+    SemanticResultCache,
+    normalize_query,
+)
+from app.core.coalescing import SingleFlight
+from app.core.catalog import (
+    TenantCatalog,
+    TenantInfo,
+    TenantNotFoundError,
+    VectorDimensionError,
+)
 from app.core.config import settings
-from app.schemas import QueryResult
+from app.core.workers import ProcessPoolBackend
+from app.core.qdrant import (
+    KB_PAYLOAD_FIELDS,
+    MEMORY_PAYLOAD_FIELDS,
+    QdrantSearchPlanner,
+    tenant_filter,
+    use_grpc,
+)
+from app.core.routing import ReplicaRouter, is_not_found
+from app.core.embedding_store import EmbeddingStore, open_store
+from app.core.embedding import (
+    BACKEND_TORCH,
+    PARITY_SENTENCES,
+    EmbeddingBackend,
+    TorchBackend,
+    build_backend,
+    import_runtime,
+    parity_check,
+)
+from app.core.local_index import LocalIndexManager
+from app.core.profiles import SearchProfile, SearchProfiles
+from app.core.rerank import HybridReranker
+from app.core.results import SearchHit
+from app.core.snippets import ContentOptions, resolve_limit, shape_hits
+
+# [ARCH-COMPLIANCE] qdrant_client'ın import'u ~2sn sürer; açılışta model
+# yüklemesiyle paralel, ayrı bir thread'de yapılır (bkz. _connect_qdrant).
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient, models
 
 logger = structlog.get_logger()
 
+MEMORY_COLLECTION = "sentiric_user_memories"
+
+# search_stream kaynak etiketleri
+STREAM_KNOWLEDGE_BASE = "knowledge_base"
+STREAM_MEMORY = "cognitive_memory"
+STREAM_FINAL = "final"
+
+# search_stream frame'i: (kaynak etiketi, sonuçlar)
+StreamFrame = Tuple[str, List[SearchHit]]
+
+# Tüm KB sonuçları aynı metadata nesnesini paylaşır (hit başına dict kurulmaz)
+_KB_METADATA = {"type": "static_document"}
+
+# search_batch öğesi: (tenant_id, sorgu, top_k, profil adı, içerik sınırı);
+# son ikisi None olabilir
+BatchItem = Tuple[str, str, int, Optional[str], Optional[ContentOptions]]
+
+
+def batch_item_error(error: Exception) -> str:
+    """search_batch öğe hatasının istemciye dönen metni; iç detaylar sızdırılmaz."""
+    if isinstance(error, TimeoutError):
+        return "Vector DB timeout"
+    if isinstance(error, TenantNotFoundError):
+        return "Tenant not found"
+    if isinstance(error, VectorDimensionError):
+        return "Vector dimension mismatch"
+    if isinstance(error, ValueError):
+        return str(error)
+    return "Internal server error"
+
+
+# Yakın-kopya bir sorgunun cache'lenmiş sonuçlarıyla yanıtlanan hit'lerde benzerlik
+SEMANTIC_CACHE_METADATA_KEY = "semantic_cache_similarity"
+
 
 class RAGEngine:
     def __init__(self):
-        self.model: Optional[SentenceTransformer] = None
-        self.qdrant: Optional[AsyncQdrantClient] = None
-        self._ready = False
+        self.backend: Optional[EmbeddingBackend] = None
+        self.router: Optional[ReplicaRouter] = None
+        self.search_planner: Optional[QdrantSearchPlanner] = None
+        self.batcher: Optional[EmbeddingBatcher] = None
+        self.catalog: Optional[TenantCatalog] = None
+        self.local_index: Optional[LocalIndexManager] = None
+        self.embedding_store: Optional[EmbeddingStore] = None
+        # Qdrant search_params, eşikler ve hafıza ağırlıkları profil başınadır
+        self.profiles = SearchProfiles.from_settings()
+        self.admission = AdmissionController(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        )
+        self.embedding_cache: Optional[EmbeddingCache] = (
+            EmbeddingCache(
+                max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+                ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+            )
+            if settings.EMBEDDING_CACHE_ENABLED
+            else None
+        )
+        self.result_cache: Optional[SearchResultCache] = (
+            SearchResultCache(
+                max_entries=settings.SEARCH_RESULT_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.SEARCH_RESULT_CACHE_TTL_SECONDS,
+            )
+            if settings.SEARCH_RESULT_CACHE_ENABLED
+            else None
+        )
+        self.semantic_cache: Optional[SemanticResultCache] = (
+            SemanticResultCache(
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_TENANT,
+                max_tenants=settings.SEMANTIC_CACHE_MAX_TENANTS,
+                ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+            )
+            if settings.SEMANTIC_CACHE_ENABLED
+            else None
+        )
+        self.coalescer: Optional[SingleFlight[List[SearchHit]]] = (
+            SingleFlight() if settings.SEARCH_COALESCING_ENABLED else None
+        )
+        self._background_tasks: List[asyncio.Task] = []
+        # Isınma encode'ları bitene kadar sağlık kontrolü başarısızdır
+        self._warmed = False
+
+    @property
+    def qdrant(self) -> Optional["AsyncQdrantClient"]:
+        """En düşük gecikmeli sağlıklı replica'nın havuzundan sıradaki istemci."""
+        return self.router.client() if self.router else None
+
+    @property
+    def _ready(self) -> bool:
+        """Ghost Mode: tüm replica'ların devresi açıksa servis hazır değildir."""
+        return self.router is not None and self.router.available()
 
-    def _load_model_sync(self):
+    def _load_model_sync(self) -> EmbeddingBackend:
         """Modeli senkron olarak yükler (to_thread ile çağrılacak)"""
-        device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(
             "Model arka planda yükleniyor...",
             event_name="MODEL_LOADING_BG",
             model=settings.QDRANT_DB_EMBEDDING_MODEL_NAME,
-            device=device,
-        )
-        return SentenceTransformer(
-            settings.QDRANT_DB_EMBEDDING_MODEL_NAME,
-            cache_folder=settings.HF_HOME,
-            device=device,
+            backend=settings.EMBEDDING_BACKEND,
+            process_workers=settings.EMBEDDING_PROCESS_WORKERS,
         )
+        if settings.EMBEDDING_PROCESS_WORKERS > 0:
+            return ProcessPoolBackend(
+                settings.EMBEDDING_BACKEND,
+                workers=settings.EMBEDDING_PROCESS_WORKERS,
+                threads_per_worker=settings.EMBEDDING_PROCESS_THREADS,
+                max_batch=settings.EMBEDDING_BATCH_MAX_SIZE,
+            )
 
-    async def initialize(self):
+        backend = build_backend()
+
+        if settings.EMBEDDING_PARITY_CHECK and backend.name != BACKEND_TORCH:
+            report = parity_check(backend, TorchBackend(device="cpu"))
+            log = (
+                logger.info
+                if report["min_cosine"] >= settings.EMBEDDING_PARITY_MIN_COSINE
+                else logger.warning
+            )
+            log(
+                "Embedding backend parity check",
+                event_name="EMBEDDING_PARITY_CHECK",
+                backend=backend.name,
+                **report,
+            )
+        return backend
+
+    def preload(self):
+        """
+        Çok worker'lı modda fork'tan ÖNCE supervisor'da çağrılır. Ağırlıklar
+        worker'larla copy-on-write paylaşılır; initialize() yüklü modeli kullanır.
+        """
+        if settings.EMBEDDING_PROCESS_WORKERS > 0:
+            raise RuntimeError(
+                "EMBEDDING_PROCESS_WORKERS cannot be combined with SERVICE_WORKERS > 1"
+            )
+        self.backend = self._load_model_sync()
+        if getattr(self.backend, "device", "cpu") != "cpu":
+            raise RuntimeError("CUDA models cannot be shared with forked workers")
+
+    def _encode_batch_sync(self, texts: List[str]) -> np.ndarray:
+        """Batcher worker'ı tarafından thread içinde çağrılır."""
+        assert self.backend is not None
+        return self.backend.encode(texts)
+
+    async def initialize(
+        self,
+        backend: Optional[EmbeddingBackend] = None,
+        router: Optional[ReplicaRouter] = None,
+    ):
+        """
+        backend / router verilirse (benchmark) model ve Qdrant yerine onlar kullanılır.
+        Model yükleme ile Qdrant bağlantısı paralel yürür; encoder ısınmadan
+        check_health() True dönmez.
+        """
         logger.info("RAG Engine: Başlatılıyor...", event_name="RAG_ENGINE_START")
+        started = time.perf_counter()
+        phases: Dict[str, float] = {}
+
+        async def timed(phase: str, awaitable):
+            phase_started = time.perf_counter()
+            try:
+                return await awaitable
+            finally:
+                phases[phase] = time.perf_counter() - phase_started
+
+        # Qdrant bağlantısı (ve qdrant_client import'u) model yüklenirken kurulur
+        connect_task = asyncio.create_task(
+            timed("qdrant_connect", self._connect_qdrant(router))
+        )
 
         # [ARCH-COMPLIANCE FIX]: Asla Event Loop'u bloklama!
         # Modeli ayrı bir OS Thread üzerinde yükle.
         try:
-            self.model = await asyncio.to_thread(self._load_model_sync)
+            if backend is not None:
+                self.backend = backend
+            elif self.backend is None:
+                if settings.EMBEDDING_PROCESS_WORKERS == 0:
+                    await timed("imports", asyncio.to_thread(import_runtime))
+                self.backend = await timed(
+                    "model_load", asyncio.to_thread(self._load_model_sync)
+                )
             logger.info("Model başarıyla yüklendi.", event_name="MODEL_LOADED")
         except Exception as e:
+            connect_task.cancel()
             logger.critical(
                 "Model yüklenemedi!", event_name="MODEL_LOAD_FAIL", error=str(e)
             )
             raise e
 
-        # Qdrant İstemcisini Oluştur (Bu işlem ağa gitmez, sadece objeyi yaratır)
-        self.qdrant = AsyncQdrantClient(
-            url=settings.QDRANT_HTTP_URL, api_key=settings.QDRANT_API_KEY
+        if settings.EMBEDDING_STORE_PATH and self.embedding_store is None:
+            await self._open_embedding_store()
+
+        self.batcher = EmbeddingBatcher(
+            self._encode_batch_sync,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            max_concurrent_batches=max(1, settings.EMBEDDING_PROCESS_WORKERS),
+        )
+        await self.batcher.start()
+        await timed("warmup", self._warm_up_encoder())
+        await connect_task
+
+        if self._versioned_caches():
+            self._background_tasks.append(
+                asyncio.create_task(self._watch_collection_versions())
+            )
+
+        self._warmed = True
+        phases["total"] = time.perf_counter() - started
+        for phase, seconds in phases.items():
+            metrics.STARTUP_PHASE_SECONDS.labels(phase=phase).set(seconds)
+        logger.info(
+            "RAG Engine hazır.",
+            event_name="STARTUP_TIMING",
+            **{
+                f"{phase}_ms": round(seconds * 1000, 1)
+                for phase, seconds in phases.items()
+            },
+        )
+
+    async def _open_embedding_store(self):
+        """
+        Model boyutu belli olunca depoyu açar; açılamazsa servis depo olmadan
+        çalışır.
+        """
+        assert self.backend is not None and settings.EMBEDDING_STORE_PATH
+        try:
+            self.embedding_store = await asyncio.to_thread(
+                open_store,
+                settings.EMBEDDING_STORE_PATH,
+                self.backend.dimension,
+                settings.EMBEDDING_STORE_CAPACITY,
+                read_only=settings.EMBEDDING_STORE_READ_ONLY,
+                template_path=settings.EMBEDDING_STORE_TEMPLATE_PATH,
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "Embedding store could not be opened, continuing without it",
+                event_name="EMBEDDING_STORE_OPEN_FAIL",
+                path=settings.EMBEDDING_STORE_PATH,
+                error=str(e),
+            )
+
+    async def _connect_qdrant(self, router: Optional[ReplicaRouter]):
+        """Router'ı kurar ve ısıtır; Qdrant yoksa Ghost Mode'da devam eder."""
+        if router is None:
+            await asyncio.to_thread(importlib.import_module, "qdrant_client")
+            router = ReplicaRouter()
+        # Qdrant İstemcilerini Oluştur (Bu işlem ağa gitmez, sadece objeleri yaratır)
+        self.router = router
+        self.search_planner = QdrantSearchPlanner(
+            self.router,
+            max_batch_size=settings.QDRANT_SEARCH_BATCH_MAX_SIZE,
+            max_wait_ms=settings.QDRANT_SEARCH_BATCH_MAX_WAIT_MS,
         )
 
         # [ARCH-COMPLIANCE FIX]: Zero-Dependency Boot (Ghost Mode)
         # Qdrant'a bağlanmayı dene, DNS yoksa çökme, arka planda tekrar dene.
+        # Ulaşılamayan her replica'nın devresi açılır, prober half-open dener.
+        self.router.start_probing()
+        if settings.TENANT_CATALOG_ENABLED:
+            self.catalog = TenantCatalog(self.router, MEMORY_COLLECTION)
+            self._background_tasks.append(asyncio.create_task(self.catalog.run()))
+        if settings.LOCAL_INDEX_ENABLED:
+            self.local_index = LocalIndexManager(self.router)
+            self._background_tasks.append(asyncio.create_task(self.local_index.run()))
         try:
-            await asyncio.wait_for(self.qdrant.get_collections(), timeout=3.0)
-            self._ready = True
-            logger.info("Qdrant bağlantısı başarılı.", event_name="DB_CONNECTED")
+            # Bağlantılar ilk kullanıcı sorgusunda değil, açılışta kurulur
+            await self.router.warm_up()
+            logger.info(
+                "Qdrant bağlantısı başarılı.",
+                event_name="DB_CONNECTED",
+                transport="grpc" if use_grpc() else "rest",
+                replicas=[r.name for r in self.router.replicas if r.breaker.closed],
+                pool_size=self.router.replicas[0].pool.size,
+            )
         except Exception as e:
-            self._ready = False
             logger.warning(
                 "Qdrant ağına ulaşılamadı (DNS/Timeout). Servis Ghost Mode'da ayağa kalkıyor. Arka planda tekrar denenecek.",
                 event_name="DB_CONNECT_FAIL_GHOST_MODE",
                 error=str(e),
             )
-            # Ana thread'i bloklamadan arka planda bağlanmaya çalış
-            asyncio.create_task(self._background_reconnect())
 
-    async def _background_reconnect(self):
-        """Qdrant ayağa kalkana kadar sessizce bağlanmayı dener (Auto-Healing)"""
-        backoff = 5
-        while not self._ready:
-            await asyncio.sleep(backoff)
-            try:
-                if self.qdrant:
-                    await asyncio.wait_for(self.qdrant.get_collections(), timeout=3.0)
-                    self._ready = True
-                    logger.info(
-                        "Qdrant is back online. Syncing restored.",
-                        event_name="DB_RECONNECTED",
+    async def _warm_up_encoder(self):
+        """
+        Tokenizer ve kernel'lerin ilk çağrı maliyeti ilk kullanıcı sorgusuna
+        yansımasın: tekil ve batch'li encode'lar cache'i atlayarak çalıştırılır.
+        """
+        assert self.batcher is not None
+        for _ in range(settings.EMBEDDING_WARMUP_ROUNDS):
+            await self.batcher.encode(PARITY_SENTENCES[0])
+            await asyncio.gather(*(self.batcher.encode(t) for t in PARITY_SENTENCES))
+
+    async def _collection_version(self, tenant_id: str):
+        """
+        Tenant verisinin ucuz bir sürüm imzası (KB bilgisi + hafıza sayısı).
+        KB koleksiyonu olmayan (sadece hafızası olan) tenant'ta KB kısmı None'dır.
+        """
+        assert self.router is not None
+        kb_version = None
+        try:
+            kb_info = await self.router.call(
+                lambda client: client.get_collection(
+                    f"{settings.QDRANT_DB_COLLECTION_PREFIX}{tenant_id}"
+                )
+            )
+            kb_version = (
+                kb_info.points_count,
+                str(kb_info.status),
+                str(kb_info.optimizer_status),
+            )
+        except Exception as e:
+            if not is_not_found(e):
+                raise
+        mem_count = await self.router.call(
+            lambda client: client.count(
+                collection_name=MEMORY_COLLECTION,
+                count_filter=tenant_filter(tenant_id),
+                exact=True,
+            )
+        )
+        return kb_version, mem_count.count
+
+    def _versioned_caches(self) -> List[Union[SearchResultCache, SemanticResultCache]]:
+        """Koleksiyon sürümü değişince temizlenmesi gereken sonuç cache'leri."""
+        return [c for c in (self.result_cache, self.semantic_cache) if c is not None]
+
+    async def _watch_collection_versions(self):
+        """Cache'lenmiş tenant'ların koleksiyon sürümlerini arka planda izler."""
+        caches = self._versioned_caches()
+        while True:
+            await asyncio.sleep(settings.SEARCH_RESULT_CACHE_POLL_INTERVAL_SECONDS)
+            if not self._ready:
+                continue
+            tenant_ids = dict.fromkeys(t for cache in caches for t in cache.tenants())
+            for tenant_id in tenant_ids:
+                try:
+                    version = await asyncio.wait_for(
+                        self._collection_version(tenant_id),
+                        timeout=settings.QDRANT_CONNECT_TIMEOUT_SECONDS,
+                    )
+                except Exception as e:
+                    # Sürüm okunamıyorsa eski sonuçlara güvenme
+                    for cache in caches:
+                        cache.invalidate_tenant(tenant_id)
+                    logger.warning(
+                        "Collection version poll failed, tenant cache dropped",
+                        event_name="RESULT_CACHE_POLL_FAIL",
+                        tenant_id=tenant_id,
+                        error=str(e),
                     )
-                    break
-            except Exception:
-                backoff = min(backoff * 2, 60)  # Exponential backoff (max 60s)
+                    continue
+                for cache in caches:
+                    cache.observe_version(tenant_id, version)
 
     async def shutdown(self):
-        if self.qdrant:
-            await self.qdrant.close()
-        self._ready = False
+        for task in self._background_tasks:
+            task.cancel()
+        self._background_tasks.clear()
+        if self.batcher:
+            await self.batcher.stop()
+        if self.backend:
+            await asyncio.to_thread(self.backend.close)
+        if self.search_planner:
+            await self.search_planner.close()
+        if self.router:
+            await self.router.close()
+        if self.embedding_store:
+            await asyncio.to_thread(self.embedding_store.close)
+        self.embedding_store = None
+        self.router = None
+        self.catalog = None
+        self.local_index = None
+        self._warmed = False
         logger.info("RAG Engine: Kapatıldı.", event_name="RAG_ENGINE_STOPPED")
 
     async def check_health(self) -> bool:
-        if not self._ready or not self.model or not self.qdrant:
+        if not self._ready or not self.backend or not self._warmed:
             return False
         return True
 
-    async def search(
-        self, tenant_id: str, query_text: str, top_k: int = 5
-    ) -> List[QueryResult]:
-        if not self._ready or not self.model or not self.qdrant:
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Sorgu vektörünü döner; bellek cache'inde veya diskteki depoda varsa
+        modele hiç gitmez. Depodan dönen vektör memmap satırıdır (kopya yok).
+        """
+        assert self.batcher is not None
+        model_name = settings.QDRANT_DB_EMBEDDING_MODEL_NAME
+
+        with metrics.StageTimer(metrics.STAGE_ENCODE) as timer:
+            if self.embedding_cache is not None:
+                cached = self.embedding_cache.get(model_name, text)
+                if cached is not None:
+                    timer.outcome = metrics.OUTCOME_CACHE_HIT
+                    return cached
+            if self.embedding_store is not None:
+                stored = self.embedding_store.get(model_name, text)
+                if stored is not None:
+                    timer.outcome = metrics.OUTCOME_EMBEDDING_STORE
+                    return stored
+
+            # Çağıranın deadline'ı encode kuyruğunda da geçerli
+            timeout = time_left()
+            if timeout is None:
+                vector = await self.batcher.encode(text)
+            else:
+                try:
+                    vector = await asyncio.wait_for(self.batcher.encode(text), timeout)
+                except asyncio.TimeoutError:
+                    raise DeadlineExceededError(
+                        "Request deadline exceeded while encoding"
+                    ) from None
+        if self.embedding_cache is not None:
+            self.embedding_cache.put(model_name, text, vector)
+        if self.embedding_store is not None:
+            # Event loop'ta: kilit başka worker'daysa beklenmez, yazma atlanır
+            self.embedding_store.put(model_name, text, vector, wait=False)
+        return vector
+
+    def _ensure_ready(self):
+        if not self._ready or not self.batcher:
             logger.warning(
                 "Search rejected: Engine is in Ghost Mode (Qdrant offline)",
                 event_name="RAG_SEARCH_REJECTED",
             )
             raise RuntimeError("Engine is currently in Ghost Mode (Qdrant offline)")
 
+    async def _resolve_tenant(self, tenant_id: str) -> TenantInfo:
+        """
+        Hangi kaynakların aranacağını katalogdan okur; katalog kapalıysa ikisi de
+        aranır.
+        """
+        if self.catalog is None:
+            return TenantInfo()
+        info = await self.catalog.lookup(tenant_id)
+        if not info.search_kb and not info.search_memory:
+            logger.warning(
+                "Search rejected: unknown tenant",
+                event_name="RAG_TENANT_NOT_FOUND",
+                tenant_id=tenant_id,
+            )
+            raise TenantNotFoundError(f"Tenant '{tenant_id}' not found")
+        return info
+
+    def _check_dimension(self, info: TenantInfo, query_vector: List[float]):
+        if self.catalog is not None:
+            self.catalog.check_dimension(info, len(query_vector))
+
+    @staticmethod
+    async def _skipped_search(source: str) -> list:
+        """Katalog sonucu boş olacağını bildiği arama; Qdrant'a gidilmez."""
+        metrics.SEARCHES_SKIPPED_TOTAL.labels(source=source).inc()
+        return []
+
+    @staticmethod
+    def _kb_search_request(
+        query_vector: List[float], top_k: int, profile: SearchProfile
+    ) -> "models.SearchRequest":
+        from qdrant_client import models
+
+        return models.SearchRequest(
+            vector=query_vector,
+            limit=profile.reranker.candidate_limit(top_k),
+            score_threshold=profile.score_threshold,
+            with_payload=KB_PAYLOAD_FIELDS,
+            with_vector=profile.reranker.mmr_enabled,
+            params=profile.search_params(),
+        )
+
+    @staticmethod
+    def _memory_search_request(
+        tenant_id: str, query_vector: List[float], top_k: int, profile: SearchProfile
+    ) -> "models.SearchRequest":
+        from qdrant_client import models
+
+        return models.SearchRequest(
+            vector=query_vector,
+            limit=profile.reranker.candidate_limit(top_k),
+            score_threshold=profile.memory_score_threshold,
+            with_payload=MEMORY_PAYLOAD_FIELDS,
+            with_vector=profile.reranker.mmr_enabled,
+            filter=tenant_filter(tenant_id),
+            params=profile.search_params(),
+        )
+
+    @staticmethod
+    def _kb_hit(hit, score: float) -> SearchHit:
+        """--- A. KURUMSAL RAG SONUCU ---"""
+        payload = hit.payload or {}
+        return SearchHit(
+            payload.get("content", ""),
+            score,
+            payload.get("source_uri", "knowledge_base"),
+            _KB_METADATA,
+        )
+
+    @staticmethod
+    def _memory_hit(fact_data: dict, score: float) -> SearchHit:
+        """--- B. CRYSTALLINE BİLİŞSEL HAFIZA SONUCU ---"""
+        category = fact_data.get("category", "BİLGİ").upper()
+        summary = fact_data.get("summary", "")
+        return SearchHit(
+            f"[{category}]: {summary}",
+            score,
+            "cognitive_memory",
+            {"type": "personal_memory", "raw": orjson.dumps(fact_data).decode()},
+        )
+
+    @staticmethod
+    def _hit_vectors(hits: list) -> Optional[np.ndarray]:
+        """MMR için aday vektörleri; eksik veya isimli vektör varsa None."""
+        vectors = [hit.vector for hit in hits]
+        # Çoklu vektör (list of list) ve isimli vektör (dict) desteklenmez
+        if not vectors or not all(
+            isinstance(v, list) and v and not isinstance(v[0], list) for v in vectors
+        ):
+            return None
+        if len({len(v) for v in vectors}) != 1:
+            return None
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _select(
+        self, kb_hits: list, mem_hits: list, top_k: int, reranker: HybridReranker
+    ) -> List[SearchHit]:
+        """
+        Skorlar vektörel hesaplanır, top-k (veya MMR) seçilir; SearchHit sadece
+        dönecek adaylar için kurulur.
+        """
+        facts = [(hit.payload or {}).get("fact", {}) for hit in mem_hits]
+        scores = reranker.scores(
+            np.fromiter((hit.score for hit in kb_hits), np.float64, len(kb_hits)),
+            np.fromiter((hit.score for hit in mem_hits), np.float64, len(mem_hits)),
+            np.fromiter(
+                (float(fact.get("importance", 3)) for fact in facts),
+                np.float64,
+                len(facts),
+            ),
+        )
+        vectors = (
+            self._hit_vectors(kb_hits + mem_hits) if reranker.mmr_enabled else None
+        )
+        order = reranker.select(scores, top_k, vectors)
+        score_values = scores.tolist()
+
+        kb_count = len(kb_hits)
+        return [
+            self._kb_hit(kb_hits[i], score_values[i])
+            if i < kb_count
+            else self._memory_hit(facts[i - kb_count], score_values[i])
+            for i in order
+        ]
+
+    def _merge_results(
+        self, search_result, mem_result, top_k: int, profile: SearchProfile
+    ) -> List[SearchHit]:
+        """KB ve hafıza sonuçlarını birleştirir; hata dönen kaynak atlanır."""
+        kb_hits = search_result if isinstance(search_result, list) else []
+        mem_hits = mem_result if isinstance(mem_result, list) else []
+        with metrics.StageTimer(metrics.STAGE_MERGE):
+            final_results = self._select(kb_hits, mem_hits, top_k, profile.reranker)
+
+        logger.info(
+            "Hybrid RAG Search completed",
+            event_name="HYBRID_RAG_SUCCESS",
+            total_found=len(kb_hits) + len(mem_hits),
+            returned=len(final_results),
+            profile=profile.name,
+        )
+        return final_results
+
+    async def _search_kb(self, collection_name: str, request: "models.SearchRequest"):
+        assert self.search_planner is not None
+        with metrics.StageTimer(metrics.STAGE_KB_SEARCH) as timer:
+            # Küçük ve sıcak koleksiyonlar Qdrant'a gitmeden süreç içinde aranır
+            local_index = self.local_index
+            if local_index is not None:
+                index = local_index.get(collection_name)
+                if index is not None and index.can_serve(request):
+                    timer.outcome = metrics.OUTCOME_LOCAL_INDEX
+                    return await local_index.search(index, request)
+            return await self.search_planner.search(collection_name, request)
+
+    async def _search_memory(self, request: "models.SearchRequest"):
+        assert self.search_planner is not None
+        with metrics.StageTimer(metrics.STAGE_MEMORY_SEARCH):
+            return await self.search_planner.search(MEMORY_COLLECTION, request)
+
+    def _semantic_lookup(
+        self, tenant_id: str, vector: np.ndarray, top_k: int, profile: SearchProfile
+    ) -> Tuple[Optional[List[SearchHit]], int]:
+        """
+        Yakın-kopya sorgunun sonuçlarını (metadata'sında benzerlikle) ve
+        cache'e yazarken kullanılacak nesli döner; cache kapalıysa (None, 0).
+        """
+        if self.semantic_cache is None:
+            return None, 0
+        cached = self.semantic_cache.get(tenant_id, vector, top_k, profile.name)
+        if cached is None:
+            return None, self.semantic_cache.generation(tenant_id)
+        results, similarity = cached
+        tag = f"{similarity:.4f}"
+        return [
+            SearchHit(
+                content=hit.content,
+                score=hit.score,
+                source=hit.source,
+                metadata={**hit.metadata, SEMANTIC_CACHE_METADATA_KEY: tag},
+            )
+            for hit in results
+        ], 0
+
+    @staticmethod
+    def _shape(
+        results: List[SearchHit],
+        query_text: str,
+        profile: SearchProfile,
+        content: Optional[ContentOptions],
+    ) -> List[SearchHit]:
+        """
+        İçerik sınırı (istek > profil) yanıt öncesi uygulanır; cache'ler ve
+        birleşen istekler tam içeriği paylaşır.
+        """
+        max_chars, snippet = resolve_limit(
+            content, profile.max_content_chars, profile.snippet
+        )
+        return shape_hits(results, query_text, max_chars, snippet)
+
+    def _cache_results(
+        self,
+        tenant_id: str,
+        query_text: str,
+        vector: np.ndarray,
+        top_k: int,
+        profile: SearchProfile,
+        results: List[SearchHit],
+        cache_generation: int,
+        semantic_generation: int,
+    ):
+        """Tam sonuçları iki cache'e de yazar (kısmi sonuçlar için çağrılmaz)."""
+        if self.result_cache is not None:
+            self.result_cache.put(
+                tenant_id, query_text, top_k, results, cache_generation, profile.name
+            )
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(
+                tenant_id, vector, top_k, results, semantic_generation, profile.name
+            )
+
+    async def search(
+        self,
+        tenant_id: str,
+        query_text: str,
+        top_k: int = 5,
+        profile: Optional[str] = None,
+        content: Optional[ContentOptions] = None,
+    ) -> List[SearchHit]:
+        """
+        profile verilmezse tenant'a atanmış (yoksa varsayılan) arama profili
+        kullanılır; content verilen alanlarda profilin içerik sınırını ezer.
+        """
+        self._ensure_ready()
+        assert self.search_planner is not None
+        search_profile = self.profiles.resolve(tenant_id, profile)
+
+        cache_generation = 0
+        if self.result_cache is not None:
+            cached_results = self.result_cache.get(
+                tenant_id, query_text, top_k, search_profile.name
+            )
+            if cached_results is not None:
+                return self._shape(cached_results, query_text, search_profile, content)
+            cache_generation = self.result_cache.generation(tenant_id)
+
+        if self.coalescer is None:
+            results = await self._admitted_search(
+                tenant_id, query_text, top_k, search_profile, cache_generation
+            )
+        else:
+            # Aynı anda gelen kopyalar tek encode + tek Qdrant aramasını paylaşır
+            results = list(
+                await self.coalescer.do(
+                    (
+                        tenant_id,
+                        normalize_query(query_text),
+                        top_k,
+                        search_profile.name,
+                    ),
+                    lambda: self._admitted_search(
+                        tenant_id, query_text, top_k, search_profile, cache_generation
+                    ),
+                )
+            )
+        return self._shape(results, query_text, search_profile, content)
+
+    async def _admitted_search(
+        self,
+        tenant_id: str,
+        query_text: str,
+        top_k: int,
+        profile: SearchProfile,
+        cache_generation: int,
+    ) -> List[SearchHit]:
+        # Cache hit'ler slot harcamaz; aşırı yükte geri kalanı hızlıca reddedilir
+        async with self.admission.admit():
+            return await self._search_uncached(
+                tenant_id, query_text, top_k, profile, cache_generation
+            )
+
+    async def _search_uncached(
+        self,
+        tenant_id: str,
+        query_text: str,
+        top_k: int,
+        profile: SearchProfile,
+        cache_generation: int,
+    ) -> List[SearchHit]:
+        # Bilinmeyen tenant encode maliyeti ödenmeden reddedilir
+        tenant = await self._resolve_tenant(tenant_id)
         collection_name = f"{settings.QDRANT_DB_COLLECTION_PREFIX}{tenant_id}"
-        mem_collection = "sentiric_user_memories"
 
-        query_vector = self.model.encode(query_text).tolist()
+        # [ARCH-COMPLIANCE] Encode event loop'u bloklamaz, eşzamanlı isteklerle
+        # batch'lenir
+        vector = await self.embed(query_text)
+        query_vector = vector.tolist()
+        self._check_dimension(tenant, query_vector)
+
+        # Yakın-kopya sorgu yakın zamanda yanıtlandıysa Qdrant'a hiç gidilmez
+        semantic_results, semantic_generation = self._semantic_lookup(
+            tenant_id, vector, top_k, profile
+        )
+        if semantic_results is not None:
+            return semantic_results
 
         try:
-            search_task = self.qdrant.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=top_k,
-                score_threshold=settings.SCORE_THRESHOLD,
-                with_payload=True,
+            search_task = (
+                self._search_kb(
+                    collection_name,
+                    self._kb_search_request(query_vector, top_k, profile),
+                )
+                if tenant.search_kb
+                else self._skipped_search(STREAM_KNOWLEDGE_BASE)
             )
-
-            mem_search_task = self.qdrant.search(
-                collection_name=mem_collection,
-                query_vector=query_vector,
-                limit=top_k,
-                score_threshold=0.50,
-                with_payload=True,
-                query_filter={
-                    "must": [{"key": "tenant_id", "match": {"value": tenant_id}}]
-                },
+            mem_search_task = (
+                self._search_memory(
+                    self._memory_search_request(tenant_id, query_vector, top_k, profile)
+                )
+                if tenant.search_memory
+                else self._skipped_search(STREAM_MEMORY)
             )
 
             search_result, mem_result = await asyncio.wait_for(
                 asyncio.gather(search_task, mem_search_task, return_exceptions=True),
-                timeout=5.0,
+                timeout=remaining(settings.QDRANT_SEARCH_TIMEOUT_SECONDS),
             )
 
         except asyncio.TimeoutError:
@@ -148,56 +838,365 @@ class RAGEngine:
             )
             raise e
 
-        results = []
-
-        # --- A. KURUMSAL RAG SONUÇLARI ---
-        if isinstance(search_result, list):
-            for hit in search_result:
-                payload = hit.payload or {}
-                results.append(
-                    QueryResult(
-                        content=payload.get("content", ""),
-                        score=hit.score,
-                        source=payload.get("source_uri", "knowledge_base"),
-                        metadata={"type": "static_document"},
-                    )
+        final_results = self._merge_results(search_result, mem_result, top_k, profile)
+
+        # Kısmi (bir kaynağı hata vermiş) sonuçlar cache'lenmez
+        if isinstance(search_result, list) and isinstance(mem_result, list):
+            self._cache_results(
+                tenant_id,
+                query_text,
+                vector,
+                top_k,
+                profile,
+                final_results,
+                cache_generation,
+                semantic_generation,
+            )
+
+        return final_results
+
+    async def search_stream(
+        self,
+        tenant_id: str,
+        query_text: str,
+        top_k: int = 5,
+        profile: Optional[str] = None,
+        content: Optional[ContentOptions] = None,
+    ) -> AsyncIterator[Tuple[str, List[SearchHit]]]:
+        """
+        Her kaynak (KB / hafıza) tamamlandıkça (kaynak, sonuçlar) üretir,
+        en sonda birleştirilmiş top-k için ("final", sonuçlar) gelir.
+        """
+        self._ensure_ready()
+        search_profile = self.profiles.resolve(tenant_id, profile)
+
+        if self.result_cache is not None:
+            cached_results = self.result_cache.get(
+                tenant_id, query_text, top_k, search_profile.name
+            )
+            if cached_results is not None:
+                yield (
+                    STREAM_FINAL,
+                    self._shape(cached_results, query_text, search_profile, content),
                 )
+                return
+        cache_generation = (
+            self.result_cache.generation(tenant_id) if self.result_cache else 0
+        )
 
-        # --- B. CRYSTALLINE BİLİŞSEL HAFIZA SONUÇLARI ---
-        if isinstance(mem_result, list):
-            for hit in mem_result:
-                payload = hit.payload or {}
-                fact_data = payload.get("fact", {})
-                importance = float(fact_data.get("importance", 3)) / 5.0
-                final_score = (hit.score * 0.6) + (importance * 0.4)
-
-                category = fact_data.get("category", "BİLGİ").upper()
-                summary = fact_data.get("summary", "")
-                formatted_content = f"[{category}]: {summary}"
-
-                results.append(
-                    QueryResult(
-                        content=formatted_content,
-                        score=final_score,
-                        source="cognitive_memory",
-                        metadata={
-                            "type": "personal_memory",
-                            "raw": json.dumps(fact_data),
-                        },
+        # Arama ayrı bir task'ta slotu tutar ve frame'leri kuyruğa bırakır; yavaş
+        # okuyan istemci admission slotunu stream boyunca meşgul etmez
+        frames: "asyncio.Queue[Optional[StreamFrame]]" = asyncio.Queue()
+        producer = asyncio.ensure_future(
+            self._stream_frames(
+                tenant_id,
+                query_text,
+                top_k,
+                search_profile,
+                cache_generation,
+                frames.put_nowait,
+            )
+        )
+        producer.add_done_callback(lambda _: frames.put_nowait(None))
+        try:
+            while (frame := await frames.get()) is not None:
+                source, results = frame
+                yield source, self._shape(results, query_text, search_profile, content)
+            # Frame'ler bittiyse arama hatasını (tenant yok, timeout...) ilet
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    async def _stream_frames(
+        self,
+        tenant_id: str,
+        query_text: str,
+        top_k: int,
+        profile: SearchProfile,
+        cache_generation: int,
+        emit: Callable[[StreamFrame], None],
+    ) -> None:
+        """search_stream'in slot tutan arama kısmı; frame'ler emit ile iletilir."""
+        async with self.admission.admit():
+            tenant = await self._resolve_tenant(tenant_id)
+            collection_name = f"{settings.QDRANT_DB_COLLECTION_PREFIX}{tenant_id}"
+            vector = await self.embed(query_text)
+            query_vector = vector.tolist()
+            self._check_dimension(tenant, query_vector)
+
+            semantic_results, semantic_generation = self._semantic_lookup(
+                tenant_id, vector, top_k, profile
+            )
+            if semantic_results is not None:
+                emit((STREAM_FINAL, semantic_results))
+                return
+
+            # Atlanan kaynak için frame üretilmez (boş frame'ler zaten gönderilmez)
+            tasks: Dict[asyncio.Future, str] = {}
+            if tenant.search_kb:
+                tasks[
+                    asyncio.ensure_future(
+                        self._search_kb(
+                            collection_name,
+                            self._kb_search_request(query_vector, top_k, profile),
+                        )
+                    )
+                ] = STREAM_KNOWLEDGE_BASE
+            else:
+                metrics.SEARCHES_SKIPPED_TOTAL.labels(
+                    source=STREAM_KNOWLEDGE_BASE
+                ).inc()
+            if tenant.search_memory:
+                tasks[
+                    asyncio.ensure_future(
+                        self._search_memory(
+                            self._memory_search_request(
+                                tenant_id, query_vector, top_k, profile
+                            )
+                        )
                     )
+                ] = STREAM_MEMORY
+            else:
+                metrics.SEARCHES_SKIPPED_TOTAL.labels(source=STREAM_MEMORY).inc()
+            pending = set(tasks)
+            deadline = asyncio.get_running_loop().time() + remaining(
+                settings.QDRANT_SEARCH_TIMEOUT_SECONDS
+            )
+            collected: Dict[str, list] = {STREAM_KNOWLEDGE_BASE: [], STREAM_MEMORY: []}
+            failed_sources = 0
+
+            try:
+                while pending:
+                    left = deadline - asyncio.get_running_loop().time()
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=max(left, 0),
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        logger.error(
+                            "Qdrant search timed out.", event_name="DB_SEARCH_TIMEOUT"
+                        )
+                        raise TimeoutError("Vector DB request timed out")
+
+                    for task in done:
+                        source = tasks[task]
+                        if task.exception() is not None:
+                            # gather(return_exceptions=True) gibi: kaynak atlanır
+                            failed_sources += 1
+                            logger.warning(
+                                "Stream source failed",
+                                event_name="RAG_STREAM_SOURCE_ERROR",
+                                source=source,
+                                error=str(task.exception()),
+                            )
+                            continue
+                        hits = task.result()
+                        collected[source] = hits
+                        reranker = profile.reranker
+                        if source == STREAM_KNOWLEDGE_BASE:
+                            partial = self._select(hits, [], top_k, reranker)
+                        else:
+                            partial = self._select([], hits, top_k, reranker)
+                        emit((source, partial))
+            finally:
+                # Stream erken kapanırsa (task iptali) açıkta kalan aramaları iptal et
+                for task in pending:
+                    task.cancel()
+
+            final_results = self._merge_results(
+                collected[STREAM_KNOWLEDGE_BASE],
+                collected[STREAM_MEMORY],
+                top_k,
+                profile,
+            )
+            if failed_sources == 0:
+                self._cache_results(
+                    tenant_id,
+                    query_text,
+                    vector,
+                    top_k,
+                    profile,
+                    final_results,
+                    cache_generation,
+                    semantic_generation,
                 )
+            emit((STREAM_FINAL, final_results))
 
-        results.sort(key=lambda x: x.score, reverse=True)
-        final_results = results[:top_k]
+    async def search_batch(
+        self, items: List[BatchItem]
+    ) -> List[Union[List[SearchHit], Exception]]:
+        """
+        Birden fazla (tenant_id, sorgu, top_k, profil, içerik sınırı) için toplu arama.
+        Sorgular tek forward pass'te encode edilir, Qdrant aramaları planner
+        üzerinden koleksiyon başına tek query_batch_points isteğinde gider.
+        Hatalar öğe bazında döner.
+        """
+        self._ensure_ready()
+        assert self.search_planner is not None
 
-        logger.info(
-            "Hybrid RAG Search completed",
-            event_name="HYBRID_RAG_SUCCESS",
-            total_found=len(results),
-            returned=len(final_results),
+        outcomes: List[Union[List[SearchHit], Exception, None]] = [None] * len(items)
+        generations: Dict[int, int] = {}
+        profiles: Dict[int, SearchProfile] = {}
+        pending: List[int] = []
+
+        for idx, (tenant_id, query_text, top_k, profile, _) in enumerate(items):
+            if not tenant_id or not query_text:
+                outcomes[idx] = ValueError("tenant_id and query are required")
+                continue
+            try:
+                profiles[idx] = self.profiles.resolve(tenant_id, profile)
+            except ValueError as e:
+                outcomes[idx] = e
+                continue
+            if self.result_cache is not None:
+                cached_results = self.result_cache.get(
+                    tenant_id, query_text, top_k, profiles[idx].name
+                )
+                if cached_results is not None:
+                    outcomes[idx] = cached_results
+                    continue
+                generations[idx] = self.result_cache.generation(tenant_id)
+            pending.append(idx)
+
+        if pending:
+            async with self.admission.admit():
+                await self._search_pending(
+                    items, pending, outcomes, generations, profiles
+                )
+
+        results: List[Union[List[SearchHit], Exception]] = []
+        for idx, outcome in enumerate(outcomes):
+            if outcome is None:
+                results.append(RuntimeError("Item was not processed"))
+            elif isinstance(outcome, Exception):
+                results.append(outcome)
+            else:
+                _, query_text, _, _, content = items[idx]
+                results.append(self._shape(outcome, query_text, profiles[idx], content))
+        return results
+
+    async def _search_pending(
+        self,
+        items: List[BatchItem],
+        pending: List[int],
+        outcomes: List[Union[List[SearchHit], Exception, None]],
+        generations: Dict[int, int],
+        profiles: Dict[int, SearchProfile],
+    ):
+        """search_batch'in cache'te olmayan öğeleri; sonuçlar outcomes'a yazılır."""
+        tenants: Dict[int, TenantInfo] = {}
+        resolved = await asyncio.gather(
+            *(self._resolve_tenant(items[idx][0]) for idx in pending),
+            return_exceptions=True,
         )
+        for idx, tenant in zip(list(pending), resolved):
+            if isinstance(tenant, BaseException):
+                outcomes[idx] = (
+                    tenant
+                    if isinstance(tenant, Exception)
+                    else RuntimeError(str(tenant))
+                )
+                pending.remove(idx)
+            else:
+                tenants[idx] = tenant
 
-        return final_results
+        # Aynı anda kuyruğa girdikleri için batcher bunları tek forward pass'te işler
+        vectors = await asyncio.gather(
+            *(self.embed(items[idx][1]) for idx in pending), return_exceptions=True
+        )
+
+        searches: List[Tuple[int, asyncio.Future, asyncio.Future]] = []
+        item_vectors: Dict[int, np.ndarray] = {}
+        semantic_generations: Dict[int, int] = {}
+        for idx, vector in zip(pending, vectors):
+            if isinstance(vector, BaseException):
+                outcomes[idx] = (
+                    vector
+                    if isinstance(vector, Exception)
+                    else RuntimeError(str(vector))
+                )
+                continue
+            tenant_id, _, top_k, _, _ = items[idx]
+            tenant = tenants[idx]
+            profile = profiles[idx]
+            query_vector = vector.tolist()
+            try:
+                self._check_dimension(tenant, query_vector)
+            except Exception as e:
+                outcomes[idx] = e
+                continue
+            semantic_results, semantic_generations[idx] = self._semantic_lookup(
+                tenant_id, vector, top_k, profile
+            )
+            if semantic_results is not None:
+                outcomes[idx] = semantic_results
+                continue
+            item_vectors[idx] = vector
+            collection_name = f"{settings.QDRANT_DB_COLLECTION_PREFIX}{tenant_id}"
+            # Planner aynı turdaki aramaları koleksiyon başına tek istekte birleştirir
+            searches.append(
+                (
+                    idx,
+                    asyncio.ensure_future(
+                        self._search_kb(
+                            collection_name,
+                            self._kb_search_request(query_vector, top_k, profile),
+                        )
+                        if tenant.search_kb
+                        else self._skipped_search(STREAM_KNOWLEDGE_BASE)
+                    ),
+                    asyncio.ensure_future(
+                        self._search_memory(
+                            self._memory_search_request(
+                                tenant_id, query_vector, top_k, profile
+                            )
+                        )
+                        if tenant.search_memory
+                        else self._skipped_search(STREAM_MEMORY)
+                    ),
+                )
+            )
+
+        all_tasks = [task for _, kb, mem in searches for task in (kb, mem)]
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*all_tasks, return_exceptions=True),
+                timeout=remaining(settings.QDRANT_SEARCH_TIMEOUT_SECONDS),
+            )
+        except asyncio.TimeoutError:
+            logger.error("Qdrant search timed out.", event_name="DB_SEARCH_TIMEOUT")
+            timeout_error = TimeoutError("Vector DB request timed out")
+            for idx in pending:
+                if outcomes[idx] is None:
+                    outcomes[idx] = timeout_error
+            return
+
+        kb_hits: Dict[int, object] = {}
+        mem_hits: Dict[int, object] = {}
+        for idx, kb_task, mem_task in searches:
+            kb_hits[idx] = kb_task.exception() or kb_task.result()
+            mem_hits[idx] = mem_task.exception() or mem_task.result()
+
+        for idx in kb_hits:
+            tenant_id, query_text, top_k, _, _ = items[idx]
+            search_result, mem_result = kb_hits[idx], mem_hits.get(idx)
+            final_results = self._merge_results(
+                search_result, mem_result, top_k, profiles[idx]
+            )
+            outcomes[idx] = final_results
+            if isinstance(search_result, list) and isinstance(mem_result, list):
+                self._cache_results(
+                    tenant_id,
+                    query_text,
+                    item_vectors[idx],
+                    top_k,
+                    profiles[idx],
+                    final_results,
+                    generations.get(idx, 0),
+                    semantic_generations[idx],
+                )
 
 
 engine = RAGEngine()
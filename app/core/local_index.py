@@ -0,0 +1,403 @@
+# app/core/local_index.py
+import asyncio
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.qdrant import KB_PAYLOAD_FIELDS
+from app.core.rerank import top_k_indices
+from app.core.routing import ReplicaRouter, is_not_found
+
+if TYPE_CHECKING:
+    from qdrant_client import models
+
+logger = structlog.get_logger()
+
+REFRESH_LOADED = "loaded"
+REFRESH_INCREMENTAL = "incremental"
+REFRESH_FULL = "full"
+REFRESH_UNCHANGED = "unchanged"
+REFRESH_FAILED = "failed"
+
+# Eviction sebepleri; tam yenilemede uygunluk kaybı kendi sebebiyle yazılır
+# (too_large, named_vectors, distance, memory_budget)
+EVICT_IDLE = "idle"
+EVICT_TOO_LARGE = "too_large"
+EVICT_GONE = "collection_gone"
+
+# Bu kadar elemanın (satır x boyut) altındaki matrislerde çarpım event loop'ta
+# yapılır; üstünde thread'e devredilir (thread geçişi matris çarpımından ucuz kalsın)
+_INLINE_MAX_ELEMENTS = 256 * 1024
+
+
+class _TooLarge(Exception):
+    """Tarama sırasında koleksiyon LOCAL_INDEX_MAX_POINTS'i aştı."""
+
+
+@dataclass
+class LocalHit:
+    """Engine'in okuduğu ScoredPoint alanları (id, score, payload, vector)."""
+
+    id: Any
+    score: float
+    payload: Optional[dict]
+    vector: Optional[List[float]]
+
+
+def _memmap(rows: list, dimension: int) -> np.ndarray:
+    """
+    Vektör satırlarını dosya destekli bir float32 memmap'e yazar; dosya hemen
+    silinir (eşleme açık kaldıkça yaşar). Sayfalar anonim heap yerine page
+    cache'te tutulur. Liste dönüşümü de pahalı olduğu için thread'de çağrılır.
+    """
+    matrix = np.asarray(rows, dtype=np.float32).reshape(len(rows), dimension)
+    if matrix.size == 0:
+        return matrix
+    fd, path = tempfile.mkstemp(
+        prefix="kqs-index-", suffix=".f32", dir=settings.LOCAL_INDEX_DIR or None
+    )
+    try:
+        mapped = np.memmap(path, dtype=np.float32, mode="w+", shape=matrix.shape)
+        mapped[:] = matrix
+    finally:
+        os.close(fd)
+        os.unlink(path)
+    return mapped
+
+
+class LocalIndex:
+    """
+    Tek bir KB koleksiyonunun salt-okunur kopyası: float32 matris + payload
+    tablosu.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        ids: List[Any],
+        matrix: np.ndarray,
+        payloads: List[Optional[dict]],
+        cosine: bool,
+        built_at: Optional[float] = None,
+    ):
+        self.collection_name = collection_name
+        self.ids = ids
+        self.matrix = matrix
+        self.payloads = payloads
+        # Cosine koleksiyonlarda Qdrant vektörleri normalize saklar; sorgu da
+        # normalize edilir
+        self.cosine = cosine
+        # Son tam yüklemenin zamanı (artımlı yenilemeler taşır)
+        self.built_at = built_at if built_at is not None else time.monotonic()
+        self.position = {point_id: row for row, point_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    @staticmethod
+    def can_serve(request: "models.SearchRequest") -> bool:
+        """Filtreli veya sayfalı aramalar Qdrant'a bırakılır."""
+        return request.filter is None and not request.offset
+
+    def search(self, request: "models.SearchRequest") -> List[LocalHit]:
+        """
+        Tam (exact) iç çarpım araması; Qdrant'ın skor eşiği ve limit semantiği
+        korunur.
+        """
+        if len(self.ids) == 0:
+            return []
+        query = np.asarray(request.vector, dtype=np.float32)
+        if self.cosine:
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.matrix @ query
+
+        hits = []
+        for row in top_k_indices(scores, request.limit):
+            score = float(scores[row])
+            if request.score_threshold is not None and score < request.score_threshold:
+                break
+            hits.append(
+                LocalHit(
+                    self.ids[row],
+                    score,
+                    self.payloads[row] if request.with_payload else None,
+                    self.matrix[row].tolist() if request.with_vector else None,
+                )
+            )
+        return hits
+
+
+class LocalIndexManager:
+    """
+    Küçük ve sık sorgulanan KB koleksiyonlarını süreç içinde tutar. Sorgu sayıları
+    her yenileme turunda değerlendirilir; eşiği geçen ve LOCAL_INDEX_MAX_POINTS
+    altındaki koleksiyonlar salt-okunur scroll ile yüklenir. Yüklü olanlar id
+    taramasıyla artımlı tazelenir, yerinde güncellemeler için periyodik tam
+    yükleme yapılır. Sadece okuma API'si kullanılır (CQRS).
+    """
+
+    def __init__(self, router: ReplicaRouter):
+        self._router = router
+        self._max_points = settings.LOCAL_INDEX_MAX_POINTS
+        self._max_bytes = settings.LOCAL_INDEX_MAX_BYTES
+        self._min_queries = settings.LOCAL_INDEX_MIN_QUERIES
+        self._refresh_interval = settings.LOCAL_INDEX_REFRESH_SECONDS
+        self._full_refresh = settings.LOCAL_INDEX_FULL_REFRESH_SECONDS
+        self._idle = settings.LOCAL_INDEX_IDLE_SECONDS
+        self._batch_size = settings.LOCAL_INDEX_SCROLL_BATCH_SIZE
+
+        self._indexes: Dict[str, LocalIndex] = {}
+        self._queries: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        # Uygun olmayan (büyük / isimli vektörlü / desteklenmeyen metrik) koleksiyonlar
+        self._ineligible: Dict[str, float] = {}
+
+    def get(self, collection_name: str) -> Optional[LocalIndex]:
+        """Yüklüyse koleksiyonun kopyası; her çağrı sorgu sayısına eklenir."""
+        self._queries[collection_name] = self._queries.get(collection_name, 0) + 1
+        index = self._indexes.get(collection_name)
+        if index is not None:
+            self._last_used[collection_name] = time.monotonic()
+        return index
+
+    @staticmethod
+    async def search(
+        index: LocalIndex, request: "models.SearchRequest"
+    ) -> List[LocalHit]:
+        if index.matrix.size <= _INLINE_MAX_ELEMENTS:
+            return index.search(request)
+        # BLAS GIL'i bırakır; büyük matrislerde event loop bloklanmaz
+        return await asyncio.to_thread(index.search, request)
+
+    def _total_bytes(self) -> int:
+        return sum(index.nbytes for index in self._indexes.values())
+
+    def _publish(self):
+        metrics.LOCAL_INDEX_COLLECTIONS.set(len(self._indexes))
+        metrics.LOCAL_INDEX_BYTES.set(self._total_bytes())
+
+    def _evict(self, collection_name: str, reason: str):
+        index = self._indexes.pop(collection_name, None)
+        self._last_used.pop(collection_name, None)
+        if index is None:
+            return
+        metrics.LOCAL_INDEX_EVICTIONS_TOTAL.labels(reason=reason).inc()
+        logger.info(
+            "Local index dropped",
+            event_name="LOCAL_INDEX_EVICTED",
+            collection=collection_name,
+            reason=reason,
+            points=len(index),
+        )
+        self._publish()
+
+    async def _scroll(
+        self, collection_name: str, with_data: bool
+    ) -> List["models.Record"]:
+        """Koleksiyonu baştan sona tarar; with_data=False iken sadece id'ler gelir."""
+        records: List["models.Record"] = []
+        offset = None
+        while True:
+            # Lambda hemen await edilir; offset'in o anki değeri kullanılır
+            batch, offset = await self._router.call(
+                lambda client: client.scroll(
+                    collection_name=collection_name,
+                    limit=self._batch_size,
+                    offset=offset,
+                    with_payload=KB_PAYLOAD_FIELDS if with_data else False,
+                    with_vectors=with_data,
+                )
+            )
+            records.extend(batch)
+            if len(records) > self._max_points:
+                raise _TooLarge(collection_name)
+            if offset is None:
+                return records
+
+    async def _retrieve(
+        self, collection_name: str, ids: List[Any]
+    ) -> List["models.Record"]:
+        records: List["models.Record"] = []
+        for start in range(0, len(ids), self._batch_size):
+            chunk = ids[start : start + self._batch_size]
+            records.extend(
+                await self._router.call(
+                    lambda client: client.retrieve(
+                        collection_name=collection_name,
+                        ids=chunk,
+                        with_payload=KB_PAYLOAD_FIELDS,
+                        with_vectors=True,
+                    )
+                )
+            )
+        return records
+
+    def _eligibility(
+        self, collection_name: str, info
+    ) -> Tuple[Optional[str], bool, int]:
+        """(uygun değilse sebep, cosine mi, vektör boyutu)."""
+        from qdrant_client import models
+
+        vectors = info.config.params.vectors
+        if not isinstance(vectors, models.VectorParams):
+            return "named_vectors", False, 0
+        if vectors.distance not in (models.Distance.COSINE, models.Distance.DOT):
+            return "distance", False, 0
+        if (info.points_count or 0) > self._max_points:
+            return "too_large", False, 0
+        estimated = (info.points_count or 0) * vectors.size * 4
+        current = self._indexes.get(collection_name)
+        used = self._total_bytes() - (current.nbytes if current is not None else 0)
+        if used + estimated > self._max_bytes:
+            return "memory_budget", False, 0
+        return None, vectors.distance == models.Distance.COSINE, vectors.size
+
+    async def _load(self, collection_name: str, refresh_result: str = REFRESH_LOADED):
+        info = await self._router.call(
+            lambda client: client.get_collection(collection_name)
+        )
+        reason, cosine, dimension = self._eligibility(collection_name, info)
+        if reason is not None:
+            if reason != "memory_budget":
+                self._ineligible[collection_name] = time.monotonic()
+            # Tam yenilemede uygunluğunu yitiren koleksiyonun kopyası düşürülür
+            self._evict(collection_name, reason)
+            logger.debug(
+                "Collection not eligible for local index",
+                event_name="LOCAL_INDEX_SKIPPED",
+                collection=collection_name,
+                reason=reason,
+            )
+            return
+
+        started = time.perf_counter()
+        records = await self._scroll(collection_name, with_data=True)
+        index = LocalIndex(
+            collection_name,
+            [r.id for r in records],
+            await asyncio.to_thread(_memmap, [r.vector for r in records], dimension),
+            [r.payload for r in records],
+            cosine,
+        )
+        self._indexes[collection_name] = index
+        self._last_used.setdefault(collection_name, time.monotonic())
+        metrics.LOCAL_INDEX_REFRESH_TOTAL.labels(result=refresh_result).inc()
+        logger.info(
+            "Local index built",
+            event_name="LOCAL_INDEX_LOADED",
+            collection=collection_name,
+            points=len(index),
+            bytes=index.nbytes,
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+        self._publish()
+
+    async def _refresh_index(self, index: LocalIndex):
+        """Id kümesi farkıyla artımlı tazeleme; süresi dolduysa tam yeniden yükleme."""
+        name = index.collection_name
+        if time.monotonic() - index.built_at >= self._full_refresh:
+            await self._load(name, REFRESH_FULL)
+            return
+
+        current = [record.id for record in await self._scroll(name, with_data=False)]
+        added = [point_id for point_id in current if point_id not in index.position]
+        kept = [
+            index.position[point_id]
+            for point_id in current
+            if point_id in index.position
+        ]
+        if not added and len(kept) == len(index):
+            metrics.LOCAL_INDEX_REFRESH_TOTAL.labels(result=REFRESH_UNCHANGED).inc()
+            return
+
+        new_records = await self._retrieve(name, added)
+        rows = list(index.matrix[kept]) + [r.vector for r in new_records]
+        # Okuyucular eski nesneyi tutmaya devam eder; referans atomik değişir
+        self._indexes[name] = LocalIndex(
+            name,
+            [index.ids[row] for row in kept] + [r.id for r in new_records],
+            await asyncio.to_thread(_memmap, rows, index.matrix.shape[1]),
+            [index.payloads[row] for row in kept] + [r.payload for r in new_records],
+            index.cosine,
+            built_at=index.built_at,
+        )
+        metrics.LOCAL_INDEX_REFRESH_TOTAL.labels(result=REFRESH_INCREMENTAL).inc()
+        logger.debug(
+            "Local index refreshed",
+            event_name="LOCAL_INDEX_REFRESHED",
+            collection=name,
+            added=len(added),
+            removed=len(index) - len(kept),
+        )
+        self._publish()
+
+    async def _guarded(self, collection_name: str, refresh):
+        try:
+            await refresh
+        except _TooLarge:
+            self._ineligible[collection_name] = time.monotonic()
+            self._evict(collection_name, EVICT_TOO_LARGE)
+        except Exception as e:
+            if is_not_found(e):
+                self._evict(collection_name, EVICT_GONE)
+                return
+            metrics.LOCAL_INDEX_REFRESH_TOTAL.labels(result=REFRESH_FAILED).inc()
+            logger.warning(
+                "Local index refresh failed",
+                event_name="LOCAL_INDEX_REFRESH_FAIL",
+                collection=collection_name,
+                error=str(e),
+            )
+
+    async def refresh(self):
+        """
+        Boşta kalanları düşürür, yüklüleri tazeler, yeni sıcak koleksiyonları
+        yükler.
+        """
+        queries, self._queries = self._queries, {}
+        now = time.monotonic()
+
+        for name in list(self._indexes):
+            if now - self._last_used.get(name, now) > self._idle:
+                self._evict(name, EVICT_IDLE)
+        for index in list(self._indexes.values()):
+            await self._guarded(index.collection_name, self._refresh_index(index))
+
+        # Uygun olmayan koleksiyonlar tam yenileme aralığında bir tekrar denenir
+        for name, checked_at in list(self._ineligible.items()):
+            if now - checked_at > self._full_refresh:
+                del self._ineligible[name]
+        hot = sorted(
+            (
+                name
+                for name, count in queries.items()
+                if count >= self._min_queries
+                and name not in self._indexes
+                and name not in self._ineligible
+            ),
+            key=queries.__getitem__,
+            reverse=True,
+        )
+        for name in hot:
+            await self._guarded(name, self._load(name))
+
+    async def run(self):
+        """
+        Arka plan döngüsü; Qdrant yokken yüklü kopyalar olduğu gibi kullanılmaya
+        devam eder.
+        """
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            if self._router.available():
+                await self.refresh()
@@ -1,12 +1,32 @@
+import atexit
 import logging
+import queue
+import random
 import sys
 import os
-import uuid
+import threading
+import time
+import zlib
+import orjson
 import structlog
-from datetime import datetime, timezone
+from typing import Dict, List, Optional, TextIO
 from app.core.config import settings
 
 _log_setup_done = False
+_writer: Optional["AsyncLogWriter"] = None
+
+_ZERO_TRACE_ID = "00000000-0000-0000-0000-000000000000"
+_SEVERITIES: Dict[str, str] = {}
+
+# [ARCH-COMPLIANCE] Her kayıtta aynı kalan alanlar bir kez hesaplanır
+_RESOURCE = {
+    "service.name": settings.PROJECT_NAME.lower()
+    .replace(" ", "-")
+    .replace("sentiric-", ""),
+    "service.version": settings.SERVICE_VERSION,
+    "service.env": settings.ENV,
+    "host.name": settings.NODE_NAME,
+}
 
 os.environ["TRANSFORMERS_VERBOSITY"] = "error"
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -33,6 +53,37 @@ class InterceptHandler(logging.Handler):
         )
 
 
+class _Timestamp:
+    """RFC3339 UTC zaman damgası; saniye kısmı saniyede bir kez biçimlenir."""
+
+    __slots__ = ("_cached",)
+
+    def __init__(self):
+        # (saniye, biçimlenmiş önek) tek atamada değişir; yazıcı thread'i de okur
+        self._cached = (-1, "")
+
+    def __call__(self) -> str:
+        now = time.time()
+        second = int(now)
+        cached_second, prefix = self._cached
+        if second != cached_second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._cached = (second, prefix)
+        return f"{prefix}.{int((now - second) * 1_000_000):06d}Z"
+
+
+_timestamp = _Timestamp()
+
+
+def _severity(method_name: str) -> str:
+    severity = _SEVERITIES.get(method_name)
+    if severity is None:
+        severity = _SEVERITIES[method_name] = (
+            method_name.upper() if method_name else "INFO"
+        )
+    return severity
+
+
 def suts_v4_processor(logger, method_name: str, event_dict: dict) -> dict:
     message = event_dict.pop("event", "")
     suts_event = event_dict.pop("event_name", event_dict.pop("event_id", "LOG_EVENT"))
@@ -42,9 +93,10 @@ def suts_v4_processor(logger, method_name: str, event_dict: dict) -> dict:
     tenant_id = event_dict.pop("tenant_id", settings.TENANT_ID)
 
     if not trace_id:
-        trace_id = "00000000-0000-0000-0000-000000000000"
+        trace_id = _ZERO_TRACE_ID
     if not span_id:
-        span_id = str(uuid.uuid4())
+        # uuid4 + str() yerine 64 bit rastgele span id (W3C formatı)
+        span_id = f"{random.getrandbits(64):016x}"
 
     event_dict.pop("timestamp", None)
     event_dict.pop("level", None)
@@ -52,25 +104,190 @@ def suts_v4_processor(logger, method_name: str, event_dict: dict) -> dict:
 
     return {
         "schema_v": "1.0.0",
-        "ts": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-        "severity": method_name.upper() if method_name else "INFO",
+        "ts": _timestamp(),
+        "severity": _severity(method_name),
         "tenant_id": tenant_id,
-        "resource": {
-            "service.name": settings.PROJECT_NAME.lower()
-            .replace(" ", "-")
-            .replace("sentiric-", ""),
-            "service.version": settings.SERVICE_VERSION,
-            "service.env": settings.ENV,
-            "host.name": settings.NODE_NAME,
-        },
+        "resource": _RESOURCE,
         "trace_id": trace_id,
         "span_id": span_id,
         "event": suts_event,
-        "message": str(message),
+        "message": message if isinstance(message, str) else str(message),
         "attributes": event_dict,
     }
 
 
+def render_json(logger, method_name: str, event_dict: dict) -> str:
+    """
+    JSONRenderer yerine orjson: satır event loop'ta ~10 kat hızlı render
+    edilir. JSON'a uymayan değerler eskisi gibi repr() ile yazılır.
+    """
+    return orjson.dumps(
+        event_dict, default=repr, option=orjson.OPT_NON_STR_KEYS
+    ).decode("utf-8")
+
+
+class SuccessSampler:
+    """
+    İstek başına başarı loglarını (LOG_SAMPLED_EVENTS) LOG_SUCCESS_SAMPLE_RATE
+    oranında tutar. Karar trace_id'den türetilir: bir isteğin ya tüm başarı
+    satırları ya hiçbiri yazılır. WARNING ve üstü asla elenmez.
+    """
+
+    def __init__(self, rate: float, events: List[str]):
+        self._threshold = int(max(0.0, min(1.0, rate)) * 0xFFFFFFFF)
+        self._events = frozenset(events)
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        if (
+            method_name not in ("debug", "info")
+            or event_dict.get("event_name") not in self._events
+        ):
+            return event_dict
+        trace_id = event_dict.get("trace_id") or ""
+        if zlib.crc32(str(trace_id).encode("utf-8")) > self._threshold:
+            raise structlog.DropEvent
+        return event_dict
+
+
+class AsyncLogWriter:
+    """
+    Render edilmiş satırları sınırlı bir kuyruktan ayrı bir thread'de toplu
+    yazar; event loop stdout'a hiç bloklanmaz. Kuyruk doluysa satır atılır,
+    atılan sayısı bir sonraki flush'ta LOG_RECORDS_DROPPED olarak yazılır.
+    """
+
+    _BATCH_MAX_LINES = 512
+
+    def __init__(self, stream: TextIO, max_queue: int, flush_interval_ms: float):
+        self._stream = stream
+        self._max_queue = max(1, max_queue)
+        self._flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self._start()
+        # Supervisor fork ederken yazım ortasında tutulan kilit çocuğa geçmesin
+        os.register_at_fork(
+            before=self._before_fork,
+            after_in_parent=self._after_fork_in_parent,
+            after_in_child=self._start,
+        )
+        atexit.register(self.close)
+
+    def _start(self):
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(self._max_queue)
+        self._write_lock = threading.Lock()
+        # write() event loop'ta artırır, _flush() yazıcı thread'inde sıfırlar
+        self._dropped_lock = threading.Lock()
+        self._dropped = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _before_fork(self):
+        self._write_lock.acquire()
+
+    def _after_fork_in_parent(self):
+        self._write_lock.release()
+
+    def write(self, line: str):
+        if self._closed:
+            # Kapanıştan sonra gelen satırlar doğrudan yazılır
+            self._flush([line])
+            return
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def _run(self):
+        while True:
+            line = self._queue.get()
+            if line is None:
+                return
+            batch = [line]
+            # Kısa bir süre biriktirip tek write + flush ile bas
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._BATCH_MAX_LINES:
+                timeout = deadline - time.monotonic()
+                try:
+                    line = (
+                        self._queue.get(timeout=timeout)
+                        if timeout > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if line is None:
+                    self._flush(batch)
+                    return
+                batch.append(line)
+            self._flush(batch)
+
+    def _flush(self, batch: List[str]):
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            batch.append(_dropped_record(dropped))
+        with self._write_lock:
+            try:
+                self._stream.write("\n".join(batch) + "\n")
+                self._stream.flush()
+            except (OSError, ValueError):
+                # stdout kapanmış olabilir (kapanış); log yüzünden thread ölmesin
+                pass
+
+    def close(self):
+        """Kuyrukta kalanları yazar (atexit)."""
+        if self._closed:
+            return
+        self._closed = True
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=1.0)
+        except queue.Full:
+            return
+        self._thread.join(timeout=5.0)
+
+
+def _dropped_record(count: int) -> str:
+    return render_json(
+        None,
+        "warning",
+        suts_v4_processor(
+            None,
+            "warning",
+            {
+                "event": "Log queue overflowed, records dropped",
+                "event_name": "LOG_RECORDS_DROPPED",
+                "dropped": count,
+            },
+        ),
+    )
+
+
+class QueueLogger:
+    """structlog'un son halkası: render edilmiş satırı yazıcı kuyruğuna bırakır."""
+
+    def __init__(self, writer: AsyncLogWriter):
+        self._writer = writer
+
+    def msg(self, message: str):
+        self._writer.write(message)
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+
+class QueueLoggerFactory:
+    def __init__(self, writer: AsyncLogWriter):
+        self._writer = writer
+
+    def __call__(self, *args) -> QueueLogger:
+        return QueueLogger(self._writer)
+
+
 def setup_logging():
     global _log_setup_done
     if _log_setup_done:
@@ -109,16 +326,31 @@ def setup_logging():
     for n in noisy_loggers:
         logging.getLogger(n).setLevel(logging.ERROR)
 
+    # add_log_level gereksiz: severity doğrudan method_name'den gelir
     shared_processors = [
         structlog.contextvars.merge_contextvars,
-        structlog.processors.add_log_level,
+        SuccessSampler(
+            settings.LOG_SUCCESS_SAMPLE_RATE,
+            [e.strip() for e in settings.LOG_SAMPLED_EVENTS.split(",") if e.strip()],
+        ),
         suts_v4_processor,
-        structlog.processors.JSONRenderer(),
+        render_json,
     ]
 
+    global _writer
+    if settings.LOG_ASYNC_ENABLED:
+        _writer = AsyncLogWriter(
+            sys.stdout,
+            max_queue=settings.LOG_QUEUE_MAX_RECORDS,
+            flush_interval_ms=settings.LOG_FLUSH_INTERVAL_MS,
+        )
+        logger_factory = QueueLoggerFactory(_writer)
+    else:
+        logger_factory = structlog.WriteLoggerFactory(file=sys.stdout)
+
     structlog.configure(
         processors=shared_processors,
-        logger_factory=structlog.WriteLoggerFactory(file=sys.stdout),
+        logger_factory=logger_factory,
         wrapper_class=structlog.make_filtering_bound_logger(
             getattr(logging, log_level)
         ),
@@ -1,40 +1,350 @@
 # app/core/metrics.py
 import asyncio
+import os
+import time
+from contextvars import ContextVar
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Optional
 from prometheus_client import (
+    CollectorRegistry,
     Counter,
     Gauge,
     Histogram,
     Info,
     generate_latest,
+    multiprocess,
     REGISTRY,
 )
+from prometheus_client.openmetrics import exposition as openmetrics
 import structlog
+from structlog.contextvars import get_contextvars
 from app.core.config import settings
 
 logger = structlog.get_logger()
 
+TRANSPORT_HTTP = "http"
+TRANSPORT_GRPC = "grpc"
+TRANSPORT_INTERNAL = "internal"
+
+STAGE_ENCODE = "encode"
+STAGE_KB_SEARCH = "kb_search"
+STAGE_MEMORY_SEARCH = "memory_search"
+STAGE_MERGE = "merge"
+STAGE_SERIALIZATION = "serialization"
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_CACHE_HIT = "cache_hit"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_CANCELLED = "cancelled"
+# KB araması Qdrant yerine süreç içi kopyadan yanıtlandı
+OUTCOME_LOCAL_INDEX = "local_index"
+# Sorgu vektörü diskteki embedding deposundan okundu
+OUTCOME_EMBEDDING_STORE = "embedding_store"
+
+# Alt sınırı düşük tutulmuş gecikme bucket'ları (cache hit'ler mikro saniyeler sürer)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
 SERVICE_INFO = Info("service_info", "Knowledge Query Service static information")
 REQUESTS_TOTAL = Counter(
     "requests_total",
-    "Total number of requests by method and status code.",
-    ["method", "status_code"],
+    "Total number of requests by transport, method and status code.",
+    ["transport", "method", "status_code"],
 )
 REQUEST_LATENCY_SECONDS = Histogram(
-    "request_latency_seconds", "Request latency in seconds.", ["method"]
+    "request_latency_seconds",
+    "Request latency in seconds.",
+    ["transport", "method"],
+    buckets=LATENCY_BUCKETS,
 )
 REQUESTS_IN_PROGRESS = Gauge(
-    "requests_in_progress", "Number of requests currently in progress.", ["method"]
+    "requests_in_progress",
+    "Number of requests currently in progress.",
+    ["transport", "method"],
+    multiprocess_mode="livesum",
+)
+STAGE_LATENCY_SECONDS = Histogram(
+    "request_stage_latency_seconds",
+    "Time spent in each query stage "
+    "(encode, kb_search, memory_search, merge, serialization).",
+    ["stage", "transport", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Embedding micro-batching
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Number of queries encoded in a single forward pass.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+EMBEDDING_QUEUE_WAIT_SECONDS = Histogram(
+    "embedding_queue_wait_seconds",
+    "Time an encode request waited in the batching queue.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Qdrant search planner
+QDRANT_SEARCH_BATCH_SIZE = Histogram(
+    "qdrant_search_batch_size",
+    "Number of searches sent to Qdrant in a single query_batch_points round trip.",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+# Qdrant replica routing
+QDRANT_REPLICA_LATENCY_SECONDS = Histogram(
+    "qdrant_replica_latency_seconds",
+    "Latency of successful Qdrant calls per read replica.",
+    ["replica"],
+)
+QDRANT_REPLICA_BREAKER_STATE = Gauge(
+    "qdrant_replica_breaker_state",
+    "Circuit breaker state per read replica (0=closed, 1=half-open, 2=open).",
+    ["replica"],
+    multiprocess_mode="livemax",
+)
+QDRANT_HEDGED_REQUESTS_TOTAL = Counter(
+    "qdrant_hedged_requests_total",
+    "Qdrant calls that were duplicated to a second replica after the hedge delay.",
+)
+
+# Açılış
+STARTUP_PHASE_SECONDS = Gauge(
+    "startup_phase_seconds",
+    "Wall-clock duration of each startup phase "
+    "(imports, model_load, qdrant_connect, warmup, total).",
+    ["phase"],
+    multiprocess_mode="max",
+)
+
+# Embedding cache
+EMBEDDING_CACHE_HITS_TOTAL = Counter(
+    "embedding_cache_hits_total", "Query embeddings served from the cache."
+)
+EMBEDDING_CACHE_MISSES_TOTAL = Counter(
+    "embedding_cache_misses_total", "Query embeddings not found in the cache."
+)
+EMBEDDING_CACHE_EVICTIONS_TOTAL = Counter(
+    "embedding_cache_evictions_total",
+    "Embedding cache entries evicted, by reason (size or ttl).",
+    ["reason"],
+)
+EMBEDDING_CACHE_BYTES = Gauge(
+    "embedding_cache_bytes",
+    "Approximate memory held by the embedding cache.",
+    multiprocess_mode="livesum",
+)
+
+# Kalıcı embedding deposu (dosya tüm worker'larda ortaktır)
+EMBEDDING_STORE_HITS_TOTAL = Counter(
+    "embedding_store_hits_total", "Query embeddings served from the on-disk store."
+)
+EMBEDDING_STORE_MISSES_TOTAL = Counter(
+    "embedding_store_misses_total", "Query embeddings not found in the on-disk store."
+)
+EMBEDDING_STORE_WRITES_TOTAL = Counter(
+    "embedding_store_writes_total",
+    "Embeddings written to the on-disk store, by result (stored, full or busy).",
+    ["result"],
+)
+EMBEDDING_STORE_ENTRIES = Gauge(
+    "embedding_store_entries",
+    "Number of embeddings in the on-disk store.",
+    multiprocess_mode="max",
+)
+
+# Search result cache
+SEARCH_RESULT_CACHE_HITS_TOTAL = Counter(
+    "search_result_cache_hits_total", "Hybrid search results served from the cache."
+)
+SEARCH_RESULT_CACHE_MISSES_TOTAL = Counter(
+    "search_result_cache_misses_total", "Hybrid searches not found in the cache."
+)
+SEARCH_RESULT_CACHE_INVALIDATIONS_TOTAL = Counter(
+    "search_result_cache_invalidations_total",
+    "Search result cache entries dropped, by reason.",
+    ["reason"],
 )
 
+# Aynı (tenant, sorgu, top_k) için eşzamanlı aramaların tek task'ta birleşmesi.
+# Birleşme oranı: rate(follower) / rate(leader + follower)
+SEARCH_COALESCING_TOTAL = Counter(
+    "search_coalescing_total",
+    "Searches by coalescing role: leader runs the search, follower shares it.",
+    ["role"],
+)
+SEARCH_COALESCING_CALLERS = Histogram(
+    "search_coalescing_callers",
+    "Number of callers that shared one backend search.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+# Semantik (yakın-kopya sorgu) sonuç cache'i
+SEMANTIC_CACHE_HITS_TOTAL = Counter(
+    "semantic_cache_hits_total",
+    "Hybrid searches answered from a near-duplicate query's cached results.",
+)
+SEMANTIC_CACHE_MISSES_TOTAL = Counter(
+    "semantic_cache_misses_total",
+    "Hybrid searches with no cached query above the similarity threshold.",
+)
+SEMANTIC_CACHE_INVALIDATIONS_TOTAL = Counter(
+    "semantic_cache_invalidations_total",
+    "Semantic cache tenants dropped, by reason.",
+    ["reason"],
+)
+SEMANTIC_CACHE_HIT_SIMILARITY = Histogram(
+    "semantic_cache_hit_similarity",
+    "Cosine similarity between a query and the cached query that answered it.",
+    buckets=(0.9, 0.95, 0.96, 0.97, 0.98, 0.99, 0.995, 0.999, 1.0),
+)
+SEMANTIC_CACHE_ENTRIES = Gauge(
+    "semantic_cache_entries",
+    "Query vectors held by the semantic cache.",
+    multiprocess_mode="livesum",
+)
+
+# Admission control
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Searches currently holding an admission slot.",
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Searches waiting for an admission slot.",
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_WAIT_SECONDS = Histogram(
+    "admission_queue_wait_seconds",
+    "Time a search waited in the admission queue.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+ADMISSION_REJECTED_TOTAL = Counter(
+    "admission_rejected_total",
+    "Searches shed before running, by reason "
+    "(queue_full, queue_timeout, deadline_expired).",
+    ["reason"],
+)
+
+# Tenant kataloğu
+TENANT_CATALOG_LOOKUPS_TOTAL = Counter(
+    "tenant_catalog_lookups_total",
+    "Tenant catalog lookups, by how they were answered "
+    "(listed, probed, negative_cached, unknown).",
+    ["result"],
+)
+TENANT_CATALOG_COLLECTIONS = Gauge(
+    "tenant_catalog_collections",
+    "Collections currently known to the tenant catalog.",
+    multiprocess_mode="max",
+)
+SEARCHES_SKIPPED_TOTAL = Counter(
+    "searches_skipped_total",
+    "Qdrant searches skipped because the catalog knows they cannot return hits, "
+    "by source.",
+    ["source"],
+)
+
+# Yanıt boyutu sınırı: uzun içeriklerin kısaltılması (prefix | snippet)
+SEARCH_CONTENT_TRUNCATED_TOTAL = Counter(
+    "search_content_truncated_total",
+    "Result contents shortened to the max content length, by mode.",
+    ["mode"],
+)
+
+# Süreç içi KB kopyaları
+LOCAL_INDEX_COLLECTIONS = Gauge(
+    "local_index_collections",
+    "KB collections currently served from the in-process index.",
+    multiprocess_mode="max",
+)
+LOCAL_INDEX_BYTES = Gauge(
+    "local_index_bytes",
+    "Vector bytes held by in-process KB indexes.",
+    multiprocess_mode="livesum",
+)
+LOCAL_INDEX_REFRESH_TOTAL = Counter(
+    "local_index_refresh_total",
+    "In-process index loads and refreshes, by result "
+    "(loaded, incremental, full, unchanged, failed).",
+    ["result"],
+)
+LOCAL_INDEX_EVICTIONS_TOTAL = Counter(
+    "local_index_evictions_total",
+    "In-process indexes dropped, by reason.",
+    ["reason"],
+)
+
+
+# İsteğin hangi giriş noktasından geldiği; engine aşamaları bu etiketi okur
+_transport: ContextVar[str] = ContextVar(
+    "metrics_transport", default=TRANSPORT_INTERNAL
+)
+
+
+def bind_transport(transport: str):
+    _transport.set(transport)
+
+
+def trace_exemplar(trace_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """
+    Loglardaki trace_id'yi exemplar olarak iliştirir (OpenMetrics 128 karakter
+    sınırı).
+    """
+    trace_id = trace_id or get_contextvars().get("trace_id")
+    if not trace_id:
+        return None
+    return {"trace_id": str(trace_id)[:64]}
+
+
+class StageTimer:
+    """
+    Bir sorgu aşamasının süresini STAGE_LATENCY_SECONDS'a yazar. Sonuç istisnaya
+    göre belirlenir; gövde içinden `timer.outcome` ile değiştirilebilir (ör. cache_hit).
+    """
+
+    __slots__ = ("stage", "outcome", "_started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.outcome = OUTCOME_SUCCESS
+        self._started = 0.0
+
+    def __enter__(self) -> "StageTimer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            if issubclass(exc_type, asyncio.CancelledError):
+                self.outcome = OUTCOME_CANCELLED
+            elif issubclass(exc_type, (TimeoutError, asyncio.TimeoutError)):
+                self.outcome = OUTCOME_TIMEOUT
+            else:
+                self.outcome = OUTCOME_ERROR
+        STAGE_LATENCY_SECONDS.labels(
+            stage=self.stage, transport=_transport.get(), outcome=self.outcome
+        ).observe(time.perf_counter() - self._started, exemplar=trace_exemplar())
+
 
 class MetricsHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path == "/metrics":
+            # Exemplar'lar sadece OpenMetrics formatında görünür
+            accept = self.headers.get("Accept", "")
+            if "application/openmetrics-text" in accept:
+                content_type = openmetrics.CONTENT_TYPE_LATEST
+                body = openmetrics.generate_latest(self.server.registry)  # type: ignore[attr-defined]
+            else:
+                content_type = "text/plain; version=0.0.4"
+                body = generate_latest(self.server.registry)  # type: ignore[attr-defined]
             self.send_response(200)
-            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Type", content_type)
             self.end_headers()
-            self.wfile.write(generate_latest(REGISTRY))
+            self.wfile.write(body)
         else:
             self.send_response(404)
             self.end_headers()
@@ -44,9 +354,38 @@ class MetricsHandler(BaseHTTPRequestHandler):
         pass
 
 
+class MetricsHTTPServer(HTTPServer):
+    registry: CollectorRegistry = REGISTRY
+
+
+def multiprocess_enabled() -> bool:
+    """Supervisor, worker'ları fork etmeden önce PROMETHEUS_MULTIPROC_DIR'i ayarlar."""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def build_multiprocess_metrics_server() -> MetricsHTTPServer:
+    """
+    Supervisor'ın tek /metrics endpoint'i: tüm worker'ların mmap dosyalarını
+    toplar. Supervisor tek thread'li kalsın diye handle_request ile sürülür.
+    (prometheus_client multiprocess modunda exemplar desteklemez.)
+    """
+    port = settings.KNOWLEDGE_QUERY_SERVICE_METRICS_PORT
+    server = MetricsHTTPServer(("", port), MetricsHandler)
+    server.registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(server.registry)
+    server.timeout = 0.5
+    logger.info(
+        "Aggregated metrics server starting...",
+        event_name="METRICS_SERVER_START",
+        address=f"http://0.0.0.0:{port}/metrics",
+        multiprocess=True,
+    )
+    return server
+
+
 async def start_metrics_server():
     port = settings.KNOWLEDGE_QUERY_SERVICE_METRICS_PORT
-    server = HTTPServer(("", port), MetricsHandler)
+    server = MetricsHTTPServer(("", port), MetricsHandler)
     logger.info(
         "Metrics server starting...",
         event_name="METRICS_SERVER_START",
@@ -0,0 +1,155 @@
+# app/core/profiles.py
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.rerank import HybridReranker
+
+if TYPE_CHECKING:
+    from qdrant_client import models
+
+DEFAULT_PROFILE = "default"
+
+# SEARCH_PROFILES ile aynı isimde tanım verilirse alanları bunların üzerine yazılır
+BUILTIN_PROFILES: Dict[str, Dict[str, Any]] = {
+    DEFAULT_PROFILE: {},
+    "fast": {"hnsw_ef": 32, "quantization_rescore": False},
+    "accurate": {
+        "hnsw_ef": 256,
+        "quantization_rescore": True,
+        "quantization_oversampling": 2.0,
+    },
+    "exact": {"exact": True},
+}
+
+
+class UnknownSearchProfileError(ValueError):
+    """
+    İstekte veya tenant eşlemesinde tanımsız profil adı (HTTP 400 /
+    INVALID_ARGUMENT).
+    """
+
+
+@dataclass
+class SearchProfile:
+    """
+    Adlandırılmış arama ayarları: Qdrant search_params (hnsw_ef, exact,
+    quantization rescore / oversampling), skor eşikleri, hafıza ağırlıkları ve
+    içerik uzunluğu sınırı.
+    None olan Qdrant parametreleri koleksiyonun varsayılanında kalır.
+    """
+
+    name: str
+    hnsw_ef: Optional[int] = None
+    exact: bool = False
+    quantization_rescore: Optional[bool] = None
+    quantization_oversampling: Optional[float] = None
+    score_threshold: float = settings.SCORE_THRESHOLD
+    memory_score_threshold: float = settings.MEMORY_SCORE_THRESHOLD
+    memory_similarity_weight: float = settings.RERANK_MEMORY_SIMILARITY_WEIGHT
+    memory_importance_weight: float = settings.RERANK_MEMORY_IMPORTANCE_WEIGHT
+    # Yanıttaki içerik uzunluğu sınırı (0 = sınırsız) ve sorgu odaklı snippet
+    max_content_chars: int = settings.CONTENT_MAX_CHARS
+    snippet: bool = settings.CONTENT_SNIPPET_ENABLED
+    reranker: HybridReranker = field(init=False, repr=False, compare=False)
+    _params: Optional["models.SearchParams"] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        self.reranker = HybridReranker(
+            kb_weight=settings.RERANK_KB_WEIGHT,
+            memory_similarity_weight=self.memory_similarity_weight,
+            memory_importance_weight=self.memory_importance_weight,
+            candidate_multiplier=settings.RERANK_CANDIDATE_MULTIPLIER,
+            mmr_enabled=settings.RERANK_MMR_ENABLED,
+            mmr_lambda=settings.RERANK_MMR_LAMBDA,
+            duplicate_threshold=settings.RERANK_MMR_DUPLICATE_THRESHOLD,
+        )
+
+    @classmethod
+    def from_definition(cls, name: str, definition: Dict[str, Any]) -> "SearchProfile":
+        allowed = {f.name for f in fields(cls) if f.init and f.name != "name"}
+        unknown = set(definition) - allowed
+        if unknown:
+            raise ValueError(
+                f"Search profile {name!r} has unknown fields: {sorted(unknown)}"
+            )
+        return cls(name=name, **definition)
+
+    def search_params(self) -> Optional["models.SearchParams"]:
+        """Qdrant SearchRequest.params; hiçbir parametre verilmemişse None."""
+        if (
+            not self.exact
+            and self.hnsw_ef is None
+            and self.quantization_rescore is None
+            and self.quantization_oversampling is None
+        ):
+            return None
+        if self._params is None:
+            from qdrant_client import models
+
+            quantization = None
+            if (
+                self.quantization_rescore is not None
+                or self.quantization_oversampling is not None
+            ):
+                quantization = models.QuantizationSearchParams(
+                    rescore=self.quantization_rescore,
+                    oversampling=self.quantization_oversampling,
+                )
+            self._params = models.SearchParams(
+                hnsw_ef=self.hnsw_ef, exact=self.exact, quantization=quantization
+            )
+        return self._params
+
+
+class SearchProfiles:
+    """
+    Profil tanımları ve tenant eşlemesi. Seçim sırası: istekteki profil adı,
+    tenant'a atanmış profil, SEARCH_PROFILE_DEFAULT.
+    """
+
+    def __init__(
+        self,
+        definitions: Dict[str, Dict[str, Any]],
+        tenant_profiles: Dict[str, str],
+        default: str = DEFAULT_PROFILE,
+    ):
+        merged = {name: dict(d) for name, d in BUILTIN_PROFILES.items()}
+        for name, definition in definitions.items():
+            merged.setdefault(name, {}).update(definition)
+        self._profiles = {
+            name: SearchProfile.from_definition(name, definition)
+            for name, definition in merged.items()
+        }
+        for tenant_id, name in tenant_profiles.items():
+            if name not in self._profiles:
+                raise ValueError(
+                    f"Tenant {tenant_id!r} is mapped to unknown profile {name!r}"
+                )
+        self._tenant_profiles = dict(tenant_profiles)
+        self.default = self.get(default)
+
+    @classmethod
+    def from_settings(cls) -> "SearchProfiles":
+        return cls(
+            settings.SEARCH_PROFILES,
+            settings.SEARCH_PROFILE_TENANTS,
+            settings.SEARCH_PROFILE_DEFAULT,
+        )
+
+    def names(self) -> List[str]:
+        return list(self._profiles)
+
+    def get(self, name: str) -> SearchProfile:
+        profile = self._profiles.get(name)
+        if profile is None:
+            raise UnknownSearchProfileError(f"Unknown search profile: {name}")
+        return profile
+
+    def resolve(self, tenant_id: str, requested: Optional[str] = None) -> SearchProfile:
+        if requested:
+            return self.get(requested)
+        name = self._tenant_profiles.get(tenant_id)
+        return self.get(name) if name else self.default
@@ -0,0 +1,249 @@
+# app/core/qdrant.py
+import asyncio
+import itertools
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import httpx
+import structlog
+
+from app.core import metrics
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient, models
+
+    from app.core.routing import ReplicaRouter
+
+logger = structlog.get_logger()
+
+
+def _grpc_options() -> dict:
+    return {
+        "grpc.keepalive_time_ms": settings.QDRANT_GRPC_KEEPALIVE_TIME_MS,
+        "grpc.keepalive_timeout_ms": settings.QDRANT_GRPC_KEEPALIVE_TIMEOUT_MS,
+        "grpc.keepalive_permit_without_calls": 1,
+        "grpc.http2.max_pings_without_data": 0,
+        # 768 boyutlu vektör + büyük payload'lar için varsayılan 4MB yetmeyebilir
+        "grpc.max_receive_message_length": 64 * 1024 * 1024,
+    }
+
+
+def use_grpc() -> bool:
+    return bool(settings.QDRANT_GRPC_URL) and settings.QDRANT_PREFER_GRPC
+
+
+# Engine'in okuduğu payload alanları; Qdrant'tan sadece bunlar istenir
+# (büyük metadata alanları ağdan gelmez, deserialize edilmez)
+KB_PAYLOAD_FIELDS = ["content", "source_uri"]
+MEMORY_PAYLOAD_FIELDS = ["fact"]
+
+
+def tenant_filter(tenant_id: str) -> "models.Filter":
+    """Paylaşılan hafıza koleksiyonunda tenant izolasyon filtresi."""
+    from qdrant_client import models
+
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="tenant_id", match=models.MatchValue(value=tenant_id)
+            )
+        ]
+    )
+
+
+def build_qdrant_client(
+    http_url: Optional[str] = None, grpc_host: Optional[str] = None
+) -> "AsyncQdrantClient":
+    """
+    Yapılandırmaya göre Qdrant istemcisi üretir. QDRANT_GRPC_URL varsa protobuf
+    taşıyıcısı (prefer_grpc), yoksa keep-alive havuzlu REST kullanılır.
+    grpc_host verilirse (okuma replica'ları) QDRANT_GRPC_URL'nin sadece portu
+    kullanılır.
+    """
+    from qdrant_client import AsyncQdrantClient
+
+    http_url = http_url or settings.QDRANT_HTTP_URL
+    timeout = max(1, int(round(settings.QDRANT_SEARCH_TIMEOUT_SECONDS)))
+
+    if use_grpc():
+        grpc_url = settings.QDRANT_GRPC_URL or ""
+        grpc_endpoint = urlparse(
+            grpc_url if "://" in grpc_url else f"http://{grpc_url}"
+        )
+        http_endpoint = urlparse(http_url)
+        return AsyncQdrantClient(
+            host=grpc_host or grpc_endpoint.hostname or http_endpoint.hostname,
+            port=http_endpoint.port or 6333,
+            grpc_port=grpc_endpoint.port or 6334,
+            prefer_grpc=True,
+            https=grpc_endpoint.scheme == "https",
+            api_key=settings.QDRANT_API_KEY,
+            timeout=timeout,
+            grpc_options=_grpc_options(),
+        )
+
+    return AsyncQdrantClient(
+        url=http_url,
+        api_key=settings.QDRANT_API_KEY,
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=settings.QDRANT_POOL_SIZE,
+            max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+            keepalive_expiry=settings.QDRANT_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+
+
+class QdrantPool:
+    """
+    Qdrant bağlantı havuzu. gRPC'de her istemci kendi HTTP/2 kanalını açar ve
+    istekler round-robin dağıtılır; REST'te tek istemci httpx havuzunu kullanır.
+    """
+
+    def __init__(self, http_url: Optional[str] = None, grpc_host: Optional[str] = None):
+        self.http_url = http_url or settings.QDRANT_HTTP_URL
+        size = max(1, settings.QDRANT_POOL_SIZE) if use_grpc() else 1
+        self._clients: List["AsyncQdrantClient"] = [
+            build_qdrant_client(self.http_url, grpc_host) for _ in range(size)
+        ]
+        self._cycle = itertools.cycle(self._clients)
+
+    @property
+    def size(self) -> int:
+        return len(self._clients)
+
+    def client(self) -> "AsyncQdrantClient":
+        return next(self._cycle)
+
+    async def warm_up(self):
+        """
+        Bağlantıları ilk kullanıcı sorgusundan önce açar. REST'te havuz boyutu
+        kadar eşzamanlı istek httpx'in keep-alive bağlantılarını doldurur.
+        """
+        calls = max(self.size, settings.QDRANT_POOL_SIZE)
+        await asyncio.gather(
+            *(self._clients[i % self.size].get_collections() for i in range(calls))
+        )
+
+    async def close(self):
+        for client in self._clients:
+            await client.close()
+
+
+def query_request(request: "models.SearchRequest") -> "models.QueryRequest":
+    """
+    SearchRequest'i Query API isteğine çevirir; search_batch qdrant-client'ta
+    deprecated olduğundan aramalar query_batch_points ile gönderilir.
+    """
+    from qdrant_client import models
+
+    # Engine düz (isimsiz) dense vektör gönderir; isimli vektör "using" olur
+    query: Any = request.vector
+    using = None
+    if isinstance(request.vector, models.NamedVector):
+        query, using = request.vector.vector, request.vector.name
+    return models.QueryRequest(
+        query=query,
+        using=using,
+        filter=request.filter,
+        params=request.params,
+        limit=request.limit,
+        offset=request.offset,
+        with_payload=request.with_payload,
+        with_vector=request.with_vector,
+        score_threshold=request.score_threshold,
+    )
+
+
+class QdrantSearchPlanner:
+    """
+    Eşzamanlı aramaları koleksiyon başına toplayıp tek query_batch_points
+    isteğinde gönderir. Tek sorgu yine KB ve hafıza için iki istek yapar (farklı
+    koleksiyonlar); kazanç eşzamanlı / toplu (search_batch) sorgulardadır.
+    max_wait 0 iken aynı event loop turunda gelenler birleşir; embedding
+    batcher'ı aynı anda çözülen sorguları zaten aynı turda buraya düşürür.
+    Batch'in hangi replica'ya gideceğine router karar verir.
+    """
+
+    def __init__(
+        self, router: "ReplicaRouter", max_batch_size: int, max_wait_ms: float
+    ):
+        self._router = router
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: Dict[
+            str, List[Tuple["models.SearchRequest", asyncio.Future]]
+        ] = {}
+        self._timers: Dict[str, asyncio.Handle] = {}
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def search(
+        self, collection_name: str, request: "models.SearchRequest"
+    ) -> List["models.ScoredPoint"]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = self._pending.setdefault(collection_name, [])
+        group.append((request, future))
+
+        if len(group) >= self._max_batch_size:
+            self._flush(collection_name)
+        elif collection_name not in self._timers:
+            if self._max_wait > 0:
+                self._timers[collection_name] = loop.call_later(
+                    self._max_wait, self._flush, collection_name
+                )
+            else:
+                self._timers[collection_name] = loop.call_soon(
+                    self._flush, collection_name
+                )
+        return await future
+
+    def _flush(self, collection_name: str):
+        timer = self._timers.pop(collection_name, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(collection_name, [])
+        # İptal edilmiş (timeout'a düşmüş) aramaları Qdrant'a gönderme
+        group = [(request, future) for request, future in group if not future.done()]
+        if not group:
+            return
+
+        task = asyncio.create_task(self._execute(collection_name, group))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _execute(
+        self,
+        collection_name: str,
+        group: List[Tuple["models.SearchRequest", asyncio.Future]],
+    ):
+        metrics.QDRANT_SEARCH_BATCH_SIZE.observe(len(group))
+        try:
+            requests = [query_request(request) for request, _ in group]
+            responses = await self._router.call(
+                lambda client: client.query_batch_points(
+                    collection_name=collection_name, requests=requests
+                )
+            )
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), response in zip(group, responses):
+            if not future.done():
+                future.set_result(response.points)
+
+    async def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for group in self._pending.values():
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(RuntimeError("Search planner stopped"))
+        self._pending.clear()
+        for task in list(self._inflight):
+            task.cancel()
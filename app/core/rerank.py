@@ -0,0 +1,119 @@
+# app/core/rerank.py
+import math
+from typing import List, Optional
+
+import numpy as np
+
+# Hafıza önem derecesi 1-5 arası tutulur; 0-1'e ölçeklenir
+MEMORY_IMPORTANCE_SCALE = 5.0
+
+# Aday sayısı k'nın bu katından azsa argpartition'ın ek geçişi tam sıralamadan pahalıdır
+_PARTITION_MIN_RATIO = 4
+
+# Bundan az adayda numpy çağrılarının sabit maliyeti Python sort'unu geçer
+_PYTHON_SORT_MAX_CANDIDATES = 64
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> List[int]:
+    """Skoru en yüksek k adayın indeksleri, azalan sırada (eşitlikte ilk gelen önde)."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return []
+    if n < _PYTHON_SORT_MAX_CANDIDATES:
+        values = scores.tolist()
+        return sorted(range(n), key=values.__getitem__, reverse=True)[:k]
+    negated = -scores
+    if n < k * _PARTITION_MIN_RATIO:
+        return np.argsort(negated, kind="stable")[:k].tolist()
+    candidates = np.argpartition(negated, k - 1)[:k]
+    return candidates[np.argsort(negated[candidates], kind="stable")].tolist()
+
+
+def mmr_indices(
+    scores: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    mmr_lambda: float,
+    duplicate_threshold: float,
+) -> List[int]:
+    """
+    Maximal Marginal Relevance: her adımda lambda * skor - (1 - lambda) *
+    (seçilmişlere en yüksek kosinüs benzerliği) en büyük aday seçilir. Seçilmiş
+    bir adaya benzerliği duplicate_threshold'u aşan adaylar hiç dönmez, bu
+    yüzden k'dan az sonuç dönebilir.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return []
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.maximum(norms, 1e-12)
+
+    relevance = mmr_lambda * scores
+    penalty = np.zeros(n, dtype=np.float64)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        marginal = np.where(
+            available, relevance - (1.0 - mmr_lambda) * penalty, -np.inf
+        )
+        pick = int(np.argmax(marginal))
+        selected.append(pick)
+        # n x n matris yerine sadece seçilen adayın benzerlik satırı hesaplanır
+        similarity = unit @ unit[pick]
+        available[pick] = False
+        available &= similarity < duplicate_threshold
+        np.maximum(penalty, similarity, out=penalty)
+    return selected
+
+
+class HybridReranker:
+    """
+    KB ve hafıza adaylarını tek bir skor vektöründe birleştirir:
+    KB = benzerlik * kb_weight, hafıza = benzerlik * memory_similarity_weight +
+    (önem / 5) * memory_importance_weight. Skorlar KB adayları önde olacak
+    şekilde sıralıdır; select() bu sıraya göre indeks döner.
+    """
+
+    def __init__(
+        self,
+        kb_weight: float,
+        memory_similarity_weight: float,
+        memory_importance_weight: float,
+        candidate_multiplier: float = 1.0,
+        mmr_enabled: bool = False,
+        mmr_lambda: float = 0.7,
+        duplicate_threshold: float = 0.95,
+    ):
+        self.kb_weight = kb_weight
+        self.memory_similarity_weight = memory_similarity_weight
+        self.memory_importance_weight = memory_importance_weight
+        self.candidate_multiplier = max(1.0, candidate_multiplier)
+        self.mmr_enabled = mmr_enabled
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+
+    def candidate_limit(self, top_k: int) -> int:
+        """Kaynak başına Qdrant'tan istenecek aday sayısı."""
+        return math.ceil(top_k * self.candidate_multiplier)
+
+    def scores(
+        self,
+        kb_scores: np.ndarray,
+        memory_scores: np.ndarray,
+        memory_importance: np.ndarray,
+    ) -> np.ndarray:
+        memory = memory_scores * self.memory_similarity_weight
+        memory += memory_importance * (
+            self.memory_importance_weight / MEMORY_IMPORTANCE_SCALE
+        )
+        return np.concatenate((kb_scores * self.kb_weight, memory))
+
+    def select(
+        self, scores: np.ndarray, k: int, vectors: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """Vektör yoksa (veya MMR kapalıysa) düz top-k'ya düşülür."""
+        if self.mmr_enabled and vectors is not None:
+            return mmr_indices(
+                scores, vectors, k, self.mmr_lambda, self.duplicate_threshold
+            )
+        return top_k_indices(scores, k)
@@ -0,0 +1,19 @@
+# app/core/results.py
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass
+class SearchHit:
+    """
+    Motorun iç sonuç tipi; Pydantic doğrulamasından geçmez. HTTP'de orjson ile
+    doğrudan JSON'a, gRPC'de QueryResponse.results.add() ile protobuf'a yazılır.
+    """
+
+    # slots=True kullanılmaz: orjson __dict__'li dataclass'ları ~5 kat hızlı
+    # serileştirir
+    content: str
+    score: float
+    source: str
+    # Paylaşılan sabit dict'ler olabilir; yerinde değiştirilmez
+    metadata: Dict[str, str]
@@ -0,0 +1,308 @@
+# app/core/routing.py
+import asyncio
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Awaitable, Callable, Deque, List, Optional, TypeVar
+from urllib.parse import urlparse
+
+import grpc
+import structlog
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.qdrant import QdrantPool
+
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+# Replica'nın kendisinden değil, isteğin içeriğinden kaynaklanan gRPC hataları
+_CLIENT_SIDE_GRPC_CODES = {
+    grpc.StatusCode.NOT_FOUND,
+    grpc.StatusCode.INVALID_ARGUMENT,
+    grpc.StatusCode.FAILED_PRECONDITION,
+    grpc.StatusCode.ALREADY_EXISTS,
+    grpc.StatusCode.PERMISSION_DENIED,
+    grpc.StatusCode.UNAUTHENTICATED,
+}
+
+BREAKER_CLOSED = "closed"
+BREAKER_HALF_OPEN = "half_open"
+BREAKER_OPEN = "open"
+_BREAKER_GAUGE_VALUES = {BREAKER_CLOSED: 0, BREAKER_HALF_OPEN: 1, BREAKER_OPEN: 2}
+
+
+class QdrantUnavailableError(RuntimeError):
+    """Hiçbir replica sağlıklı değil (eski global Ghost Mode'un karşılığı)."""
+
+
+def is_replica_failure(error: BaseException) -> bool:
+    """Hata replica'yı devre dışı bırakmayı gerektiriyor mu? (404/400 gerektirmez)"""
+    from qdrant_client.http.exceptions import UnexpectedResponse
+
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code is None or error.status_code >= 500
+    if isinstance(error, grpc.aio.AioRpcError):
+        return error.code() not in _CLIENT_SIDE_GRPC_CODES
+    return True
+
+
+def is_not_found(error: BaseException) -> bool:
+    """Koleksiyon yok hatası (REST 404 veya gRPC NOT_FOUND)."""
+    from qdrant_client.http.exceptions import UnexpectedResponse
+
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    if isinstance(error, grpc.aio.AioRpcError):
+        return error.code() == grpc.StatusCode.NOT_FOUND
+    return False
+
+
+class CircuitBreaker:
+    """
+    Ardışık hata eşiğinde açılır; reset süresi dolunca tek bir deneme
+    (half-open) başarılı olursa tekrar kapanır.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = 0.0
+        self.state = BREAKER_CLOSED
+        self._publish()
+
+    @property
+    def closed(self) -> bool:
+        return self.state == BREAKER_CLOSED
+
+    def ready_for_trial(self) -> bool:
+        return (
+            self.state == BREAKER_OPEN
+            and time.monotonic() - self._opened_at >= self._reset_seconds
+        )
+
+    def begin_trial(self):
+        self.state = BREAKER_HALF_OPEN
+        self._publish()
+
+    def record_success(self):
+        self._failures = 0
+        if self.state != BREAKER_CLOSED:
+            self.state = BREAKER_CLOSED
+            self._publish()
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == BREAKER_HALF_OPEN or self._failures >= self._failure_threshold:
+            self.trip()
+
+    def trip(self):
+        self._opened_at = time.monotonic()
+        if self.state != BREAKER_OPEN:
+            self.state = BREAKER_OPEN
+            self._publish()
+
+    def _publish(self):
+        metrics.QDRANT_REPLICA_BREAKER_STATE.labels(replica=self.name).set(
+            _BREAKER_GAUGE_VALUES[self.state]
+        )
+
+
+class Replica:
+    def __init__(self, url: str, pool: QdrantPool):
+        self.url = url
+        self.name = urlparse(url).netloc or url
+        self.pool = pool
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_threshold=settings.QDRANT_BREAKER_FAILURE_THRESHOLD,
+            reset_seconds=settings.QDRANT_BREAKER_RESET_SECONDS,
+        )
+        self.ewma: Optional[float] = None
+        self._samples: Deque[float] = deque(maxlen=settings.QDRANT_LATENCY_WINDOW)
+
+    def observe(self, latency: float):
+        alpha = settings.QDRANT_EWMA_ALPHA
+        self.ewma = (
+            latency if self.ewma is None else alpha * latency + (1 - alpha) * self.ewma
+        )
+        self._samples.append(latency)
+        metrics.QDRANT_REPLICA_LATENCY_SECONDS.labels(replica=self.name).observe(
+            latency
+        )
+
+    def hedge_delay(self) -> float:
+        """İkinci replica'ya ne zaman gidileceği: gözlenen p95, alt sınırla."""
+        floor = settings.QDRANT_HEDGE_MIN_DELAY_MS / 1000.0
+        if len(self._samples) < 10:
+            return floor
+        ordered = sorted(self._samples)
+        index = min(
+            len(ordered) - 1, int(len(ordered) * settings.QDRANT_HEDGE_PERCENTILE)
+        )
+        return max(floor, ordered[index])
+
+
+class ReplicaRouter:
+    """
+    Okuma replica'ları arasında EWMA gecikmesine göre seçim yapar. Opsiyonel
+    olarak p95 gecikmesi aşılınca ikinci replica'ya hedged istek atar. Her
+    replica'nın kendi circuit breaker'ı vardır; hepsi açıksa servis Ghost Mode'dadır.
+    """
+
+    def __init__(self, replicas: Optional[List[Replica]] = None):
+        urls = [
+            url.strip()
+            for url in settings.QDRANT_READ_REPLICAS.split(",")
+            if url.strip()
+        ]
+        if replicas:
+            self.replicas = replicas
+        elif urls:
+            self.replicas = [
+                Replica(url, QdrantPool(url, grpc_host=urlparse(url).hostname))
+                for url in urls
+            ]
+        else:
+            self.replicas = [Replica(settings.QDRANT_HTTP_URL, QdrantPool())]
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def available(self) -> bool:
+        return any(replica.breaker.closed for replica in self.replicas)
+
+    def client(self) -> "AsyncQdrantClient":
+        """Seçim mantığı gerekmeyen yardımcı çağrılar için en hızlı replica."""
+        candidates = self._candidates()
+        replica = candidates[0] if candidates else self.replicas[0]
+        return replica.pool.client()
+
+    def _candidates(self) -> List[Replica]:
+        healthy = [replica for replica in self.replicas if replica.breaker.closed]
+        # Hiç ölçümü olmayan replica'lar önce denenir (0 kabul edilir)
+        return sorted(healthy, key=lambda replica: replica.ewma or 0.0)
+
+    async def _attempt(
+        self, replica: Replica, fn: Callable[["AsyncQdrantClient"], Awaitable[T]]
+    ) -> T:
+        started = time.perf_counter()
+        try:
+            result = await fn(replica.pool.client())
+        except asyncio.CancelledError:
+            # Kaybeden hedged istek iptali replica hatası değildir
+            raise
+        except Exception as e:
+            if is_replica_failure(e):
+                replica.breaker.record_failure()
+                if not replica.breaker.closed:
+                    logger.warning(
+                        "Qdrant replica circuit opened",
+                        event_name="DB_REPLICA_CIRCUIT_OPEN",
+                        replica=replica.name,
+                        error=str(e),
+                    )
+            raise
+        replica.observe(time.perf_counter() - started)
+        replica.breaker.record_success()
+        return result
+
+    async def call(self, fn: Callable[["AsyncQdrantClient"], Awaitable[T]]) -> T:
+        candidates = self._candidates()
+        if not candidates:
+            raise QdrantUnavailableError(
+                "Engine is currently in Ghost Mode (Qdrant offline)"
+            )
+
+        primary = candidates[0]
+        backup = candidates[1] if len(candidates) > 1 else None
+        tasks = {asyncio.ensure_future(self._attempt(primary, fn)): primary}
+
+        try:
+            if backup is not None and settings.QDRANT_HEDGING_ENABLED:
+                done, _ = await asyncio.wait(set(tasks), timeout=primary.hedge_delay())
+                if not done:
+                    metrics.QDRANT_HEDGED_REQUESTS_TOTAL.inc()
+                    tasks[asyncio.ensure_future(self._attempt(backup, fn))] = backup
+
+            pending = set(tasks)
+            last_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    # 404 gibi hatalar her replica'da aynıdır, failover anlamsız
+                    if not is_replica_failure(error):
+                        raise error
+                    last_error = error
+
+            # Hedge yapılmadıysa tek seferlik failover
+            if backup is not None and backup not in tasks.values():
+                return await self._attempt(backup, fn)
+            assert last_error is not None
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def warm_up(self):
+        """Tüm replica'ların bağlantılarını açar; ulaşılamayanların devresi açılır."""
+        results = await asyncio.gather(
+            *(self._warm_replica(replica) for replica in self.replicas),
+            return_exceptions=True,
+        )
+        if not self.available():
+            errors = [str(r) for r in results if isinstance(r, BaseException)]
+            raise QdrantUnavailableError("; ".join(errors) or "No healthy replica")
+
+    async def _warm_replica(self, replica: Replica):
+        try:
+            await asyncio.wait_for(
+                replica.pool.warm_up(), timeout=settings.QDRANT_CONNECT_TIMEOUT_SECONDS
+            )
+        except Exception:
+            replica.breaker.trip()
+            raise
+        replica.breaker.record_success()
+
+    def start_probing(self):
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        """
+        Açık devreli replica'ları reset süresi dolunca half-open olarak dener
+        (Auto-Healing).
+        """
+        while True:
+            await asyncio.sleep(max(1.0, settings.QDRANT_BREAKER_RESET_SECONDS / 2))
+            for replica in self.replicas:
+                if not replica.breaker.ready_for_trial():
+                    continue
+                was_available = self.available()
+                replica.breaker.begin_trial()
+                try:
+                    await self._warm_replica(replica)
+                except Exception:
+                    continue
+                logger.info(
+                    "Qdrant replica is back online.",
+                    event_name="DB_RECONNECTED",
+                    replica=replica.name,
+                    ghost_mode_cleared=not was_available,
+                )
+
+    async def close(self):
+        if self._probe_task:
+            self._probe_task.cancel()
+            self._probe_task = None
+        for replica in self.replicas:
+            await replica.pool.close()
@@ -0,0 +1,207 @@
+# app/core/snippets.py
+import functools
+import itertools
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Pattern, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.results import SearchHit
+
+ELLIPSIS = "…"
+
+# Kısaltılan sonuçların metadata'sına yazılır
+TRUNCATED_METADATA_KEY = "content_truncated"
+
+MODE_PREFIX = "prefix"
+MODE_SNIPPET = "snippet"
+
+_WORD_RE = re.compile(r"\w+")
+# Kısa terimler (ve, de, bir ...) pencere seçimini bozmasın
+_MIN_TERM_CHARS = 3
+# Çok uzun içeriklerde pencere seçimi için bakılan en fazla eşleşme
+_MAX_MATCHES = 512
+# Kelime sınırına hizalarken kesim noktasından en fazla bu kadar kayılır
+_WORD_SNAP_CHARS = 24
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+_FALSE_VALUES = {"0", "false", "no", "off"}
+
+
+@dataclass(frozen=True)
+class ContentOptions:
+    """İstek bazında içerik sınırı; None olan alanlar profilden gelir."""
+
+    max_chars: Optional[int] = None
+    snippet: Optional[bool] = None
+
+    @classmethod
+    def parse(
+        cls, max_chars: Optional[str], snippet: Optional[str]
+    ) -> Optional["ContentOptions"]:
+        """
+        Metin değerlerinden (gRPC metadata); ikisi de yoksa None, hatalıysa
+        ValueError.
+        """
+        if max_chars is None and snippet is None:
+            return None
+        limit = None
+        if max_chars is not None:
+            try:
+                limit = int(max_chars)
+            except ValueError:
+                limit = -1
+            if limit < 0:
+                raise ValueError(f"Invalid max content chars: {max_chars!r}")
+        flag = None
+        if snippet is not None:
+            value = snippet.strip().lower()
+            if value not in _TRUE_VALUES | _FALSE_VALUES:
+                raise ValueError(f"Invalid snippet flag: {snippet!r}")
+            flag = value in _TRUE_VALUES
+        return cls(limit, flag)
+
+
+def resolve_limit(
+    options: Optional[ContentOptions], max_chars: int, snippet: bool
+) -> Tuple[int, bool]:
+    """
+    Profil değerlerini istekteki değerlerle ezer; (karakter sınırı, snippet).
+    Snippet istenip sınır verilmemişse CONTENT_SNIPPET_CHARS kullanılır.
+    """
+    if options is not None:
+        if options.max_chars is not None:
+            max_chars = options.max_chars
+        if options.snippet is not None:
+            snippet = options.snippet
+    if snippet and max_chars <= 0:
+        max_chars = settings.CONTENT_SNIPPET_CHARS
+    return max_chars, snippet
+
+
+def _query_terms(query_text: str) -> Tuple[str, ...]:
+    terms = {
+        term
+        for term in _WORD_RE.findall(query_text.lower())
+        if len(term) >= _MIN_TERM_CHARS
+    }
+    return tuple(sorted(terms, key=len, reverse=True))
+
+
+@functools.lru_cache(maxsize=256)
+def _term_pattern(terms: Tuple[str, ...]) -> Pattern[str]:
+    # Uzun terimler önce: alternasyon en uzun eşleşmeyi seçsin
+    return re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+
+
+def _match_starts(content: str, terms: Tuple[str, ...]) -> List[int]:
+    """Terimlerin içerikteki başlangıç konumları (sıralı)."""
+    lowered = content.lower()
+    if len(lowered) != len(content):
+        # Ör. "İ" küçültülünce iki karakter olur ve konumlar kayar; regex'e düşülür
+        return [
+            match.start()
+            for match in itertools.islice(
+                _term_pattern(terms).finditer(content), _MAX_MATCHES
+            )
+        ]
+    # Küçük harfli metinde str.find, IGNORECASE regex'ten ~5 kat hızlı
+    starts: List[int] = []
+    for term in terms:
+        at = lowered.find(term)
+        while at != -1 and len(starts) < _MAX_MATCHES:
+            starts.append(at)
+            at = lowered.find(term, at + len(term))
+    starts.sort()
+    return starts
+
+
+def _snap(content: str, begin: int, end: int) -> Tuple[int, int]:
+    """Kesim noktalarını yakındaki boşluğa kaydırır; kelime ortadan bölünmez."""
+    if begin > 0:
+        space = content.find(" ", begin, min(end, begin + _WORD_SNAP_CHARS))
+        if space != -1:
+            begin = space + 1
+    if end < len(content):
+        space = content.rfind(" ", max(begin, end - _WORD_SNAP_CHARS), end)
+        if space > begin:
+            end = space
+    return begin, end
+
+
+def truncate(content: str, max_chars: int) -> str:
+    """İçeriğin başından en fazla max_chars karakter (üç nokta dahil)."""
+    if len(content) <= max_chars:
+        return content
+    if max_chars < 2:
+        # Üç noktadan sonra içerikten karakter kalmaz
+        return content[:max_chars]
+    _, end = _snap(content, 0, max(1, max_chars - 1))
+    return content[:end].rstrip() + ELLIPSIS
+
+
+def extract_snippet(
+    content: str, terms: Tuple[str, ...], max_chars: int
+) -> Optional[str]:
+    """
+    Sorgu terimlerinin en çok geçtiği max_chars'lık pencere (üç noktalar dahil);
+    hiç eşleşme yoksa veya iki üç noktaya yer yoksa None.
+    """
+    if max_chars < 3:
+        return None
+    starts = _match_starts(content, terms)
+    if not starts:
+        return None
+    width = max_chars - 2
+
+    # İki işaretçi: pencereye en çok eşleşme başlangıcı sığan nokta
+    best, best_count, j = starts[0], 0, 0
+    for i, start in enumerate(starts):
+        while j < len(starts) and starts[j] < start + width:
+            j += 1
+        if j - i > best_count:
+            best, best_count = start, j - i
+
+    # Eşleşmeden önce biraz bağlam bırakılır
+    begin = max(0, min(best - width // 4, len(content) - width))
+    begin, end = _snap(content, begin, begin + width)
+    return (
+        (ELLIPSIS if begin > 0 else "")
+        + content[begin:end].strip()
+        + (ELLIPSIS if end < len(content) else "")
+    )
+
+
+def shape_hits(
+    hits: List[SearchHit], query_text: str, max_chars: int, snippet: bool
+) -> List[SearchHit]:
+    """
+    max_chars'ı aşan içerikler kısaltılmış kopyalarla değiştirilir; diğer
+    hit'ler aynen döner (cache'teki nesneler değişmez). Snippet'te eşleşme
+    yoksa içeriğin başı kullanılır.
+    """
+    if max_chars <= 0 or all(len(hit.content) <= max_chars for hit in hits):
+        return hits
+    terms = _query_terms(query_text) if snippet else ()
+
+    shaped = []
+    for hit in hits:
+        if len(hit.content) <= max_chars:
+            shaped.append(hit)
+            continue
+        content = extract_snippet(hit.content, terms, max_chars) if terms else None
+        if content is None:
+            content = truncate(hit.content, max_chars)
+            metrics.SEARCH_CONTENT_TRUNCATED_TOTAL.labels(mode=MODE_PREFIX).inc()
+        else:
+            metrics.SEARCH_CONTENT_TRUNCATED_TOTAL.labels(mode=MODE_SNIPPET).inc()
+        shaped.append(
+            SearchHit(
+                content=content,
+                score=hit.score,
+                source=hit.source,
+                metadata={**hit.metadata, TRUNCATED_METADATA_KEY: "true"},
+            )
+        )
+    return shaped
@@ -0,0 +1,160 @@
+# app/core/workers.py
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from app.core.embedding import (
+    BACKEND_ONNX,
+    BACKEND_TORCH,
+    BACKEND_TORCH_INT8,
+    EmbeddingBackend,
+    OnnxBackend,
+    build_backend,
+    ensure_onnx_model,
+    onnx_model_path,
+)
+
+logger = structlog.get_logger()
+
+# --- Worker süreci tarafı ---
+_worker_backend: Optional[EmbeddingBackend] = None
+_worker_segments: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _init_worker(backend_name: str, threads: int, onnx_path: Optional[str] = None):
+    """
+    Her worker kendi modelini yükler. Thread sayısı OMP_NUM_THREADS ile sabitlenir
+    (ONNX bunu okur); torch sadece torch arka uçlarında import edilir. ONNX
+    export'u parent'ta bir kez yapılır, worker'lar hazır dosyayı açar.
+    """
+    global _worker_backend
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    if backend_name in (BACKEND_TORCH, BACKEND_TORCH_INT8):
+        import torch
+
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    if backend_name == BACKEND_ONNX and onnx_path:
+        _worker_backend = OnnxBackend(onnx_path)
+    else:
+        _worker_backend = build_backend(backend_name)
+
+
+def _worker_dimension() -> int:
+    assert _worker_backend is not None
+    return _worker_backend.dimension
+
+
+def _worker_encode(texts: List[str], segment_name: str) -> Tuple[int, int]:
+    """Vektörleri parent'ın verdiği shared memory bloğuna yazar, sadece şekli döner."""
+    assert _worker_backend is not None
+    segment = _worker_segments.get(segment_name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _worker_segments[segment_name] = segment
+
+    vectors = _worker_backend.encode(texts)
+    rows, dim = vectors.shape
+    out = np.ndarray((rows, dim), dtype=np.float32, buffer=segment.buf)
+    out[:] = vectors
+    return rows, dim
+
+
+# --- Parent süreç tarafı ---
+class ProcessPoolBackend(EmbeddingBackend):
+    """
+    Embedding'i N ayrı süreçte çalıştırır (GIL'den bağımsız tokenization ve
+    pre/post-processing). Sonuç vektörleri pickle edilmiş listeler yerine
+    önceden ayrılmış shared memory bloklarından okunur.
+    """
+
+    def __init__(
+        self, inner_backend: str, workers: int, threads_per_worker: int, max_batch: int
+    ):
+        self.name = f"process-pool:{inner_backend}"
+        self._workers = max(1, workers)
+        self._max_batch = max(1, max_batch)
+        # Worker'lar aynı anda açılır; export'u aynı dosyaya yarışarak
+        # yazmasınlar diye model parent'ta bir kez hazırlanır
+        onnx_path = None
+        if inner_backend == BACKEND_ONNX:
+            onnx_path = onnx_model_path()
+            ensure_onnx_model(onnx_path)
+        # fork, torch/gRPC thread'leri varken güvenli değil
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(inner_backend, threads_per_worker, onnx_path),
+        )
+
+        # Tüm worker'ları açılışta ayağa kaldır (modeller paralel yüklenir)
+        dimensions = [
+            f.result()
+            for f in [
+                self._executor.submit(_worker_dimension) for _ in range(self._workers)
+            ]
+        ]
+        self._dimension = dimensions[0]
+
+        # Eşzamanlı her batch için bir blok; blok sayısı = worker sayısı
+        segment_bytes = (
+            self._max_batch * self._dimension * np.dtype(np.float32).itemsize
+        )
+        self._segments = [
+            shared_memory.SharedMemory(create=True, size=segment_bytes)
+            for _ in range(self._workers)
+        ]
+        self._free: "queue.Queue[shared_memory.SharedMemory]" = queue.Queue()
+        for segment in self._segments:
+            self._free.put(segment)
+
+        logger.info(
+            "Embedding process pool ready",
+            event_name="EMBEDDING_PROCESS_POOL_READY",
+            workers=self._workers,
+            threads_per_worker=threads_per_worker,
+            backend=inner_backend,
+        )
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Bloklayıcıdır; batcher tarafından thread içinde çağrılır."""
+        if len(texts) > self._max_batch:
+            return np.concatenate(
+                [
+                    self.encode(texts[i : i + self._max_batch])
+                    for i in range(0, len(texts), self._max_batch)
+                ]
+            )
+
+        segment = self._free.get()
+        try:
+            rows, dim = self._executor.submit(
+                _worker_encode, texts, segment.name
+            ).result()
+            # Blok bir sonraki batch'te yeniden yazılacağı için kopyala
+            return np.ndarray((rows, dim), dtype=np.float32, buffer=segment.buf).copy()
+        finally:
+            self._free.put(segment)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
@@ -0,0 +1,131 @@
+# app/grpc/interceptors.py
+import inspect
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+import grpc
+
+from app.core import metrics
+
+# Interceptor'ın RPC başına çözdüğü trace_id; servicer logları aynı id'yi kullanır
+rpc_trace_id: ContextVar[Optional[str]] = ContextVar("rpc_trace_id", default=None)
+
+
+def _metadata_trace_id(handler_call_details: grpc.HandlerCallDetails) -> Optional[str]:
+    for key, value in handler_call_details.invocation_metadata or ():
+        if key.lower() == "x-trace-id":
+            return value
+    return None
+
+
+class MetricsInterceptor(grpc.aio.ServerInterceptor):
+    """
+    Tüm RPC'ler için istek sayacı, süre histogramı ve in-flight gauge'u tutar.
+    Stream RPC'lerde süre, son mesaj gönderilene kadar ölçülür.
+    """
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        behavior = (
+            handler.unary_unary
+            or handler.stream_unary
+            or handler.unary_stream
+            or handler.stream_stream
+        )
+        # Senkron handler'ları grpc kendi executor'ında çalıştırır; sarmalanamazlar
+        if not (
+            inspect.iscoroutinefunction(behavior)
+            or inspect.isasyncgenfunction(behavior)
+        ):
+            return handler
+
+        method = handler_call_details.method.rsplit("/", 1)[-1]
+        trace_id = _metadata_trace_id(handler_call_details) or uuid.uuid4().hex
+
+        if handler.unary_unary:
+            return grpc.unary_unary_rpc_method_handler(
+                self._wrap_unary(handler.unary_unary, method, trace_id),
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer,
+            )
+        if handler.stream_unary:
+            return grpc.stream_unary_rpc_method_handler(
+                self._wrap_unary(handler.stream_unary, method, trace_id),
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer,
+            )
+        if handler.unary_stream:
+            return grpc.unary_stream_rpc_method_handler(
+                self._wrap_stream(handler.unary_stream, method, trace_id),
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer,
+            )
+        return grpc.stream_stream_rpc_method_handler(
+            self._wrap_stream(handler.stream_stream, method, trace_id),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+
+    @staticmethod
+    def _begin(method: str, trace_id: str):
+        rpc_trace_id.set(trace_id)
+        metrics.bind_transport(metrics.TRANSPORT_GRPC)
+        metrics.REQUESTS_IN_PROGRESS.labels(
+            transport=metrics.TRANSPORT_GRPC, method=method
+        ).inc()
+        return time.perf_counter()
+
+    @staticmethod
+    def _finish(
+        method: str,
+        trace_id: str,
+        started: float,
+        context: grpc.aio.ServicerContext,
+        failed: bool,
+    ):
+        metrics.REQUESTS_IN_PROGRESS.labels(
+            transport=metrics.TRANSPORT_GRPC, method=method
+        ).dec()
+        # abort() kodu context'e yazar; yakalanmamış hata UNKNOWN olarak döner
+        code = context.code()
+        if code is None:
+            code = grpc.StatusCode.UNKNOWN if failed else grpc.StatusCode.OK
+        exemplar = metrics.trace_exemplar(trace_id)
+        metrics.REQUEST_LATENCY_SECONDS.labels(
+            transport=metrics.TRANSPORT_GRPC, method=method
+        ).observe(time.perf_counter() - started, exemplar=exemplar)
+        metrics.REQUESTS_TOTAL.labels(
+            transport=metrics.TRANSPORT_GRPC,
+            method=method,
+            status_code=code.name if isinstance(code, grpc.StatusCode) else str(code),
+        ).inc(exemplar=exemplar)
+
+    def _wrap_unary(self, behavior, method: str, trace_id: str):
+        async def wrapper(request, context):
+            started = self._begin(method, trace_id)
+            failed = True
+            try:
+                response = await behavior(request, context)
+                failed = False
+                return response
+            finally:
+                self._finish(method, trace_id, started, context, failed)
+
+        return wrapper
+
+    def _wrap_stream(self, behavior, method: str, trace_id: str):
+        async def wrapper(request, context):
+            started = self._begin(method, trace_id)
+            failed = True
+            try:
+                async for response in behavior(request, context):
+                    yield response
+                failed = False
+            finally:
+                self._finish(method, trace_id, started, context, failed)
+
+        return wrapper
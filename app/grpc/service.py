@@ -1,39 +1,123 @@
 # app/grpc/service.py
+import json
 import grpc
 import structlog
 import uuid
+from typing import AsyncIterator, List, Optional
 from structlog.contextvars import clear_contextvars, bind_contextvars
 
 from sentiric.knowledge.v1 import query_pb2, query_pb2_grpc
-from app.core.engine import engine
+from app.core import metrics
+from app.core.admission import OverloadedError, bind_deadline
+from app.core.catalog import TenantNotFoundError, VectorDimensionError
+from app.core.engine import STREAM_FINAL, BatchItem, batch_item_error, engine
+from app.core.profiles import UnknownSearchProfileError
 from app.core.config import settings
+from app.core.results import SearchHit
+from app.core.snippets import ContentOptions
+from app.grpc.interceptors import rpc_trace_id
 
 logger = structlog.get_logger()
 
+# [ARCH-COMPLIANCE] Kontrat (sentiric-contracts) henüz BatchQuery / QueryStream
+# tanımlamıyor. Bu RPC'ler aynı servis adı altında, mevcut QueryRequest /
+# QueryResponse mesajlarıyla generic handler olarak yayınlanır.
+SERVICE_NAME = query_pb2.DESCRIPTOR.services_by_name["KnowledgeQueryService"].full_name
 
-class KnowledgeQueryServicer(query_pb2_grpc.KnowledgeQueryServiceServicer):
-    async def Query(
-        self, request: query_pb2.QueryRequest, context: grpc.aio.ServicerContext
-    ) -> query_pb2.QueryResponse:
+# BatchQuery: öğe bazlı hatalar trailing metadata'da JSON olarak döner
+BATCH_ERRORS_METADATA_KEY = "x-batch-errors"
+
+# Kontratın QueryRequest'inde profil alanı yok; arama profili invocation
+# metadata'sıyla seçilir (BatchQuery'de tüm öğeler için geçerlidir)
+SEARCH_PROFILE_METADATA_KEY = "x-search-profile"
+# İçerik uzunluğu sınırı (karakter, 0 = sınırsız) ve sorgu odaklı snippet
+# ("true"/"false")
+MAX_CONTENT_CHARS_METADATA_KEY = "x-max-content-chars"
+SNIPPET_METADATA_KEY = "x-snippet"
+
+# QueryStream: her sonucun metadata'sında hangi frame'den geldiği yazar
+# (knowledge_base | cognitive_memory | final)
+STREAM_FRAME_METADATA_KEY = "stream_frame"
+
+
+def _bind_rpc_context(context: grpc.aio.ServicerContext, tenant_id: str = ""):
+    clear_contextvars()
+
+    # MetricsInterceptor varsa exemplar'larla aynı trace_id kullanılır
+    trace_id = rpc_trace_id.get()
+    metadata = context.invocation_metadata()
+    if metadata and not trace_id:
+        for key, value in metadata:
+            if key.lower() == "x-trace-id":
+                trace_id = value
+                break
+
+    if not trace_id:
+        trace_id = uuid.uuid4().hex
 
-        clear_contextvars()
+    # [ARCH-COMPLIANCE] AI Streaming Compliance & Context Propagation
+    span_id = uuid.uuid4().hex
+    bind_contextvars(trace_id=trace_id, span_id=span_id)
+    if tenant_id:
+        bind_contextvars(tenant_id=tenant_id)
+    # İstemci deadline'ı encode ve Qdrant aşamalarına kadar taşınır
+    bind_deadline(context.time_remaining())
 
-        metadata = context.invocation_metadata()
-        trace_id = None
-        if metadata:
-            for key, value in metadata:
-                if key.lower() == "x-trace-id":
-                    trace_id = value
-                    break
 
-        if not trace_id:
-            trace_id = uuid.uuid4().hex
+def _metadata_value(context: grpc.aio.ServicerContext, name: str) -> Optional[str]:
+    for key, value in context.invocation_metadata() or ():
+        if key.lower() == name:
+            return value or None
+    return None
 
-        # [ARCH-COMPLIANCE] AI Streaming Compliance & Context Propagation
-        span_id = uuid.uuid4().hex
-        bind_contextvars(
-            trace_id=trace_id, span_id=span_id, tenant_id=request.tenant_id
+
+def _search_profile(context: grpc.aio.ServicerContext) -> Optional[str]:
+    return _metadata_value(context, SEARCH_PROFILE_METADATA_KEY)
+
+
+async def _content_options(
+    context: grpc.aio.ServicerContext,
+) -> Optional[ContentOptions]:
+    """Hatalı değerde istek INVALID_ARGUMENT ile sonlanır."""
+    try:
+        return ContentOptions.parse(
+            _metadata_value(context, MAX_CONTENT_CHARS_METADATA_KEY),
+            _metadata_value(context, SNIPPET_METADATA_KEY),
         )
+    except ValueError as e:
+        await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        # abort() istisna fırlatır; buraya gelinmez
+        raise AssertionError("unreachable") from e
+
+
+def _top_k(request: query_pb2.QueryRequest) -> int:
+    return (
+        request.top_k if request.top_k > 0 else settings.KNOWLEDGE_QUERY_DEFAULT_TOP_K
+    )
+
+
+def _to_proto_response(
+    results: List[SearchHit], frame: str = ""
+) -> query_pb2.QueryResponse:
+    """Sonuçlar yanıtın içinde yerinde kurulur; ara QueryResult listesi kopyalanmaz."""
+    with metrics.StageTimer(metrics.STAGE_SERIALIZATION):
+        response = query_pb2.QueryResponse()
+        add = response.results.add
+        for r in results:
+            item = add(
+                content=r.content, score=r.score, source=r.source, metadata=r.metadata
+            )
+            if frame:
+                item.metadata[STREAM_FRAME_METADATA_KEY] = frame
+        return response
+
+
+class KnowledgeQueryServicer(query_pb2_grpc.KnowledgeQueryServiceServicer):
+    async def Query(
+        self, request: query_pb2.QueryRequest, context: grpc.aio.ServicerContext
+    ) -> query_pb2.QueryResponse:
+
+        _bind_rpc_context(context, request.tenant_id)
 
         logger.info(
             "gRPC Query request received",
@@ -46,38 +130,40 @@ class KnowledgeQueryServicer(query_pb2_grpc.KnowledgeQueryServiceServicer):
                 "Missing parameters in query request", event_name="RPC_INVALID_ARGUMENT"
             )
             await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Eksik parametreler.")
+        content = await _content_options(context)
 
         try:
-            limit = (
-                request.top_k
-                if request.top_k > 0
-                else settings.KNOWLEDGE_QUERY_DEFAULT_TOP_K
-            )
+            limit = _top_k(request)
 
             logger.info(
                 "Executing RAG Search...", event_name="RAG_SEARCH_START", top_k=limit
             )
             results = await engine.search(
-                tenant_id=request.tenant_id, query_text=request.query, top_k=limit
+                tenant_id=request.tenant_id,
+                query_text=request.query,
+                top_k=limit,
+                profile=_search_profile(context),
+                content=content,
             )
 
-            proto_results = [
-                query_pb2.QueryResult(
-                    content=r.content,
-                    score=r.score,
-                    source=r.source,
-                    metadata=r.metadata,
-                )
-                for r in results
-            ]
+            response = _to_proto_response(results)
 
             logger.info(
                 "gRPC Query completed successfully",
                 event_name="RPC_QUERY_SUCCESS",
-                results_count=len(proto_results),
+                results_count=len(results),
             )
-            return query_pb2.QueryResponse(results=proto_results)
+            return response
 
+        except TenantNotFoundError:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Tenant bulunamadı.")
+        except VectorDimensionError as e:
+            # Koleksiyon ile embedding modeli uyuşmuyor; tekrar denemek düzeltmez
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+        except UnknownSearchProfileError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        except OverloadedError:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Sunucu meşgul.")
         except TimeoutError:
             logger.error("RAG engine timed out", event_name="RPC_QUERY_TIMEOUT")
             await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, "Vector DB timeout")
@@ -91,3 +177,182 @@ class KnowledgeQueryServicer(query_pb2_grpc.KnowledgeQueryServiceServicer):
             await context.abort(grpc.StatusCode.INTERNAL, "Sunucu hatası")
         finally:
             clear_contextvars()
+
+    async def QueryStream(
+        self, request: query_pb2.QueryRequest, context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[query_pb2.QueryResponse]:
+        """
+        Kaynak başına (KB / hafıza) arama biter bitmez bir frame, en sonda
+        birleştirilmiş top-k "final" frame'i gönderir. Boş kaynak frame'i atlanır;
+        final frame her zaman gelir.
+        """
+        _bind_rpc_context(context, request.tenant_id)
+
+        logger.info(
+            "gRPC QueryStream request received",
+            event_name="RPC_QUERY_STREAM_RECEIVED",
+            tenant_id=request.tenant_id,
+        )
+
+        if not request.tenant_id or not request.query:
+            logger.warning(
+                "Missing parameters in query request", event_name="RPC_INVALID_ARGUMENT"
+            )
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Eksik parametreler.")
+        content = await _content_options(context)
+
+        try:
+            frames = 0
+            async for source, results in engine.search_stream(
+                tenant_id=request.tenant_id,
+                query_text=request.query,
+                top_k=_top_k(request),
+                profile=_search_profile(context),
+                content=content,
+            ):
+                if not results and source != STREAM_FINAL:
+                    continue
+                frames += 1
+                yield _to_proto_response(results, frame=source)
+
+            logger.info(
+                "gRPC QueryStream completed successfully",
+                event_name="RPC_QUERY_STREAM_SUCCESS",
+                frames=frames,
+            )
+        except TenantNotFoundError:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Tenant bulunamadı.")
+        except VectorDimensionError as e:
+            # Koleksiyon ile embedding modeli uyuşmuyor; tekrar denemek düzeltmez
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+        except UnknownSearchProfileError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        except OverloadedError:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Sunucu meşgul.")
+        except TimeoutError:
+            logger.error("RAG engine timed out", event_name="RPC_QUERY_TIMEOUT")
+            await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, "Vector DB timeout")
+        except Exception as e:
+            logger.error(
+                "gRPC Internal Error",
+                event_name="RPC_QUERY_STREAM_ERROR",
+                error=str(e),
+                exc_info=True,
+            )
+            await context.abort(grpc.StatusCode.INTERNAL, "Sunucu hatası")
+        finally:
+            clear_contextvars()
+
+    async def BatchQuery(
+        self,
+        request_iterator: AsyncIterator[query_pb2.QueryRequest],
+        context: grpc.aio.ServicerContext,
+    ) -> AsyncIterator[query_pb2.QueryResponse]:
+        """
+        İstemci N adet QueryRequest gönderip yarım kapatır; sunucu aynı sırayla
+        N adet QueryResponse döner. Hatalı öğeler boş yanıt alır, hata detayı
+        trailing metadata'daki `x-batch-errors` anahtarındadır.
+        """
+        _bind_rpc_context(context)
+        try:
+            profile = _search_profile(context)
+            content = await _content_options(context)
+            items: List[BatchItem] = []
+            async for request in request_iterator:
+                if len(items) >= settings.BATCH_QUERY_MAX_ITEMS:
+                    await context.abort(
+                        grpc.StatusCode.INVALID_ARGUMENT,
+                        f"En fazla {settings.BATCH_QUERY_MAX_ITEMS} sorgu "
+                        "gönderilebilir.",
+                    )
+                items.append(
+                    (
+                        request.tenant_id,
+                        request.query,
+                        _top_k(request),
+                        profile,
+                        content,
+                    )
+                )
+
+            logger.info(
+                "gRPC BatchQuery request received",
+                event_name="RPC_BATCH_QUERY_RECEIVED",
+                items=len(items),
+            )
+
+            try:
+                outcomes = await engine.search_batch(items)
+            except OverloadedError:
+                await context.abort(
+                    grpc.StatusCode.RESOURCE_EXHAUSTED, "Sunucu meşgul."
+                )
+                return
+            except TimeoutError:
+                # Admission kuyruğunda deadline dolarsa (DeadlineExceededError)
+                logger.error(
+                    "RAG engine timed out", event_name="RPC_BATCH_QUERY_TIMEOUT"
+                )
+                await context.abort(
+                    grpc.StatusCode.DEADLINE_EXCEEDED, "Vector DB timeout"
+                )
+                return
+            except Exception as e:
+                logger.error(
+                    "gRPC BatchQuery Internal Error",
+                    event_name="RPC_BATCH_QUERY_ERROR",
+                    error=str(e),
+                    exc_info=True,
+                )
+                await context.abort(grpc.StatusCode.INTERNAL, "Sunucu hatası")
+                return
+
+            errors = []
+            for index, outcome in enumerate(outcomes):
+                if isinstance(outcome, Exception):
+                    logger.warning(
+                        "Batch query item failed",
+                        event_name="RPC_BATCH_ITEM_ERROR",
+                        index=index,
+                        tenant_id=items[index][0],
+                        error=str(outcome),
+                    )
+                    errors.append({"index": index, "error": batch_item_error(outcome)})
+                    yield query_pb2.QueryResponse()
+                else:
+                    yield _to_proto_response(outcome)
+
+            if errors:
+                context.set_trailing_metadata(
+                    ((BATCH_ERRORS_METADATA_KEY, json.dumps(errors)),)
+                )
+
+            logger.info(
+                "gRPC BatchQuery completed",
+                event_name="RPC_BATCH_QUERY_SUCCESS",
+                items=len(items),
+                failed=len(errors),
+            )
+        finally:
+            clear_contextvars()
+
+
+def add_extended_rpc_handlers(
+    servicer: KnowledgeQueryServicer, server: grpc.aio.Server
+):
+    """Kontratta henüz olmayan RPC'leri generic handler olarak kaydeder."""
+    handlers = {
+        "QueryStream": grpc.unary_stream_rpc_method_handler(
+            servicer.QueryStream,
+            request_deserializer=query_pb2.QueryRequest.FromString,
+            response_serializer=query_pb2.QueryResponse.SerializeToString,
+        ),
+        "BatchQuery": grpc.stream_stream_rpc_method_handler(
+            servicer.BatchQuery,
+            request_deserializer=query_pb2.QueryRequest.FromString,
+            response_serializer=query_pb2.QueryResponse.SerializeToString,
+        ),
+    }
+    server.add_generic_rpc_handlers(
+        (grpc.method_handlers_generic_handler(SERVICE_NAME, handlers),)
+    )
@@ -1,26 +1,39 @@
 # app/main.py
 import asyncio
+import orjson
 import sys
+import time
 import grpc
 import structlog
 import uuid
 from pathlib import Path
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException, status, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from grpc_health.v1 import health, health_pb2, health_pb2_grpc
+from starlette.routing import Match
 from structlog.contextvars import clear_contextvars, bind_contextvars
 
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.core.engine import engine
+from app.core.engine import batch_item_error, engine
 from app.core import metrics
-from app.schemas import QueryRequest, QueryResponse
-from app.grpc.service import KnowledgeQueryServicer
+from app.core.admission import REQUEST_TIMEOUT_HEADER, OverloadedError, bind_deadline
+from app.core.catalog import TenantNotFoundError, VectorDimensionError
+from app.core.profiles import UnknownSearchProfileError
+from app.core.snippets import ContentOptions
+from app.schemas import (
+    BatchQueryRequest,
+    BatchQueryResponse,
+    QueryRequest,
+    QueryResponse,
+)
+from app.grpc.interceptors import MetricsInterceptor
+from app.grpc.service import KnowledgeQueryServicer, add_extended_rpc_handlers
 from sentiric.knowledge.v1 import query_pb2_grpc
 
 setup_logging()
@@ -29,19 +42,27 @@ logger = structlog.get_logger()
 # Global referanslar
 grpc_server: Optional[grpc.aio.Server] = None
 grpc_task: Optional[asyncio.Task] = None
+health_servicer: Optional[health.aio.HealthServicer] = None
+health_task: Optional[asyncio.Task] = None
+
+# gRPC health durumunun engine.check_health() ile eşitlenme aralığı
+HEALTH_SYNC_INTERVAL_SECONDS = 1.0
 
 
 async def start_grpc_server():
-    global grpc_server
-    grpc_server = grpc.aio.server()
+    global grpc_server, health_servicer
+    # Çok worker'lı modda tüm worker'lar aynı portu paylaşır, kernel dağıtır
+    options = [("grpc.so_reuseport", 1)] if settings.SERVICE_WORKERS > 1 else None
+    grpc_server = grpc.aio.server(interceptors=[MetricsInterceptor()], options=options)
 
-    query_pb2_grpc.add_KnowledgeQueryServiceServicer_to_server(
-        KnowledgeQueryServicer(), grpc_server
-    )
+    servicer = KnowledgeQueryServicer()
+    query_pb2_grpc.add_KnowledgeQueryServiceServicer_to_server(servicer, grpc_server)
+    add_extended_rpc_handlers(servicer, grpc_server)
 
-    health_servicer = health.HealthServicer()
+    health_servicer = health.aio.HealthServicer()
     health_pb2_grpc.add_HealthServicer_to_server(health_servicer, grpc_server)
-    health_servicer.set("", health_pb2.HealthCheckResponse.SERVING)
+    # Model ısınıp Qdrant bağlanana kadar trafik alma (bkz. sync_grpc_health)
+    await health_servicer.set("", health_pb2.HealthCheckResponse.NOT_SERVING)
 
     listen_addr = f"[::]:{settings.KNOWLEDGE_QUERY_SERVICE_GRPC_PORT}"
 
@@ -112,9 +133,25 @@ async def start_grpc_server():
         await grpc_server.wait_for_termination()
 
 
+async def sync_grpc_health():
+    """gRPC health durumunu /health ile aynı tutar (ısınma ve Ghost Mode dahil)."""
+    serving: Optional[bool] = None
+    while True:
+        ready = await engine.check_health()
+        if health_servicer is not None and ready != serving:
+            await health_servicer.set(
+                "",
+                health_pb2.HealthCheckResponse.SERVING
+                if ready
+                else health_pb2.HealthCheckResponse.NOT_SERVING,
+            )
+            serving = ready
+        await asyncio.sleep(HEALTH_SYNC_INTERVAL_SECONDS)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global grpc_task
+    global grpc_task, health_task
     clear_contextvars()
 
     structlog.contextvars.bind_contextvars(
@@ -127,23 +164,37 @@ async def lifespan(app: FastAPI):
         env=settings.ENV,
     )
 
-    asyncio.create_task(metrics.start_metrics_server())
-    await engine.initialize()
+    # Çok worker'lı modda /metrics'i supervisor toplar
+    if not metrics.multiprocess_enabled():
+        asyncio.create_task(metrics.start_metrics_server())
 
+    # gRPC portu model yüklenirken açılır; health NOT_SERVING'den başlar
     grpc_task = asyncio.create_task(start_grpc_server())
+    health_task = asyncio.create_task(sync_grpc_health())
+    try:
+        await engine.initialize()
+    except Exception:
+        await _stop_grpc()
+        raise
 
     yield
 
     logger.info("Service Shutting Down", event_name="SERVICE_STOPPED")
+    await _stop_grpc()
+    await engine.shutdown()
+    clear_contextvars()
 
-    if grpc_task:
-        grpc_task.cancel()
 
+async def _stop_grpc():
+    if health_task:
+        health_task.cancel()
+    if health_servicer:
+        await health_servicer.enter_graceful_shutdown()
+    # Önce sunucuyu durdur: wait_for_termination kendiliğinden döner
     if grpc_server:
         await grpc_server.stop(grace=5)
-
-    await engine.shutdown()
-    clear_contextvars()
+    if grpc_task:
+        grpc_task.cancel()
 
 
 app = FastAPI(
@@ -168,6 +219,48 @@ app.add_middleware(
 # =====================================================================
 
 
+def _route_label(request: Request) -> str:
+    """Metrik etiketi olarak route şablonu (ham path kardinaliteyi patlatır)."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+def _request_timeout(request: Request) -> Optional[float]:
+    """x-request-timeout-ms başlığı (gRPC deadline'ının HTTP karşılığı)."""
+    value = request.headers.get(REQUEST_TIMEOUT_HEADER)
+    try:
+        return float(value) / 1000.0 if value else None
+    except ValueError:
+        return None
+
+
+def _json_response(payload: dict) -> Response:
+    """
+    SearchHit listeleri orjson ile doğrudan yazılır; response_model sadece
+    OpenAPI şeması içindir, Response döndüğü için FastAPI tekrar doğrulamaz.
+    """
+    with metrics.StageTimer(metrics.STAGE_SERIALIZATION):
+        body = orjson.dumps(payload)
+    return Response(content=body, media_type="application/json")
+
+
+def _overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Server overloaded",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _content_options(request: QueryRequest) -> Optional[ContentOptions]:
+    if request.max_content_chars is None and request.snippet is None:
+        return None
+    return ContentOptions(request.max_content_chars, request.snippet)
+
+
 @app.middleware("http")
 async def trace_id_middleware(request: Request, call_next):
     clear_contextvars()
@@ -175,7 +268,31 @@ async def trace_id_middleware(request: Request, call_next):
     span_id = uuid.uuid4().hex
 
     bind_contextvars(trace_id=trace_id, span_id=span_id)
-    response = await call_next(request)
+    metrics.bind_transport(metrics.TRANSPORT_HTTP)
+    bind_deadline(_request_timeout(request))
+
+    method = _route_label(request)
+    in_progress = metrics.REQUESTS_IN_PROGRESS.labels(
+        transport=metrics.TRANSPORT_HTTP, method=method
+    )
+    in_progress.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        in_progress.dec()
+        exemplar = metrics.trace_exemplar(trace_id)
+        metrics.REQUEST_LATENCY_SECONDS.labels(
+            transport=metrics.TRANSPORT_HTTP, method=method
+        ).observe(time.perf_counter() - started, exemplar=exemplar)
+        metrics.REQUESTS_TOTAL.labels(
+            transport=metrics.TRANSPORT_HTTP,
+            method=method,
+            status_code=str(status_code),
+        ).inc(exemplar=exemplar)
+
     response.headers["x-trace-id"] = trace_id
     return response
 
@@ -209,13 +326,28 @@ async def query_knowledge_base(request: QueryRequest):
     bind_contextvars(tenant_id=request.tenant_id)
     try:
         logger.info("HTTP Query request received", event_name="HTTP_QUERY_RECEIVED")
-        results = await engine.search(request.tenant_id, request.query, request.top_k)
+        results = await engine.search(
+            request.tenant_id,
+            request.query,
+            request.top_k,
+            request.profile,
+            _content_options(request),
+        )
         logger.info(
             "HTTP Query processed successfully",
             event_name="HTTP_QUERY_SUCCESS",
             results_count=len(results),
         )
-        return QueryResponse(results=results)
+        return _json_response({"results": results})
+    except TenantNotFoundError:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    except VectorDimensionError as e:
+        # Koleksiyon ile embedding modeli uyuşmuyor; tekrar denemek düzeltmez
+        raise HTTPException(status_code=409, detail=str(e))
+    except UnknownSearchProfileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OverloadedError:
+        raise _overloaded()
     except TimeoutError:
         logger.error("RAG Engine Timed Out", event_name="HTTP_QUERY_TIMEOUT")
         raise HTTPException(status_code=504, detail="Vector Database Timeout")
@@ -227,3 +359,61 @@ async def query_knowledge_base(request: QueryRequest):
             exc_info=True,
         )
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@app.post(f"{settings.API_V1_STR}/query:batch", response_model=BatchQueryResponse)
+async def batch_query_knowledge_base(request: BatchQueryRequest):
+    logger.info(
+        "HTTP Batch Query request received",
+        event_name="HTTP_BATCH_QUERY_RECEIVED",
+        items=len(request.items),
+    )
+    try:
+        outcomes = await engine.search_batch(
+            [
+                (
+                    item.tenant_id,
+                    item.query,
+                    item.top_k,
+                    item.profile,
+                    _content_options(item),
+                )
+                for item in request.items
+            ]
+        )
+    except OverloadedError:
+        raise _overloaded()
+    except TimeoutError:
+        # Admission kuyruğunda deadline dolarsa (DeadlineExceededError)
+        logger.error("RAG Engine Timed Out", event_name="HTTP_BATCH_QUERY_TIMEOUT")
+        raise HTTPException(status_code=504, detail="Vector Database Timeout")
+    except Exception as e:
+        logger.error(
+            "API Batch Query Error",
+            event_name="HTTP_BATCH_QUERY_ERROR",
+            error=str(e),
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    items: List[Dict[str, Any]] = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, Exception):
+            logger.warning(
+                "Batch query item failed",
+                event_name="HTTP_BATCH_ITEM_ERROR",
+                index=index,
+                tenant_id=request.items[index].tenant_id,
+                error=str(outcome),
+            )
+            items.append({"results": [], "error": batch_item_error(outcome)})
+        else:
+            items.append({"results": outcome, "error": None})
+
+    logger.info(
+        "HTTP Batch Query processed",
+        event_name="HTTP_BATCH_QUERY_SUCCESS",
+        items=len(items),
+        failed=sum(1 for item in items if item["error"]),
+    )
+    return _json_response({"items": items})
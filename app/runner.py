@@ -3,7 +3,6 @@ import asyncio
 import uvicorn
 import structlog
 import uuid
-from app.main import app
 from app.core.logging import setup_logging
 from app.core.config import settings
 
@@ -14,6 +13,9 @@ async def main():
     # SUTS v4.0: Log motorunu en erken aşamada başlat
     setup_logging()
 
+    # Çok worker'lı mod metrikleri import öncesi ayarladığı için app burada yüklenir
+    from app.main import app
+
     # Startup (Lifespan) bağlamı için izole Trace/Span ID
     structlog.contextvars.bind_contextvars(
         trace_id=str(uuid.uuid4()), span_id=str(uuid.uuid4())
@@ -37,7 +39,16 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if settings.SERVICE_WORKERS > 1:
+            from app import supervisor
+
+            setup_logging()
+            structlog.contextvars.bind_contextvars(
+                trace_id=str(uuid.uuid4()), span_id=str(uuid.uuid4())
+            )
+            supervisor.run(settings.SERVICE_WORKERS)
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         structlog.contextvars.bind_contextvars(
             trace_id=str(uuid.uuid4()), span_id=str(uuid.uuid4())
@@ -1,12 +1,12 @@
 # app/schemas.py
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 from app.core.config import settings
 
 
 class QueryResult(BaseModel):
-    """Tek bir RAG arama sonucunu temsil eder."""
+    """Tek bir RAG arama sonucunu temsil eder (HTTP şeması; motor içinde SearchHit)."""
 
     content: str
     score: float
@@ -21,9 +21,36 @@ class QueryRequest(BaseModel):
     tenant_id: str
     # top_k, 1 ile 20 arasında olmalıdır.
     top_k: int = Field(default=settings.KNOWLEDGE_QUERY_DEFAULT_TOP_K, gt=0, le=20)
+    # Arama profili (ör. "fast", "accurate"); yoksa tenant'ın profili kullanılır
+    profile: Optional[str] = None
+    # İçerik uzunluğu sınırı (0 = sınırsız) ve sorgu odaklı snippet; verilmezse
+    # profilden
+    max_content_chars: Optional[int] = Field(default=None, ge=0)
+    snippet: Optional[bool] = None
 
 
 class QueryResponse(BaseModel):
     """RAG aramasının sonuç listesini döndürür."""
 
     results: List[QueryResult]
+
+
+class BatchQueryRequest(BaseModel):
+    """Tek çağrıda birden fazla sorgu (her öğe bağımsız bir QueryRequest)."""
+
+    items: List[QueryRequest] = Field(
+        min_length=1, max_length=settings.BATCH_QUERY_MAX_ITEMS
+    )
+
+
+class BatchQueryItemResult(BaseModel):
+    """Toplu sorgudaki tek bir öğenin sonucu; hata varsa results boştur."""
+
+    results: List[QueryResult] = Field(default_factory=list)
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    """Öğeler, istekteki sırayla döner."""
+
+    items: List[BatchQueryItemResult]
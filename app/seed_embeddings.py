@@ -0,0 +1,99 @@
+# app/seed_embeddings.py
+"""
+Sık sorgu listesinden kalıcı embedding deposunu tohumlar (servis açılmaz).
+Dosyada her satır bir sorgudur; boş satırlar ve '#' ile başlayanlar atlanır.
+Depoda zaten olan sorgular (normalize edilmiş hâliyle) tekrar encode edilmez.
+
+    python -m app.seed_embeddings hot_queries.txt --path /app/embedding-store/store.bin
+"""
+
+import argparse
+import sys
+from typing import Iterator, List
+
+import structlog
+
+from app.core.cache import normalize_query
+from app.core.config import settings
+from app.core.embedding import build_backend, import_runtime
+from app.core.embedding_store import open_store
+from app.core.logging import setup_logging
+
+logger = structlog.get_logger()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Seed the on-disk embedding store")
+    parser.add_argument("queries", nargs="+", help="Query files, one query per line")
+    parser.add_argument("--path", default=settings.EMBEDDING_STORE_PATH)
+    parser.add_argument(
+        "--capacity", type=int, default=settings.EMBEDDING_STORE_CAPACITY
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.EMBEDDING_BATCH_MAX_SIZE
+    )
+    return parser
+
+
+def read_queries(paths: List[str]) -> Iterator[str]:
+    """Dosyalardaki sorguları normalize edilmiş hâline göre tekilleştirerek döner."""
+    seen = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                query = line.strip()
+                if not query or query.startswith("#"):
+                    continue
+                key = normalize_query(query)
+                if key not in seen:
+                    seen.add(key)
+                    yield query
+
+
+def main() -> int:
+    setup_logging()
+    args = build_parser().parse_args()
+    if not args.path:
+        logger.error(
+            "Embedding store path is not set (--path or EMBEDDING_STORE_PATH)",
+            event_name="EMBEDDING_STORE_SEED_FAIL",
+        )
+        return 1
+
+    model_name = settings.QDRANT_DB_EMBEDDING_MODEL_NAME
+    import_runtime()
+    backend = build_backend()
+    store = open_store(args.path, backend.dimension, args.capacity)
+    pending = [
+        q for q in read_queries(args.queries) if not store.contains(model_name, q)
+    ]
+    stored = 0
+    try:
+        for start in range(0, len(pending), args.batch_size):
+            batch = pending[start : start + args.batch_size]
+            vectors = backend.encode(batch)
+            for query, vector in zip(batch, vectors):
+                if not store.put(model_name, query, vector):
+                    logger.warning(
+                        "Embedding store is full, seeding stopped",
+                        event_name="EMBEDDING_STORE_FULL",
+                        capacity=store.capacity,
+                    )
+                    return 1
+                stored += 1
+    finally:
+        store.close()
+        backend.close()
+        logger.info(
+            "Embedding store seeded",
+            event_name="EMBEDDING_STORE_SEEDED",
+            path=args.path,
+            model=model_name,
+            stored=stored,
+            entries=len(store),
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# app/supervisor.py
+import asyncio
+import gc
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+import uuid
+from typing import Dict
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Çöken worker'ın sürekli yeniden fork edilip CPU yakmaması için
+RESTART_BACKOFF_SECONDS = 1.0
+
+
+def _prepare_multiproc_dir() -> str:
+    """
+    prometheus_client bu ortam değişkenini metrikler oluşturulurken okur; bu
+    yüzden app.core.metrics import edilmeden ÖNCE ayarlanmalıdır.
+    """
+    path = settings.PROMETHEUS_MULTIPROC_DIR or tempfile.mkdtemp(prefix="kqs-metrics-")
+    os.makedirs(path, exist_ok=True)
+    # Önceki çalıştırmadan kalan sayaçlar toplamı bozmasın
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def _reuseport_socket(port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+async def _serve_worker(index: int):
+    import uvicorn
+
+    from app.main import app
+
+    structlog.contextvars.bind_contextvars(
+        trace_id=str(uuid.uuid4()), span_id=str(uuid.uuid4()), worker=index
+    )
+    # Her worker kendi soketini açar; SO_REUSEPORT ile kernel bağlantıları dağıtır
+    sock = _reuseport_socket(settings.KNOWLEDGE_QUERY_SERVICE_HTTP_PORT)
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app,
+            host="0.0.0.0",
+            port=settings.KNOWLEDGE_QUERY_SERVICE_HTTP_PORT,
+            log_config=None,
+            access_log=False,
+        )
+    )
+    await server.serve(sockets=[sock])
+
+
+def _worker_main(index: int, torch_threads: int):
+    # Supervisor'ın sinyal handler'ları worker'a miras kalmasın (uvicorn kendi kurar)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # N worker x varsayılan thread sayısı çekirdekleri aşırı abone eder
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    try:
+        asyncio.run(_serve_worker(index))
+    except KeyboardInterrupt:
+        pass
+
+
+def run(workers: int):
+    """
+    Modeli bir kez yükler, N worker fork eder ve onları ayakta tutar. Supervisor
+    tek thread'li kalır (fork anında başka thread'in tuttuğu kilitler miras
+    kalmasın; log writer thread'i fork'u kendisi yönetir), aggregated /metrics'i
+    de aynı döngüde sunar.
+    """
+    metrics_dir = _prepare_multiproc_dir()
+    created_dir = settings.PROMETHEUS_MULTIPROC_DIR is None
+
+    from prometheus_client import multiprocess
+
+    from app.core import metrics
+    from app.core.engine import engine
+
+    import app.main  # noqa: F401  (fork'tan önce import edilsin, worker'lar paylaşsın)
+
+    started = time.perf_counter()
+    engine.preload()
+    torch_threads = settings.SERVICE_WORKER_TORCH_THREADS or max(
+        1, (os.cpu_count() or 1) // workers
+    )
+    logger.info(
+        "Model loaded before fork",
+        event_name="SUPERVISOR_MODEL_PRELOADED",
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        workers=workers,
+        torch_threads_per_worker=torch_threads,
+    )
+    # Yüklenen nesneleri GC takibinden çıkar; GC geçişleri sayfaları kopyalatmasın
+    gc.freeze()
+
+    context = multiprocessing.get_context("fork")
+    processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+
+    def spawn(index: int):
+        process = context.Process(
+            target=_worker_main,
+            args=(index, torch_threads),
+            name=f"kqs-worker-{index}",
+            daemon=False,
+        )
+        process.start()
+        processes[index] = process
+        logger.info(
+            "Worker started",
+            event_name="SUPERVISOR_WORKER_STARTED",
+            worker=index,
+            pid=process.pid,
+        )
+
+    for index in range(workers):
+        spawn(index)
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    metrics_server = metrics.build_multiprocess_metrics_server()
+    try:
+        while not stopping:
+            metrics_server.handle_request()
+            for index, process in list(processes.items()):
+                if process.is_alive() or stopping:
+                    continue
+                multiprocess.mark_process_dead(process.pid)
+                logger.error(
+                    "Worker exited unexpectedly, restarting",
+                    event_name="SUPERVISOR_WORKER_EXITED",
+                    worker=index,
+                    pid=process.pid,
+                    exit_code=process.exitcode,
+                )
+                time.sleep(RESTART_BACKOFF_SECONDS)
+                spawn(index)
+    finally:
+        logger.info("Stopping workers...", event_name="SUPERVISOR_STOPPING")
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(timeout=15)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            multiprocess.mark_process_dead(process.pid)
+        metrics_server.server_close()
+        if created_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+        logger.info("All workers stopped.", event_name="SUPERVISOR_STOPPED")
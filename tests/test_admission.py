@@ -0,0 +1,110 @@
+# tests/test_admission.py
+import asyncio
+
+import pytest
+
+from app.core.admission import (
+    AdmissionController,
+    DeadlineExceededError,
+    OverloadedError,
+    bind_deadline,
+)
+
+
+async def _hold(controller: AdmissionController, release: asyncio.Event):
+    async with controller.admit():
+        await release.wait()
+
+
+def test_admission_hands_slots_over_in_fifo_order():
+    async def run():
+        controller = AdmissionController(
+            max_in_flight=1, max_queue=4, queue_timeout=1.0
+        )
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release))
+        await asyncio.sleep(0)
+        order = []
+
+        async def queued(name: str):
+            async with controller.admit():
+                order.append(name)
+
+        waiters = [asyncio.create_task(queued(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return order, controller._in_flight
+
+    order, in_flight = asyncio.run(run())
+    assert order == ["a", "b", "c"]
+    assert in_flight == 0
+
+
+def test_admission_skips_queued_request_whose_deadline_expired():
+    async def run():
+        controller = AdmissionController(
+            max_in_flight=1, max_queue=4, queue_timeout=1.0
+        )
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release))
+        await asyncio.sleep(0)
+
+        async def queued(timeout: float):
+            bind_deadline(timeout)
+            async with controller.admit():
+                return "admitted"
+
+        expiring = asyncio.create_task(queued(0.01))
+        patient = asyncio.create_task(queued(1.0))
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(
+            holder, expiring, patient, return_exceptions=True
+        )
+        return results[1:], controller._in_flight
+
+    (expiring, patient), in_flight = asyncio.run(run())
+    assert isinstance(expiring, DeadlineExceededError)
+    assert patient == "admitted"
+    assert in_flight == 0
+
+
+def test_admission_rejects_when_queue_is_full():
+    async def run():
+        controller = AdmissionController(
+            max_in_flight=1, max_queue=1, queue_timeout=1.0
+        )
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release))
+        queued = asyncio.create_task(_hold(controller, release))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(OverloadedError):
+                async with controller.admit():
+                    pass
+        finally:
+            release.set()
+            await asyncio.gather(holder, queued)
+
+    asyncio.run(run())
+
+
+def test_admission_rejects_after_queue_timeout():
+    async def run():
+        controller = AdmissionController(
+            max_in_flight=1, max_queue=4, queue_timeout=0.01
+        )
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(OverloadedError):
+                async with controller.admit():
+                    pass
+        finally:
+            release.set()
+            await holder
+        return controller._in_flight, len(controller._waiters)
+
+    assert asyncio.run(run()) == (0, 0)
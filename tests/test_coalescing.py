@@ -0,0 +1,90 @@
+# tests/test_coalescing.py
+import asyncio
+
+from app.core.admission import bind_deadline, time_left
+from app.core.coalescing import SingleFlight
+
+
+def test_single_flight_shares_one_call():
+    async def run():
+        flight: SingleFlight[int] = SingleFlight()
+        calls = 0
+
+        async def work() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+        return results, calls, len(flight)
+
+    assert asyncio.run(run()) == ([42, 42, 42], 1, 0)
+
+
+def test_single_flight_survives_one_caller_cancelling():
+    async def run():
+        flight: SingleFlight[int] = SingleFlight()
+
+        async def work() -> int:
+            await asyncio.sleep(0.05)
+            return 42
+
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_single_flight_cancels_work_when_last_waiter_leaves():
+    async def run():
+        flight: SingleFlight[int] = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work() -> int:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return 42
+
+        callers = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 0.5)
+        return len(flight)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_single_flight_binds_latest_waiter_deadline():
+    async def run():
+        flight: SingleFlight[float] = SingleFlight()
+        joined = asyncio.Event()
+
+        async def work() -> float:
+            await joined.wait()
+            left = time_left()
+            assert left is not None
+            return left
+
+        async def caller(timeout: float) -> float:
+            bind_deadline(timeout)
+            return await flight.do("k", work)
+
+        short = asyncio.create_task(caller(0.5))
+        await asyncio.sleep(0)
+        long = asyncio.create_task(caller(5.0))
+        await asyncio.sleep(0)
+        joined.set()
+        return await asyncio.gather(short, long)
+
+    short, long = asyncio.run(run())
+    assert short == long
+    assert short > 1.0
@@ -0,0 +1,89 @@
+# tests/test_search_stream.py
+import asyncio
+from typing import List
+
+from qdrant_client import models
+
+from app.benchmark.fakes import FakeQdrantClient, FakeQdrantPool, StubBackend
+from app.core.batching import EmbeddingBatcher
+from app.core.engine import (
+    MEMORY_COLLECTION,
+    STREAM_FINAL,
+    STREAM_KNOWLEDGE_BASE,
+    STREAM_MEMORY,
+    RAGEngine,
+)
+from app.core.routing import Replica, ReplicaRouter
+
+
+class FakePlanner:
+    """QdrantSearchPlanner yerine; koleksiyona göre sabit hit'ler döner."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls: List[str] = []
+
+    async def search(
+        self, collection_name: str, request: models.SearchRequest
+    ) -> List[models.ScoredPoint]:
+        self.calls.append(collection_name)
+        await asyncio.sleep(self.delay)
+        if collection_name == MEMORY_COLLECTION:
+            payload = {"fact": {"summary": "kahve sever", "category": "tercih"}}
+        else:
+            payload = {"content": "iade politikası", "source_uri": "doc://1"}
+        return [
+            models.ScoredPoint(id=i, version=0, score=0.9 - i * 0.1, payload=payload)
+            for i in range(request.limit)
+        ]
+
+
+async def _engine(planner: FakePlanner) -> RAGEngine:
+    engine = RAGEngine()
+    engine.router = ReplicaRouter(
+        [Replica("fake", FakeQdrantPool(FakeQdrantClient(dimension=8)))]
+    )
+    engine.backend = StubBackend(dimension=8, base_ms=0, per_item_ms=0)
+    engine.batcher = EmbeddingBatcher(
+        engine._encode_batch_sync, max_batch_size=8, max_wait_ms=0
+    )
+    await engine.batcher.start()
+    engine.search_planner = planner  # type: ignore[assignment]
+    return engine
+
+
+def test_search_stream_yields_source_frames_then_final():
+    async def run():
+        planner = FakePlanner()
+        engine = await _engine(planner)
+        try:
+            return [
+                (source, len(hits))
+                async for source, hits in engine.search_stream("acme", "iade", top_k=2)
+            ], planner.calls
+        finally:
+            await engine.batcher.stop()
+
+    frames, calls = asyncio.run(run())
+    assert sorted(frames[:2]) == [(STREAM_MEMORY, 2), (STREAM_KNOWLEDGE_BASE, 2)]
+    assert frames[2] == (STREAM_FINAL, 2)
+    assert sorted(calls) == ["sentiric_kb_acme", MEMORY_COLLECTION]
+
+
+def test_search_stream_releases_admission_before_frames_are_read():
+    async def run():
+        engine = await _engine(FakePlanner(delay=0.01))
+        try:
+            stream = engine.search_stream("acme", "iade", top_k=2)
+            await stream.__anext__()
+            # Yavaş okuyan istemci: aramalar bitince slot bırakılmış olmalı
+            await asyncio.sleep(0.1)
+            in_flight = engine.admission._in_flight
+            rest = [source async for source, _ in stream]
+            return in_flight, rest
+        finally:
+            await engine.batcher.stop()
+
+    in_flight, rest = asyncio.run(run())
+    assert in_flight == 0
+    assert rest[-1] == STREAM_FINAL